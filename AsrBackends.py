@@ -0,0 +1,174 @@
+import threading
+from dataclasses import dataclass, field
+from ModelRegistry import model_registry, load_whisper_model
+
+# One decoded stretch of speech returned by every ASR backend
+@dataclass
+class Segment:
+    """
+    Transcribed segment.
+
+    Attributes:
+    - start: Start time in seconds, relative to the start of the audio passed in.
+    - end: End time in seconds.
+    - text: Segment text.
+    - words: (start, end, word) tuples when word timestamps were requested.
+    """
+    start: float
+    end: float
+    text: str
+    words: list = field(default_factory=list)
+
+# Function to join segment texts into one transcript
+def segments_text(segments):
+    """Return the transcript text of a list of segments."""
+    return "".join(segment.text for segment in segments)
+
+# Base class every ASR engine implements
+class AsrBackend:
+    """
+    Speech recognition engine with a stable contract:
+    transcribe(audio: np.ndarray) -> list of Segment.
+
+    Parameters:
+    - model_type: Model size/name understood by the engine (e.g., "base.en").
+    """
+
+    name = None
+
+    def __init__(self, model_type="base.en"):
+        self.model_type = model_type
+
+    def load(self):
+        """Load (or fetch from the model registry) the underlying model."""
+        raise NotImplementedError
+
+    def transcribe(self, audio, prompt=None, word_timestamps=False):
+        """
+        Transcribe 16 kHz mono float32 audio.
+
+        Parameters:
+        - audio: 1-D float32 array sampled at 16 kHz.
+        - prompt: Optional text of what was said just before this audio.
+        - word_timestamps: Whether to fill in Segment.words.
+
+        Returns:
+        - List of Segment objects.
+        """
+        raise NotImplementedError
+
+# Reference engine: openai-whisper in fp32
+class WhisperBackend(AsrBackend):
+    """openai-whisper running the stock fp32 model."""
+
+    name = "whisper"
+
+    def _registry_key(self):
+        return self.model_type
+
+    def _load_model(self, model_type):
+        return load_whisper_model(model_type)
+
+    def load(self):
+        return model_registry.get(self._registry_key(), loader=lambda _: self._load_model(self.model_type))
+
+    def transcribe(self, audio, prompt=None, word_timestamps=False):
+        model = self.load()
+        result = model.transcribe(
+            audio, initial_prompt=prompt, word_timestamps=word_timestamps,
+            condition_on_previous_text=prompt is None,
+            fp16=getattr(getattr(model, "device", None), "type", "cpu") != "cpu",
+        )
+        return [
+            Segment(
+                start=float(segment["start"]), end=float(segment["end"]), text=segment["text"],
+                words=[(float(w["start"]), float(w["end"]), w["word"].strip())
+                       for w in segment.get("words", [])],
+            )
+            for segment in result.get("segments", [])
+        ]
+
+# openai-whisper with int8 dynamically quantized linear layers (no extra dependency)
+class QuantizedWhisperBackend(WhisperBackend):
+    """openai-whisper with its Linear layers dynamically quantized to int8 for CPU."""
+
+    name = "whisper-int8"
+
+    def _registry_key(self):
+        return f"{self.model_type}:int8"
+
+    def _load_model(self, model_type):
+        import torch
+        model = load_whisper_model(model_type)
+        return torch.quantization.quantize_dynamic(model.cpu(), {torch.nn.Linear}, dtype=torch.qint8)
+
+# CTranslate2 engine with int8 weights (pip install faster-whisper)
+class FasterWhisperBackend(AsrBackend):
+    """
+    faster-whisper (CTranslate2) with int8 compute on CPU, typically several times
+    faster than fp32 openai-whisper at a similar word error rate.
+
+    Parameters:
+    - model_type: Whisper model size (e.g., "small.en").
+    - compute_type: CTranslate2 compute type (default "int8").
+    - cpu_threads: Threads used by CTranslate2 (0 lets it decide).
+    - beam_size: Beam size used for decoding.
+    """
+
+    name = "faster-whisper"
+
+    def __init__(self, model_type="base.en", compute_type="int8", cpu_threads=0, beam_size=1):
+        super().__init__(model_type)
+        self.compute_type = compute_type
+        self.cpu_threads = cpu_threads
+        self.beam_size = beam_size
+
+    def load(self):
+        def load_model(_):
+            from faster_whisper import WhisperModel
+            return WhisperModel(self.model_type, device="cpu", compute_type=self.compute_type,
+                                cpu_threads=self.cpu_threads)
+        return model_registry.get(f"faster-whisper:{self.model_type}:{self.compute_type}", loader=load_model)
+
+    def transcribe(self, audio, prompt=None, word_timestamps=False):
+        model = self.load()
+        segments, _ = model.transcribe(
+            audio, beam_size=self.beam_size, initial_prompt=prompt,
+            word_timestamps=word_timestamps, condition_on_previous_text=prompt is None,
+        )
+        return [
+            Segment(
+                start=segment.start, end=segment.end, text=segment.text,
+                words=[(w.start, w.end, w.word.strip()) for w in (segment.words or [])],
+            )
+            for segment in segments
+        ]
+
+# Backends that can be selected by name
+ASR_BACKENDS = {
+    backend.name: backend
+    for backend in (WhisperBackend, QuantizedWhisperBackend, FasterWhisperBackend)
+}
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+# Function to get a shared backend instance by name
+def get_backend(name="whisper", model_type="base.en"):
+    """
+    Return the shared ASR backend for (name, model_type).
+
+    Parameters:
+    - name: One of ASR_BACKENDS ("whisper", "whisper-int8", "faster-whisper").
+    - model_type: Model size/name passed to the backend.
+
+    Returns:
+    - AsrBackend instance (the same object on every call).
+    """
+    if name not in ASR_BACKENDS:
+        raise ValueError(f"Unknown ASR backend '{name}'. Choose from: {', '.join(ASR_BACKENDS)}")
+    with _backends_lock:
+        backend = _backends.get((name, model_type))
+        if backend is None:
+            backend = _backends[(name, model_type)] = ASR_BACKENDS[name](model_type)
+    return backend
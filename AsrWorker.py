@@ -0,0 +1,278 @@
+import os
+import sys
+import queue
+import atexit
+import itertools
+import threading
+import multiprocessing
+import numpy as np
+from contextlib import contextmanager
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from multiprocessing import shared_memory
+from multiprocessing.connection import wait
+
+# Entry point of each worker process
+def _worker_main(worker_id, backend_name, model_type, torch_threads, shm_name, slot_count,
+                 slot_size, job_queue, result_queue, current_jobs):
+    """Load the backend once, then transcribe audio slots from shared memory until told to stop."""
+    import warnings
+    warnings.filterwarnings("ignore", category=UserWarning, module="whisper")
+    warnings.filterwarnings("ignore", category=FutureWarning, module="torch")
+    if torch_threads:
+        import torch
+        torch.set_num_threads(torch_threads)
+
+    from AsrBackends import get_backend
+    backend = get_backend(backend_name, model_type)
+    backend.load()
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    slots = np.ndarray((slot_count, slot_size), dtype='float32', buffer=shm.buf)
+    result_queue.put(("ready", worker_id, None))
+
+    try:
+        while True:
+            job = job_queue.get()
+            if job is None:
+                break
+            job_id, slot, length, options = job
+            # Written to shared memory at once, so the pool can fail the job if this process dies
+            current_jobs[worker_id] = job_id
+            try:
+                segments = backend.transcribe(slots[slot, :length], **options)
+                result_queue.put((job_id, segments, None))
+            except Exception as e:
+                result_queue.put((job_id, None, f"{type(e).__name__}: {e}"))
+            current_jobs[worker_id] = -1
+    finally:
+        del slots
+        shm.close()
+
+# Function to start spawned processes without re-running the parent's main script
+@contextmanager
+def _without_main_script():
+    """
+    Spawned children import the parent's __main__ module (as __mp_main__) before running
+    their target. When that is app.py, every worker would load the embedding model and
+    open Chroma at import; hiding the script while the workers start avoids it.
+    """
+    main = sys.modules["__main__"]
+    saved = {name: getattr(main, name) for name in ("__file__", "__spec__") if hasattr(main, name)}
+    if "__file__" in saved:
+        del main.__file__
+    main.__spec__ = None
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(main, name, value)
+
+# Pool of ASR worker processes fed through shared memory
+class AsrWorkerPool:
+    """
+    Run an ASR backend in separate processes so decoding does not contend for the GIL
+    with the audio callback and the LLM/TTS loop.
+
+    Audio is copied into a preallocated shared-memory slot and only the slot index is
+    sent to a worker; the segments come back on a result queue. The pool follows the
+    AsrBackend transcribe contract, so it can be used wherever a backend is expected.
+
+    Parameters:
+    - model_type: Model type loaded by every worker (e.g., "small.en").
+    - backend: Name of the ASR backend run by the workers (see AsrBackends.ASR_BACKENDS).
+    - workers: Number of worker processes.
+    - torch_threads: Torch intra-op threads per worker (None keeps torch's default).
+    - max_duration: Longest audio window accepted, in seconds.
+    - sample_rate: Sample rate of the submitted audio (default 16000 Hz).
+    - slots: Number of shared-memory slots, which bounds jobs in flight (default 2 per worker).
+    - timeout: Seconds transcribe() waits for a slot and for the segments before raising
+      TimeoutError (None waits indefinitely).
+
+    When a worker exits unexpectedly (e.g., killed for running out of memory), the job it
+    was decoding fails with a RuntimeError; once no worker is left, every pending and
+    future job fails the same way.
+    """
+
+    def __init__(self, model_type="base.en", backend="whisper", workers=1, torch_threads=None,
+                 max_duration=30, sample_rate=16000, slots=None, timeout=120):
+        self.model_type = model_type
+        self.backend = backend
+        self.timeout = timeout
+        self.slot_size = int(max_duration * sample_rate)
+        self.slot_count = slots or 2 * workers
+        self._shm = shared_memory.SharedMemory(create=True, size=self.slot_count * self.slot_size * 4)
+        self._slots = np.ndarray((self.slot_count, self.slot_size), dtype='float32', buffer=self._shm.buf)
+        self._free_slots = queue.Queue()
+        for slot in range(self.slot_count):
+            self._free_slots.put(slot)
+
+        context = multiprocessing.get_context("spawn")
+        self._job_queue = context.Queue()
+        self._result_queue = context.Queue()
+        self._pending = {}  # job id -> (future, slot)
+        self._current_jobs = context.RawArray('q', [-1] * workers)  # Job each worker is decoding
+        self._lock = threading.Lock()
+        self._job_ids = itertools.count()
+        self._ready = threading.Semaphore(0)
+        self._closed = False
+        self._broken = False  # Every worker has exited
+
+        self._processes = [
+            context.Process(
+                target=_worker_main, name=f"asr-worker-{i}", daemon=True,
+                args=(i, backend, model_type, torch_threads, self._shm.name, self.slot_count,
+                      self.slot_size, self._job_queue, self._result_queue, self._current_jobs),
+            )
+            for i in range(workers)
+        ]
+        with _without_main_script():
+            for process in self._processes:
+                process.start()
+
+        self._result_thread = threading.Thread(target=self._collect_results, name="asr-results")
+        self._result_thread.daemon = True
+        self._result_thread.start()
+        self._watch_thread = threading.Thread(target=self._watch_workers, name="asr-watch")
+        self._watch_thread.daemon = True
+        self._watch_thread.start()
+        atexit.register(self.close)
+
+    def _finish(self, job_id, result=None, error=None):
+        """Resolve a pending job and free its slot (no-op if it was resolved already)."""
+        with self._lock:
+            entry = self._pending.pop(job_id, None)
+        if entry is None:
+            return
+        future, slot = entry
+        self._free_slots.put(slot)
+        if error is None:
+            future.set_result(result)
+        else:
+            future.set_exception(error)
+
+    def _collect_results(self):
+        """Resolve futures as workers report back (runs in a background thread)."""
+        while True:
+            job_id, result, error = self._result_queue.get()
+            if job_id is None:
+                break
+            if job_id == "ready":
+                self._ready.release()
+            elif error is None:
+                self._finish(job_id, result)
+            else:
+                self._finish(job_id, error=RuntimeError(f"ASR worker failed: {error}"))
+
+    def _watch_workers(self):
+        """Fail the jobs of workers that exit while the pool is open (runs in a background thread)."""
+        alive = {process.sentinel: worker_id for worker_id, process in enumerate(self._processes)}
+        while alive:
+            for sentinel in wait(list(alive)):
+                worker_id = alive.pop(sentinel)
+                if self._closed:
+                    continue
+                process = self._processes[worker_id]
+                process.join(timeout=1)  # Reap it so the exit code is known
+                exitcode = process.exitcode
+                print(f"ASR worker {worker_id} exited unexpectedly (exit code {exitcode}).",
+                      file=sys.stderr)
+                job_id = self._current_jobs[worker_id]
+                if job_id >= 0:
+                    self._finish(job_id, error=RuntimeError(
+                        f"ASR worker {worker_id} exited with code {exitcode} while decoding"))
+        if self._closed:
+            return
+        self._broken = True
+        with self._lock:
+            job_ids = list(self._pending)
+        for job_id in job_ids:
+            self._finish(job_id, error=RuntimeError("Every ASR worker has exited"))
+
+    def wait_ready(self, timeout=None):
+        """Block until every worker has loaded its model; returns False on timeout."""
+        acquired = 0
+        try:
+            for _ in self._processes:
+                if not self._ready.acquire(timeout=timeout):
+                    return False
+                acquired += 1
+            return True
+        finally:
+            for _ in range(acquired):
+                self._ready.release()
+
+    def submit(self, audio, slot_timeout=None, **options):
+        """
+        Queue audio for transcription without blocking on the decode.
+
+        Parameters:
+        - audio: 1-D float32 array (at most max_duration seconds).
+        - slot_timeout: Seconds to wait for a free slot (None waits indefinitely).
+        - options: Keyword arguments for the backend's transcribe (prompt, word_timestamps).
+
+        Returns:
+        - Future resolving to a list of Segment objects.
+        """
+        if self._closed:
+            raise RuntimeError("ASR worker pool is closed")
+        if self._broken:
+            raise RuntimeError("Every ASR worker has exited")
+        length = len(audio)
+        if length > self.slot_size:
+            raise ValueError(f"Audio window of {length} samples exceeds the slot size {self.slot_size}")
+
+        try:
+            slot = self._free_slots.get(timeout=slot_timeout)  # Blocks while every slot is in flight
+        except queue.Empty:
+            raise TimeoutError(f"No free ASR slot within {slot_timeout} s") from None
+        self._slots[slot, :length] = audio
+        job_id = next(self._job_ids)
+        future = Future()
+        with self._lock:
+            self._pending[job_id] = (future, slot)
+        self._job_queue.put((job_id, slot, length, options))
+        return future
+
+    def transcribe(self, audio, **options):
+        """
+        Transcribe audio in a worker and wait for the segments (AsrBackend contract).
+
+        Raises TimeoutError when no segments arrive within the pool's timeout, and
+        RuntimeError when the decode failed or its worker exited.
+        """
+        future = self.submit(audio, slot_timeout=self.timeout, **options)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            raise TimeoutError(f"ASR worker returned no segments within {self.timeout} s") from None
+
+    def close(self):
+        """Stop the workers and release the shared memory."""
+        if self._closed:
+            return
+        self._closed = True
+        for _ in self._processes:
+            self._job_queue.put(None)
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self._result_queue.put((None, None, None))
+        self._result_thread.join(timeout=5)
+        self._watch_thread.join(timeout=5)
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for future, _ in pending.values():
+            future.cancel()
+        del self._slots
+        self._shm.close()
+        try:
+            self._shm.unlink()
+        except FileNotFoundError:
+            pass
+
+# Function to choose a sensible torch thread count per worker
+def default_torch_threads(workers):
+    """Split the CPU cores between the workers, leaving one core for the main loop."""
+    cores = os.cpu_count() or 2
+    return max(1, (cores - 1) // max(1, workers))
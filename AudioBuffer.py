@@ -0,0 +1,185 @@
+import threading
+import numpy as np
+
+# Preallocated ring buffer used to hand audio from the sounddevice callback to the transcriber
+class AudioRingBuffer:
+    """
+    Fixed-capacity single-producer / single-consumer ring buffer for mono audio samples.
+
+    The writer (usually an audio callback) never blocks and never allocates: when the
+    reader falls behind, the oldest unread samples are overwritten and counted as an
+    overrun. The reader blocks on a condition until enough samples are available.
+
+    Parameters:
+    - capacity: Maximum number of samples held at once (the memory ceiling).
+    - dtype: Sample type stored in the buffer (default float32).
+    """
+
+    def __init__(self, capacity, dtype='float32'):
+        if capacity <= 0:
+            raise ValueError("capacity must be a positive number of samples")
+        self.capacity = int(capacity)
+        self._buffer = np.zeros(self.capacity, dtype=dtype)
+        self._condition = threading.Condition()
+        self._write_pos = 0  # Total samples ever written
+        self._read_pos = 0  # Total samples ever consumed
+        self._closed = False
+        self.overruns = 0  # Number of writes that overwrote unread audio
+        self.dropped_samples = 0  # Number of unread samples lost to overruns
+
+    @property
+    def available(self):
+        """Number of unread samples currently held in the buffer."""
+        return self._write_pos - self._read_pos
+
+    @property
+    def write_position(self):
+        """Total number of samples written since the buffer was created."""
+        return self._write_pos
+
+    @property
+    def read_position(self):
+        """Total number of samples consumed since the buffer was created."""
+        return self._read_pos
+
+    def _copy_in(self, samples):
+        """Copy samples into the ring at the current write position, wrapping if needed."""
+        count = len(samples)
+        start = self._write_pos % self.capacity
+        first = min(count, self.capacity - start)
+        self._buffer[start:start + first] = samples[:first]
+        if first < count:
+            self._buffer[:count - first] = samples[first:]
+
+    def _copy_out(self, out, count):
+        """Copy count unread samples into out, wrapping if needed."""
+        start = self._read_pos % self.capacity
+        first = min(count, self.capacity - start)
+        out[:first] = self._buffer[start:start + first]
+        if first < count:
+            out[first:count] = self._buffer[:count - first]
+
+    def write(self, samples):
+        """
+        Append samples to the buffer without blocking.
+
+        Parameters:
+        - samples: 1-D array of samples. Blocks larger than the capacity keep only their tail.
+
+        Returns:
+        - Number of unread samples that had to be dropped to make room (0 when keeping up).
+        """
+        if len(samples) > self.capacity:
+            samples = samples[-self.capacity:]
+        count = len(samples)
+        if count == 0:
+            return 0
+
+        with self._condition:
+            dropped = max(0, self.available + count - self.capacity)
+            if dropped:
+                # Reader is behind real time: discard the oldest audio instead of growing
+                self._read_pos += dropped
+                self.overruns += 1
+                self.dropped_samples += dropped
+            self._copy_in(samples)
+            self._write_pos += count
+            self._condition.notify_all()
+        return dropped
+
+    def read(self, count, out=None, timeout=None):
+        """
+        Block until count samples are available and copy them out.
+
+        Parameters:
+        - count: Number of samples to read (must not exceed the capacity).
+        - out: Optional preallocated array to fill, avoiding a new allocation per read.
+        - timeout: Maximum time to wait in seconds (None waits indefinitely).
+
+        Returns:
+        - Array holding the samples (out itself when given), or None on timeout or once the
+          buffer is closed and drained. After close, a last partial block is returned
+          zero-padded to count samples so the end of the audio is not lost.
+        """
+        if count > self.capacity:
+            raise ValueError("Cannot read more samples than the buffer capacity")
+        if out is None:
+            out = np.empty(count, dtype=self._buffer.dtype)
+
+        with self._condition:
+            ready = self._condition.wait_for(
+                lambda: self.available >= count or self._closed, timeout=timeout
+            )
+            if not ready or self.available == 0:
+                return None
+            # Fewer than count samples are only left once the writer has closed the buffer
+            copied = min(count, self.available)
+            self._copy_out(out, copied)
+            out[copied:count] = 0
+            self._read_pos += copied
+            self._condition.notify_all()  # Wake a writer waiting for space
+        return out[:count]
+
+    def read_available(self, out, min_count=1, timeout=None):
+        """
+        Block until at least min_count samples are available, then copy out as many as fit.
+
+        Parameters:
+        - out: Preallocated array to fill; at most len(out) samples are read.
+        - min_count: Minimum number of samples to wait for.
+        - timeout: Maximum time to wait in seconds (None waits indefinitely).
+
+        Returns:
+        - View of out holding the samples read (after close, possibly fewer than min_count),
+          or None on timeout or once the buffer is closed and drained.
+        """
+        min_count = min(min_count, len(out), self.capacity)
+        with self._condition:
+            ready = self._condition.wait_for(
+                lambda: self.available >= min_count or self._closed, timeout=timeout
+            )
+            if not ready or self.available == 0:
+                return None
+            count = min(self.available, len(out))
+            self._copy_out(out, count)
+            self._read_pos += count
+            self._condition.notify_all()
+        return out[:count]
+
+    def clear(self):
+        """Discard all unread samples."""
+        with self._condition:
+            self._read_pos = self._write_pos
+            self._condition.notify_all()
+
+    def wait_for_space(self, count, timeout=None):
+        """
+        Block until count samples can be written without overrunning.
+
+        Only producers that can afford to wait (e.g., offline replay) should use this;
+        audio callbacks must call write() directly.
+
+        Returns:
+        - True when there is room (or the buffer was closed), False on timeout.
+        """
+        count = min(count, self.capacity)
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: self.capacity - self.available >= count or self._closed, timeout=timeout
+            )
+
+    def close(self):
+        """Wake up any blocked reader; further reads return None once drained."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def stats(self):
+        """Return a snapshot of the buffer fill level and overrun counters."""
+        with self._condition:
+            return {
+                "capacity": self.capacity,
+                "available": self.available,
+                "overruns": self.overruns,
+                "dropped_samples": self.dropped_samples,
+            }
@@ -0,0 +1,279 @@
+import sys
+import time
+import atexit
+import threading
+from collections import deque
+from AudioBuffer import AudioRingBuffer
+from AudioPreprocess import AudioPreprocessor
+
+# Ring buffer handed to each consumer of the capture service
+class AudioSubscription(AudioRingBuffer):
+    """
+    Per-consumer ring buffer that also tracks when each captured sample was recorded.
+
+    Parameters:
+    - name: Name the consumer subscribed with.
+    - sample_rate: Sample rate of the audio written into the subscription.
+    - capacity: Maximum number of samples held at once.
+    """
+
+    def __init__(self, name, sample_rate, capacity):
+        super().__init__(capacity)
+        self.name = name
+        self.sample_rate = sample_rate
+        self._anchors = deque(maxlen=64)  # (write position, wall-clock time) at each discontinuity
+
+    def write_block(self, samples, timestamp, discontinuity=False):
+        """Write samples captured at timestamp, starting a new time anchor after a gap."""
+        with self._condition:
+            if discontinuity or not self._anchors:
+                self._anchors.append((self.write_position, timestamp))
+        return self.write(samples)
+
+    def timestamp_at(self, position):
+        """
+        Return the wall-clock time at which the sample at position was captured.
+
+        Parameters:
+        - position: Absolute sample position (as counted by write_position/read_position).
+
+        Returns:
+        - Time in seconds since the epoch, or None if nothing has been captured yet.
+        """
+        # Snapshot, as the capture callback appends anchors from its own thread
+        with self._condition:
+            anchors = list(self._anchors)
+        if not anchors:
+            return None
+        anchor_position, anchor_time = anchors[0]
+        for anchor in anchors:
+            if anchor[0] > position:
+                break
+            anchor_position, anchor_time = anchor
+        return anchor_time + (position - anchor_position) / self.sample_rate
+
+    def read_timed(self, count, out=None, timeout=None):
+        """
+        Read count samples like read(), also returning the capture time of the first sample.
+
+        Returns:
+        - (samples, timestamp) tuple, or (None, None) on timeout or close.
+        """
+        position = self.read_position
+        samples = self.read(count, out=out, timeout=timeout)
+        if samples is None:
+            return None, None
+        # An overrun may have skipped ahead while we waited
+        position = max(position, self.read_position - count)
+        return samples, self.timestamp_at(position)
+
+    def discard_before(self, timestamp):
+        """
+        Drop unread samples captured before timestamp (e.g., audio older than a barge-in).
+
+        Returns:
+        - Number of samples dropped.
+        """
+        with self._condition:
+            start = self.timestamp_at(self._read_pos)
+            if start is None or timestamp <= start:
+                return 0
+            count = min(self.available, int((timestamp - start) * self.sample_rate))
+            self._read_pos += count
+            self._condition.notify_all()
+        return count
+
+# Long-lived input stream shared by every consumer for the whole session
+class AudioCaptureService:
+    """
+    Opens one sounddevice InputStream and fans its audio out to named subscriptions.
+
+    The stream is opened once on start() and kept open until stop(), so device open and
+    close costs are paid once per session and no helper threads are created per turn.
+    The device is opened at its native rate; every block is downmixed to mono and
+    resampled to sample_rate before it reaches the subscriptions.
+
+    Parameters:
+    - device: Input device index or name (e.g., the VAC input device).
+    - sample_rate: Sample rate delivered to subscribers (default 16000 Hz).
+    - channels: Number of channels to capture.
+    - blocksize: Frames per callback block (default: 100 ms of audio at the device rate).
+    - latency: Latency hint passed to sounddevice.
+    - device_sample_rate: Rate to open the device at (None uses the device's default rate).
+    - channel_mode: "mean" to average the channels, or a channel index to keep only that one.
+    """
+
+    def __init__(self, device=0, sample_rate=16000, channels=1, blocksize=None, latency='low',
+                 device_sample_rate=None, channel_mode="mean"):
+        self.device = device
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.blocksize = blocksize
+        self.latency = latency
+        self.device_sample_rate = device_sample_rate
+        self.channel_mode = channel_mode
+        self._preprocessor = None
+        self._stream = None
+        self._lock = threading.Lock()
+        self._subscriptions = {}
+        self._targets = ()  # Snapshot iterated by the callback without locking
+        self._paused = False
+        self._discontinuity = True
+        self._clock_offset = 0.0  # Converts stream time to wall-clock time
+        self.status_count = 0  # Number of callbacks that reported overflow/underflow
+
+    @property
+    def running(self):
+        return self._stream is not None
+
+    @property
+    def paused(self):
+        return self._paused
+
+    def _block_timestamp(self, frames, time_info):
+        """Wall-clock time at which the first frame of a block was captured."""
+        try:
+            timestamp = time_info.inputBufferAdcTime + self._clock_offset
+        except AttributeError:
+            timestamp = time.time() - frames / self.device_sample_rate
+        if timestamp <= self._clock_offset:
+            # Some host APIs report no ADC time; fall back to arrival time
+            timestamp = time.time() - frames / self.device_sample_rate
+        return timestamp
+
+    def _callback(self, indata, frames, time_info, status):
+        """Distribute one captured block to every active subscription."""
+        if status:
+            self.status_count += 1
+            print(status, file=sys.stderr)
+        if self._paused:
+            return
+        timestamp = self._block_timestamp(frames, time_info)
+        discontinuity = self._discontinuity
+        self._discontinuity = False
+        # Downmix and resample once, then share the result with every subscriber
+        samples = self._preprocessor.process(indata)
+        for subscription in self._targets:
+            subscription.write_block(samples, timestamp, discontinuity)
+
+    def start(self):
+        """Open the input stream if it is not already running."""
+        import sounddevice as sd
+
+        with self._lock:
+            if self._stream is not None:
+                return self
+            print("Capturing audio from VAC...")
+            if self.device_sample_rate is None:
+                # Open at the native rate so the driver does not have to convert
+                self.device_sample_rate = int(sd.query_devices(self.device, 'input')['default_samplerate'])
+            blocksize = self.blocksize or self.device_sample_rate // 10
+            self._preprocessor = AudioPreprocessor(self.channels, self.device_sample_rate,
+                                                   self.sample_rate, self.channel_mode,
+                                                   max_frames=blocksize)
+            stream = sd.InputStream(channels=self.channels, samplerate=self.device_sample_rate,
+                                    callback=self._callback, dtype='float32',
+                                    blocksize=blocksize, latency=self.latency,
+                                    device=self.device)
+            self._clock_offset = time.time() - stream.time
+            self._discontinuity = True
+            stream.start()
+            self._stream = stream
+        return self
+
+    def stop(self):
+        """Close the input stream and wake up any consumer blocked on a read."""
+        with self._lock:
+            stream, self._stream = self._stream, None
+            subscriptions = list(self._subscriptions.values())
+        if stream is not None:
+            stream.stop()
+            stream.close()
+        for subscription in subscriptions:
+            subscription.close()
+
+    def pause(self):
+        """Stop delivering audio to subscribers while keeping the device open."""
+        self._paused = True
+
+    def resume(self):
+        """Resume delivering audio; the next block starts a new timestamp anchor."""
+        self._discontinuity = True
+        if self._preprocessor is not None:
+            self._preprocessor.reset()
+        self._paused = False
+
+    def subscribe(self, name, buffer_duration=30):
+        """
+        Return the subscription registered under name, creating it on first use.
+
+        Subscriptions persist across calls, so a consumer that subscribes once per turn
+        receives the audio captured in between turns as well.
+
+        Parameters:
+        - name: Consumer name used to find the subscription again.
+        - buffer_duration: Seconds of audio the subscription can hold before overrunning.
+
+        Returns:
+        - AudioSubscription receiving every captured block.
+        """
+        with self._lock:
+            subscription = self._subscriptions.get(name)
+            if subscription is None:
+                capacity = int(buffer_duration * self.sample_rate)
+                subscription = AudioSubscription(name, self.sample_rate, capacity)
+                self._subscriptions[name] = subscription
+                self._targets = tuple(self._subscriptions.values())
+        return subscription
+
+    def unsubscribe(self, name):
+        """Stop delivering audio to the named subscription and close it."""
+        with self._lock:
+            subscription = self._subscriptions.pop(name, None)
+            self._targets = tuple(self._subscriptions.values())
+        if subscription is not None:
+            subscription.close()
+
+    def stats(self):
+        """Return stream state and per-subscription buffer statistics."""
+        return {
+            "running": self.running,
+            "paused": self._paused,
+            "status_count": self.status_count,
+            "subscriptions": {name: sub.stats() for name, sub in self._subscriptions.items()},
+        }
+
+_services = {}
+_services_lock = threading.Lock()
+
+# Function to get the process-wide capture service for a device
+def get_capture_service(device=0, sample_rate=16000, channels=1):
+    """
+    Return the shared, started capture service for the given device settings.
+
+    Parameters:
+    - device: Input device index or name.
+    - sample_rate: Sample rate delivered to subscribers (the device runs at its native rate).
+    - channels: Number of channels to capture (downmixed to mono).
+
+    Returns:
+    - Running AudioCaptureService (the same instance on every call).
+    """
+    key = (device, sample_rate, channels)
+    with _services_lock:
+        service = _services.get(key)
+        if service is None:
+            service = AudioCaptureService(device=device, sample_rate=sample_rate, channels=channels)
+            _services[key] = service
+    return service.start()
+
+# Function to close every capture service (called automatically at exit)
+def shutdown_capture_services():
+    """Stop all shared capture services and forget them."""
+    with _services_lock:
+        services = list(_services.values())
+        _services.clear()
+    for service in services:
+        service.stop()
+
+atexit.register(shutdown_capture_services)
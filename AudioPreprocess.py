@@ -0,0 +1,178 @@
+from math import gcd
+import numpy as np
+
+# Multichannel to mono conversion with a reused output buffer
+class Downmixer:
+    """
+    Convert (frames, channels) blocks to mono without allocating per block.
+
+    Parameters:
+    - channels: Number of channels in the incoming blocks.
+    - mode: "mean" to average all channels, or a channel index to pick one channel.
+    - max_frames: Largest block expected (the buffer grows if a larger block arrives).
+    """
+
+    def __init__(self, channels, mode="mean", max_frames=4096):
+        if mode != "mean" and not 0 <= int(mode) < channels:
+            raise ValueError(f"Channel {mode} does not exist on a {channels}-channel stream")
+        self.channels = channels
+        self.mode = mode
+        self._out = np.zeros(max_frames, dtype='float32')
+
+    def process(self, block):
+        """
+        Downmix one block.
+
+        Parameters:
+        - block: Array of shape (frames, channels) or (frames,).
+
+        Returns:
+        - Mono view of length frames (valid until the next call).
+        """
+        if block.ndim == 1 or block.shape[1] == 1:
+            return block.reshape(-1)
+        frames = block.shape[0]
+        if frames > len(self._out):
+            self._out = np.zeros(frames, dtype='float32')
+        out = self._out[:frames]
+        if self.mode == "mean":
+            np.mean(block, axis=1, out=out)
+        else:
+            out[:] = block[:, int(self.mode)]
+        return out
+
+# Function to design the anti-aliasing filter used by the resampler
+def design_lowpass(up, down, taps_per_phase=24, rolloff=0.9, beta=8.0):
+    """
+    Design a Kaiser-windowed sinc low-pass filter for rational resampling by up/down.
+
+    Returns:
+    - Filter of length up * taps_per_phase, scaled by up to keep unity gain.
+    """
+    length = up * taps_per_phase
+    cutoff = rolloff * 0.5 / max(up, down)  # In cycles per upsampled sample
+    n = np.arange(length) - (length - 1) / 2
+    taps = 2 * cutoff * np.sinc(2 * cutoff * n) * np.kaiser(length, beta)
+    return (taps / np.sum(taps) * up).astype('float32')
+
+# Streaming rational-rate resampler (e.g., 48 kHz or 44.1 kHz to 16 kHz)
+class PolyphaseResampler:
+    """
+    Resample a stream block by block with a polyphase FIR filter.
+
+    Filter history is carried between blocks so the output is continuous, and all work
+    buffers are preallocated for max_frames input samples.
+
+    Parameters:
+    - input_rate: Sample rate of the incoming audio (e.g., 48000).
+    - output_rate: Desired sample rate (e.g., 16000).
+    - max_frames: Largest input block expected (buffers grow if a larger block arrives).
+    - taps_per_phase: Filter taps applied per output sample (quality vs. CPU).
+    """
+
+    def __init__(self, input_rate, output_rate, max_frames=4096, taps_per_phase=24):
+        divisor = gcd(int(input_rate), int(output_rate))
+        self.up = int(output_rate) // divisor
+        self.down = int(input_rate) // divisor
+        self.input_rate = input_rate
+        self.output_rate = output_rate
+        self.taps_per_phase = taps_per_phase
+        taps = design_lowpass(self.up, self.down, taps_per_phase)
+        # phases[p, c] multiplies the c-th oldest input sample of the window for output phase p
+        self._phases = taps.reshape(taps_per_phase, self.up).T[:, ::-1].copy()
+        self._history = taps_per_phase - 1
+        self._input_position = 0  # Absolute index of the first sample of the next block
+        self._output_position = 0  # Absolute index of the next output sample
+        self._offsets = np.arange(taps_per_phase)[::-1]  # Oldest tap first
+        self._allocate(max_frames)
+        self._extended[:self._history] = 0.0
+
+    def _allocate(self, max_frames):
+        """Preallocate work buffers for blocks of up to max_frames input samples."""
+        max_outputs = max_frames * self.up // self.down + 2
+        history = getattr(self, "_extended", None)
+        self._extended = np.zeros(self._history + max_frames, dtype='float32')
+        if history is not None:
+            self._extended[:self._history] = history[:self._history]
+        self._window_index = np.zeros((max_outputs, self.taps_per_phase), dtype=np.int64)
+        self._windows = np.zeros((max_outputs, self.taps_per_phase), dtype='float32')
+        self._coefficients = np.zeros((max_outputs, self.taps_per_phase), dtype='float32')
+        self._out = np.zeros(max_outputs, dtype='float32')
+        self._max_frames = max_frames
+
+    def process(self, samples):
+        """
+        Resample one block of mono audio.
+
+        Parameters:
+        - samples: 1-D float32 array at input_rate.
+
+        Returns:
+        - View of resampled audio at output_rate (valid until the next call).
+        """
+        frames = len(samples)
+        if frames > self._max_frames:
+            self._allocate(frames)
+        extended = self._extended[:self._history + frames]
+        extended[self._history:] = samples
+
+        # Output k uses input sample floor(k * down / up) and filter phase (k * down) % up
+        end_position = self._input_position + frames
+        last_output = (end_position * self.up - 1) // self.down  # Last output whose input has arrived
+        count = max(0, last_output - self._output_position + 1)
+        outputs = np.arange(self._output_position, self._output_position + count, dtype=np.int64)
+        scaled = outputs * self.down
+        newest = scaled // self.up - self._input_position + self._history
+        phases = scaled % self.up
+
+        index = self._window_index[:count]
+        np.subtract(newest[:, None], self._offsets[None, :], out=index)
+        windows = self._windows[:count]
+        np.take(extended, index, out=windows)
+        coefficients = self._coefficients[:count]
+        np.take(self._phases, phases, axis=0, out=coefficients)
+        np.multiply(windows, coefficients, out=windows)
+        out = self._out[:count]
+        np.sum(windows, axis=1, out=out)
+
+        # Keep the tail of this block as history for the next one
+        self._extended[:self._history] = extended[frames:]
+        self._input_position = end_position
+        self._output_position += count
+        return out
+
+    def reset(self):
+        """Forget the filter history (e.g., after a gap in the stream)."""
+        self._extended[:self._history] = 0.0
+        self._input_position = 0
+        self._output_position = 0
+
+# Capture-side preprocessing: downmix to mono, then resample to the ASR rate
+class AudioPreprocessor:
+    """
+    Turn raw device blocks into 16 kHz (or output_rate) mono audio.
+
+    Parameters:
+    - channels: Number of channels delivered by the device.
+    - input_rate: Native sample rate the device is opened at.
+    - output_rate: Sample rate expected by the ASR (default 16000 Hz).
+    - channel_mode: "mean" to average channels, or a channel index to select one.
+    - max_frames: Largest device block expected.
+    """
+
+    def __init__(self, channels, input_rate, output_rate=16000, channel_mode="mean", max_frames=4096):
+        self.downmixer = Downmixer(channels, channel_mode, max_frames)
+        self.resampler = None
+        if int(input_rate) != int(output_rate):
+            self.resampler = PolyphaseResampler(input_rate, output_rate, max_frames)
+
+    def process(self, block):
+        """Return the mono, resampled view of one device block."""
+        mono = self.downmixer.process(block)
+        if self.resampler is None:
+            return mono
+        return self.resampler.process(mono)
+
+    def reset(self):
+        if self.resampler is not None:
+            self.resampler.reset()
@@ -0,0 +1,157 @@
+import time
+import wave
+import threading
+import numpy as np
+from AudioCapture import AudioCaptureService
+from AudioPreprocess import AudioPreprocessor
+
+# Function to load a WAV or NumPy file for offline replay
+def load_audio(path, sample_rate=16000):
+    """
+    Load audio from a .wav (PCM) or .npy file.
+
+    Parameters:
+    - path: Path to the audio file.
+    - sample_rate: Sample rate assumed for .npy files (WAV files carry their own).
+
+    Returns:
+    - (audio, sample_rate) where audio is a float32 array of shape (frames, channels).
+    """
+    if str(path).lower().endswith(".npy"):
+        audio = np.load(path).astype('float32')
+        return audio.reshape(len(audio), -1), sample_rate
+
+    with wave.open(str(path), "rb") as wav_file:
+        channels = wav_file.getnchannels()
+        width = wav_file.getsampwidth()
+        rate = wav_file.getframerate()
+        raw = wav_file.readframes(wav_file.getnframes())
+
+    if width == 1:
+        audio = (np.frombuffer(raw, dtype=np.uint8).astype('float32') - 128) / 128
+    elif width == 2:
+        audio = np.frombuffer(raw, dtype='<i2').astype('float32') / 32768
+    elif width == 3:
+        packed = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3)
+        values = (packed[:, 0].astype(np.int32) | (packed[:, 1].astype(np.int32) << 8)
+                  | (packed[:, 2].astype(np.int32) << 16))
+        values = np.where(values >= 1 << 23, values - (1 << 24), values)
+        audio = values.astype('float32') / (1 << 23)
+    elif width == 4:
+        audio = np.frombuffer(raw, dtype='<i4').astype('float32') / 2147483648
+    else:
+        raise ValueError(f"Unsupported WAV sample width: {width} bytes")
+    return audio.reshape(-1, channels), rate
+
+# Stand-in for the live capture service that plays back recorded audio
+class ReplayCaptureService(AudioCaptureService):
+    """
+    Feed recorded audio through the same preprocessing and subscriptions as a live device.
+
+    In real-time mode blocks are released at the pace they were recorded; otherwise they are
+    released as fast as the consumers drain them (writes wait for buffer space instead of
+    overrunning). When the audio ends, subscriptions are closed so readers see the end.
+
+    Parameters:
+    - audio: Float array of shape (frames,) or (frames, channels).
+    - audio_sample_rate: Sample rate of audio.
+    - sample_rate: Sample rate delivered to subscribers (default 16000 Hz).
+    - realtime: True to replay at recording speed, False for maximum speed.
+    - blocksize: Frames per replayed block (default: 100 ms).
+    - channel_mode: "mean" to average the channels, or a channel index to keep only that one.
+    """
+
+    def __init__(self, audio, audio_sample_rate, sample_rate=16000, realtime=True,
+                 blocksize=None, channel_mode="mean"):
+        audio = np.asarray(audio, dtype='float32')
+        audio = audio.reshape(len(audio), -1)
+        super().__init__(device=None, sample_rate=sample_rate, channels=audio.shape[1],
+                         blocksize=blocksize or int(audio_sample_rate) // 10,
+                         device_sample_rate=int(audio_sample_rate), channel_mode=channel_mode)
+        self.audio = audio
+        self.realtime = realtime
+        self.started_at = None  # Wall-clock time the first block was released
+        self.finished = threading.Event()
+        self._stop_requested = threading.Event()
+        self._thread = None
+
+    @property
+    def duration(self):
+        """Length of the replayed audio in seconds."""
+        return len(self.audio) / self.device_sample_rate
+
+    @property
+    def running(self):
+        return self._thread is not None and not self.finished.is_set()
+
+    def _block_timestamp(self, frames, time_info):
+        # time_info carries the block's position in the recording
+        return self.started_at + time_info
+
+    def _replay(self):
+        """Release the recording block by block (runs in the replay thread)."""
+        rate = self.device_sample_rate
+        output_ratio = self.sample_rate / rate
+        self.started_at = time.time()
+        self._clock_offset = self.started_at
+        for position in range(0, len(self.audio), self.blocksize):
+            if self._stop_requested.is_set():
+                break
+            block = self.audio[position:position + self.blocksize]
+            if self.realtime:
+                # A block is only "captured" once its last frame has been recorded
+                delay = self.started_at + (position + len(block)) / rate - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+            else:
+                needed = int(len(block) * output_ratio) + 2
+                for subscription in self._targets:
+                    subscription.wait_for_space(needed)
+            self._callback(block, len(block), position / rate, None)
+        self.finished.set()
+        for subscription in self._targets:
+            subscription.close()
+
+    def start(self):
+        """Start replaying in a background thread (once)."""
+        with self._lock:
+            if self._thread is not None:
+                return self
+            self._preprocessor = AudioPreprocessor(self.channels, self.device_sample_rate,
+                                                   self.sample_rate, self.channel_mode,
+                                                   max_frames=self.blocksize)
+            self._thread = threading.Thread(target=self._replay, name="audio-replay")
+            self._thread.daemon = True
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop replaying and close every subscription."""
+        self._stop_requested.set()
+        if self._thread is not None:
+            self._thread.join()
+        for subscription in list(self._subscriptions.values()):
+            subscription.close()
+
+    def exhausted(self, name="GmeetHear"):
+        """True once the replay has ended and the named subscription has been drained."""
+        subscription = self._subscriptions.get(name)
+        return self.finished.is_set() and (subscription is None or subscription.available == 0)
+
+# Function to build a replay source from a file
+def replay_source(path, realtime=True, sample_rate=16000, channel_mode="mean"):
+    """
+    Create a ReplayCaptureService for a .wav or .npy file.
+
+    Parameters:
+    - path: Path to the recording.
+    - realtime: True to replay at recording speed, False for maximum speed.
+    - sample_rate: Sample rate delivered to subscribers (default 16000 Hz).
+    - channel_mode: "mean" to average the channels, or a channel index to keep only that one.
+
+    Returns:
+    - ReplayCaptureService (not yet started).
+    """
+    audio, audio_sample_rate = load_audio(path, sample_rate)
+    return ReplayCaptureService(audio, audio_sample_rate, sample_rate=sample_rate,
+                                realtime=realtime, channel_mode=channel_mode)
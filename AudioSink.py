@@ -0,0 +1,369 @@
+import sys
+import time
+import atexit
+import asyncio
+import threading
+from collections import deque
+import numpy as np
+from AudioBuffer import AudioRingBuffer
+from AudioPreprocess import AudioPreprocessor
+
+# Function to find an output device by (part of) its name
+def find_output_device(name=None, hostapi=None):
+    """
+    Resolve an output device name to a sounddevice index.
+
+    Parameters:
+    - name: Device index, (part of) a device name such as "CABLE Input", or None for the
+      default output device.
+    - hostapi: Optional (part of) a host API name such as "DirectSound" or "WASAPI", used
+      when the same device is listed once per host API.
+
+    Returns:
+    - Device index (or None for the default device).
+    """
+    if name is None or isinstance(name, int):
+        return name
+    import sounddevice as sd
+
+    hostapis = sd.query_hostapis()
+    for index, device in enumerate(sd.query_devices()):
+        if device['max_output_channels'] <= 0 or name.lower() not in device['name'].lower():
+            continue
+        if hostapi and hostapi.lower() not in hostapis[device['hostapi']]['name'].lower():
+            continue
+        return index
+    raise ValueError(f"No output device matching '{name}'"
+                     + (f" on host API '{hostapi}'" if hostapi else ""))
+
+# One utterance (or audio stream) queued on an output sink
+class Playback:
+    """
+    Handle for audio played through an AudioOutputSink.
+
+    Audio is downmixed and resampled to the sink's rate as it is written. Completion is
+    signalled through a threading event and asyncio futures, so nobody has to poll.
+
+    Parameters:
+    - sample_rate: Sample rate of the audio that will be written.
+    - output_rate: Sample rate of the output device.
+    - channels: Channels of the audio that will be written.
+    - capacity: Output samples buffered at most.
+    - prebuffer: Output samples buffered before playback starts (streamed audio only).
+    """
+
+    def __init__(self, sample_rate, output_rate, channels=1, capacity=None, prebuffer=0):
+        self.sample_rate = sample_rate
+        self.output_rate = output_rate
+        # Audio is converted about 0.1 s at a time so the resampler's work buffers stay small
+        self._block_frames = max(1, int(sample_rate) // 10)
+        self._preprocessor = AudioPreprocessor(channels, sample_rate, output_rate,
+                                               max_frames=self._block_frames)
+        self._buffer = AudioRingBuffer(capacity or int(30 * output_rate))
+        self._prebuffer = min(prebuffer, self._buffer.capacity)
+        self._primed = prebuffer <= 0
+        self._finished_writing = False
+        self._done = threading.Event()
+        self._waiters = []  # (loop, future) pairs of asyncio waiters
+        self._waiters_lock = threading.Lock()
+        self.cancelled = False
+        self.queued_at = time.perf_counter()
+        self.started_at = None  # perf_counter time the first sample reached the device
+        self.frames_played = 0
+        self.underruns = 0
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    @property
+    def buffered(self):
+        """Output samples written but not played yet."""
+        return self._buffer.available
+
+    def write(self, audio, timeout=None):
+        """
+        Append audio, waiting for buffer space if playback is behind.
+
+        Parameters:
+        - audio: Array of shape (frames,) or (frames, channels) at sample_rate.
+        - timeout: Maximum time to wait for space (None waits indefinitely).
+        """
+        if self.cancelled or not len(audio):
+            return
+        audio = np.asarray(audio, dtype='float32')
+        for start in range(0, len(audio), self._block_frames):
+            if self.cancelled:
+                return
+            samples = self._preprocessor.process(audio[start:start + self._block_frames])
+            self._buffer.wait_for_space(len(samples), timeout=timeout)
+            self._buffer.write(samples)
+        if not self._primed and self._buffer.available >= self._prebuffer:
+            self._primed = True
+
+    async def write_async(self, audio):
+        """write() for coroutines: waits for buffer space in an executor only when needed."""
+        samples_needed = int(len(audio) * self.output_rate / self.sample_rate) + 2
+        if self._buffer.capacity - self._buffer.available < samples_needed:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self.write, audio)
+        else:
+            self.write(audio)
+
+    def finish(self):
+        """Mark the end of the audio; the playback completes once it has been played."""
+        self._finished_writing = True
+        self._primed = True
+
+    def cancel(self):
+        """Stop this playback at the next device block and drop its remaining audio."""
+        if self._done.is_set():
+            return
+        self.cancelled = True
+        self._buffer.close()
+        self._complete()
+
+    def _read_into(self, out):
+        """Fill out from the buffer (called from the audio callback); returns samples copied."""
+        if not self._primed or self.cancelled:
+            return 0
+        samples = self._buffer.read_available(out, min_count=1, timeout=0)
+        if samples is None:
+            return 0
+        if self.started_at is None:
+            self.started_at = time.perf_counter()
+        self.frames_played += len(samples)
+        return len(samples)
+
+    @property
+    def _drained(self):
+        return self.cancelled or (self._finished_writing and self._buffer.available == 0)
+
+    def _complete(self):
+        """Wake every waiter (safe to call from any thread, more than once)."""
+        if self._done.is_set():
+            return
+        self._done.set()
+        with self._waiters_lock:
+            waiters, self._waiters = self._waiters, []
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_resolve, future)
+
+    def wait(self, timeout=None):
+        """Block until the playback has finished or was cancelled; False on timeout."""
+        return self._done.wait(timeout)
+
+    async def wait_async(self):
+        """Wait in a coroutine until the playback has finished or was cancelled."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._waiters_lock:
+            if self._done.is_set():
+                return
+            self._waiters.append((loop, future))
+        await future
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+# Long-lived output stream shared by every speaker for the whole session
+class AudioOutputSink:
+    """
+    Opens one sounddevice OutputStream and plays queued Playbacks back to back.
+
+    The stream stays open between utterances (outputting silence when idle), so there is
+    no per-utterance device setup, and play() returns immediately with a Playback that
+    signals its completion.
+
+    Parameters:
+    - device: Output device index, (part of) its name, or None for the default device.
+    - hostapi: Optional host API name used to pick between same-named devices.
+    - channels: Output channels (mono audio is copied to each).
+    - blocksize: Frames per callback block (default: 20 ms, which bounds stop latency).
+    - latency: Latency hint passed to sounddevice.
+    - device_sample_rate: Rate to open the device at (None uses the device's default rate).
+    - reference_duration: Seconds of output level history kept for echo suppression.
+    """
+
+    def __init__(self, device=None, hostapi=None, channels=1, blocksize=None, latency='low',
+                 device_sample_rate=None, reference_duration=10):
+        self.device = device
+        self.hostapi = hostapi
+        self.channels = channels
+        self.blocksize = blocksize
+        self.latency = latency
+        self.device_sample_rate = device_sample_rate
+        self._stream = None
+        self._lock = threading.Lock()
+        self._queue = deque()  # Playbacks in play order; the callback only reads the head
+        self._mix = np.zeros(0, dtype='float32')
+        self._clock_offset = 0.0  # Converts stream time to wall-clock time
+        self.reference_duration = reference_duration
+        # (wall-clock time the block is heard, RMS) of every output block: the known echo source
+        self.reference = deque()
+        self.status_count = 0  # Number of callbacks that reported underflow
+
+    @property
+    def running(self):
+        return self._stream is not None
+
+    @property
+    def busy(self):
+        """True while any playback is queued or playing."""
+        return bool(self._queue)
+
+    def _callback(self, outdata, frames, time_info, status):
+        """Copy the head playback(s) into the device buffer, silence when idle."""
+        if status:
+            self.status_count += 1
+            print(status, file=sys.stderr)
+        if len(self._mix) < frames:
+            self._mix = np.zeros(frames, dtype='float32')
+        out = self._mix[:frames]
+        filled = 0
+        queue = self._queue
+        while filled < frames and queue:
+            playback = queue[0]
+            copied = playback._read_into(out[filled:])
+            filled += copied
+            if playback._drained:
+                queue.popleft()
+                playback._complete()
+            elif not copied:
+                if playback._primed:
+                    playback.underruns += 1  # Writer is behind: play silence meanwhile
+                break
+        out[filled:] = 0
+        outdata[:] = out[:, None]
+
+        try:
+            heard_at = time_info.outputBufferDacTime + self._clock_offset
+        except AttributeError:
+            heard_at = time.time()
+        if heard_at <= self._clock_offset:
+            heard_at = time.time()  # Some host APIs report no DAC time
+        self.reference.append((heard_at, float(np.sqrt(np.dot(out, out) / frames)) if filled else 0.0))
+        if len(self.reference) > self.reference_duration * self.device_sample_rate / frames:
+            self.reference.popleft()
+
+    def start(self):
+        """Open the output stream if it is not already running."""
+        import sounddevice as sd
+
+        with self._lock:
+            if self._stream is not None:
+                return self
+            device = find_output_device(self.device, self.hostapi)
+            if self.device_sample_rate is None:
+                # Open at the native rate so the driver does not have to convert
+                self.device_sample_rate = int(sd.query_devices(device, 'output')['default_samplerate'])
+            blocksize = self.blocksize or self.device_sample_rate // 50
+            self._mix = np.zeros(blocksize, dtype='float32')
+            stream = sd.OutputStream(channels=self.channels, samplerate=self.device_sample_rate,
+                                     callback=self._callback, dtype='float32',
+                                     blocksize=blocksize, latency=self.latency, device=device)
+            self._clock_offset = time.time() - stream.time
+            stream.start()
+            self._stream = stream
+        return self
+
+    def stop(self):
+        """Cancel everything queued and close the output stream."""
+        self.stop_all()
+        with self._lock:
+            stream, self._stream = self._stream, None
+        if stream is not None:
+            stream.stop()
+            stream.close()
+
+    def open_stream(self, sample_rate, channels=1, buffer_duration=30, prebuffer_duration=0.0):
+        """
+        Queue a playback that is written incrementally (e.g., while TTS is still streaming).
+
+        Parameters:
+        - sample_rate: Sample rate of the audio that will be written.
+        - channels: Channels of the audio that will be written.
+        - buffer_duration: Seconds of audio buffered at most.
+        - prebuffer_duration: Seconds buffered before playback starts (guards against underruns).
+
+        Returns:
+        - Playback; call write() for each piece and finish() at the end.
+        """
+        self.start()
+        rate = self.device_sample_rate
+        playback = Playback(sample_rate, rate, channels, capacity=int(buffer_duration * rate),
+                            prebuffer=int(prebuffer_duration * rate))
+        self._queue.append(playback)
+        return playback
+
+    def play(self, audio, sample_rate):
+        """
+        Queue complete audio without blocking.
+
+        Parameters:
+        - audio: Array of shape (frames,) or (frames, channels).
+        - sample_rate: Sample rate of audio.
+
+        Returns:
+        - Playback; wait() or await wait_async() to know when it has been played.
+        """
+        self.start()
+        audio = np.asarray(audio, dtype='float32')
+        audio = audio.reshape(len(audio), -1)
+        rate = self.device_sample_rate
+        playback = Playback(sample_rate, rate, audio.shape[1],
+                            capacity=int(len(audio) * rate / sample_rate) + 64)
+        playback.write(audio)
+        playback.finish()
+        self._queue.append(playback)
+        return playback
+
+    def stop_all(self):
+        """Cancel every queued and playing playback (output goes silent within one block)."""
+        for playback in list(self._queue):
+            playback.cancel()
+
+    def stats(self):
+        """Return stream state and queue length."""
+        return {
+            "running": self.running,
+            "queued": len(self._queue),
+            "device_sample_rate": self.device_sample_rate,
+            "status_count": self.status_count,
+        }
+
+_sinks = {}
+_sinks_lock = threading.Lock()
+
+# Function to get the process-wide output sink for a device
+def get_output_sink(device=None, hostapi=None, channels=1):
+    """
+    Return the shared, started output sink for the given device.
+
+    Parameters:
+    - device: Output device index, (part of) its name, or None for the default device.
+    - hostapi: Optional host API name used to pick between same-named devices.
+    - channels: Output channels.
+
+    Returns:
+    - Running AudioOutputSink (the same instance on every call).
+    """
+    key = (device, hostapi, channels)
+    with _sinks_lock:
+        sink = _sinks.get(key)
+        if sink is None:
+            sink = AudioOutputSink(device=device, hostapi=hostapi, channels=channels)
+            _sinks[key] = sink
+    return sink.start()
+
+# Function to close every output sink (called automatically at exit)
+def shutdown_output_sinks():
+    """Stop all shared output sinks and forget them."""
+    with _sinks_lock:
+        sinks = list(_sinks.values())
+        _sinks.clear()
+    for sink in sinks:
+        sink.stop()
+
+atexit.register(shutdown_output_sinks)
@@ -0,0 +1,214 @@
+import time
+import threading
+from collections import deque
+import numpy as np
+from VoiceActivity import FrameVAD
+
+# Energy-based gate that ignores the bot's own voice coming back through the capture path
+class EchoGate:
+    """
+    Suppress self-echo using the known output signal.
+
+    The output sink records the level of every block it plays. The gate estimates the
+    echo path's delay (by correlating the captured and played level envelopes) and gain
+    (median level ratio), then only lets a frame count as speech when its level is at
+    least margin times the echo predicted from what was played. This is a double-talk
+    detector, not a full echo canceller: it decides whether someone else is talking, it
+    does not clean the audio.
+
+    Parameters:
+    - sink: AudioOutputSink whose reference levels are used.
+    - frame_duration: Duration of the analysed capture frames (seconds).
+    - margin: Factor the captured level must exceed the predicted echo by.
+    - max_delay: Largest echo delay searched for (seconds).
+    - history_duration: Seconds of captured levels used for the estimate.
+    - update_interval: Seconds between delay/gain re-estimates.
+    - initial_gain: Echo gain assumed until it has been measured (1.0 assumes the echo is as
+      loud as the output, so the start of playback cannot trigger a false barge-in).
+    """
+
+    def __init__(self, sink, frame_duration=0.02, margin=2.0, max_delay=0.5,
+                 history_duration=3.0, update_interval=1.0, initial_gain=1.0):
+        self.sink = sink
+        self.frame_duration = frame_duration
+        self.margin = margin
+        self.max_delay = max_delay
+        self.update_interval = update_interval
+        self._history = deque(maxlen=int(history_duration / frame_duration))  # (time, rms)
+        self._last_update = 0.0
+        self.delay = 0.0
+        self.gain = initial_gain
+
+    def _reference_at(self, times):
+        """Played level at each wall-clock time (0 where nothing was played)."""
+        reference = list(self.sink.reference)
+        if not reference:
+            return np.zeros(len(times))
+        ref_times, ref_levels = np.array(reference).T
+        return np.interp(times, ref_times, ref_levels, left=0.0, right=0.0)
+
+    def _estimate(self):
+        """Re-estimate delay and gain from the captured level history."""
+        if len(self._history) < 25:
+            return
+        times, levels = np.array(self._history).T
+        best_score, best_delay = 0.3, None  # Below this correlation the delay is not trusted
+        for delay in np.arange(0.0, self.max_delay + 1e-9, self.frame_duration):
+            reference = self._reference_at(times - delay)
+            if reference.std() < 1e-6:
+                continue  # Nothing (or a constant level) was played: the delay is not observable
+            score = np.corrcoef(levels, reference)[0, 1]
+            if score > best_score:
+                best_score, best_delay = score, delay
+        if best_delay is not None:
+            self.delay = best_delay
+        reference = self._reference_at(times - self.delay)
+        playing = reference > 1e-3
+        if playing.sum() >= 10:
+            # The median keeps the participant's own speech from inflating the estimate
+            self.gain = float(np.median(levels[playing] / reference[playing]))
+
+    def speech_mask(self, times, levels):
+        """
+        Update the echo estimate and flag frames louder than the predicted echo.
+
+        Parameters:
+        - times: Wall-clock capture time of each frame.
+        - levels: RMS of each captured frame.
+
+        Returns:
+        - Boolean array, True where the frame is not explained by echo.
+        """
+        self._history.extend(zip(times, levels))
+        now = time.monotonic()
+        if now - self._last_update >= self.update_interval:
+            self._last_update = now
+            self._estimate()
+        predicted = self.gain * self._reference_at(np.asarray(times) - self.delay)
+        return np.asarray(levels) > self.margin * predicted
+
+# Listens while the bot speaks and stops playback when a participant talks over it
+class BargeInMonitor:
+    """
+    Full-duplex listener: keeps reading the shared capture service during playback and
+    cancels everything queued on the output sink as soon as sustained speech is heard.
+
+    The monitor has its own capture subscription, so the transcription subscription keeps
+    buffering the participant's words. A listener that keeps transcribing during playback
+    should gate the bot's own voice out with an EchoGate of its own (see start_transcription);
+    one that starts only after the interruption can pass speech_started_at as `since`.
+
+    Parameters:
+    - capture_service: Running AudioCaptureService (or replay source) to listen to.
+    - sink: AudioOutputSink to interrupt.
+    - sample_rate: Sample rate of the capture subscription.
+    - start_threshold / stop_threshold: Frame VAD thresholds (absolute RMS).
+    - min_speech_duration: Seconds of continuous speech needed to interrupt.
+    - frame_duration: VAD frame length (seconds); also the read granularity.
+    - echo_suppression: Whether to ignore frames explained by the bot's own output.
+    - name: Name of the capture subscription.
+    """
+
+    def __init__(self, capture_service, sink, sample_rate=16000, start_threshold=0.03,
+                 stop_threshold=0.015, min_speech_duration=0.15, frame_duration=0.02,
+                 echo_suppression=True, name="BargeIn"):
+        self.capture_service = capture_service
+        self.sink = sink
+        self.sample_rate = sample_rate
+        self.min_speech_frames = max(1, int(round(min_speech_duration / frame_duration)))
+        self.name = name
+        self.vad = FrameVAD(sample_rate, frame_duration=frame_duration,
+                            start_threshold=start_threshold, stop_threshold=stop_threshold)
+        self.echo_gate = EchoGate(sink, self.vad.frame_duration) if echo_suppression else None
+        self.interrupted = threading.Event()
+        self.speech_started_at = None  # Wall-clock time the interrupting speech began
+        self.detection_latency = None  # Seconds from speech start to playback stop
+        self.count = 0  # Number of barge-ins so far
+        self._listeners = []
+        self._listeners_lock = threading.Lock()
+        self._running = threading.Event()
+        self._thread = None
+
+    def add_listener(self, callback):
+        """Call callback() (from the monitor thread) on every barge-in."""
+        with self._listeners_lock:
+            self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        with self._listeners_lock:
+            if callback in self._listeners:
+                self._listeners.remove(callback)
+
+    def clear(self):
+        """Reset the interrupted flag before the next utterance."""
+        self.interrupted.clear()
+
+    def _trigger(self, speech_started_at):
+        """Stop playback and notify listeners."""
+        self.sink.stop_all()
+        self.speech_started_at = speech_started_at
+        self.detection_latency = time.time() - speech_started_at
+        self.count += 1
+        self.interrupted.set()
+        print(f"Barge-in detected ({self.detection_latency * 1000:.0f} ms after speech started). "
+              "Stopping playback.")
+        with self._listeners_lock:
+            listeners = list(self._listeners)
+        for callback in listeners:
+            callback()
+
+    def _run(self, subscription):
+        block_size = self.vad.frame_size * 2  # Two frames per read keeps reaction time low
+        block = np.zeros(block_size, dtype='float32')
+        speech_frames = 0
+        speech_started_at = None
+        while self._running.is_set():
+            samples, timestamp = subscription.read_timed(block_size, out=block, timeout=0.5)
+            if samples is None:
+                if subscription._closed:
+                    break
+                continue
+            if not self.sink.busy:
+                # Only listen for interruptions while the bot is talking
+                self.vad.reset()
+                speech_frames = 0
+                continue
+
+            frames, mask = self.vad.process_frames(samples)
+            if not len(frames):
+                continue
+            levels = np.sqrt(np.mean(np.square(frames), axis=1))
+            mask &= levels >= self.vad.stop_threshold  # Ignore the VAD hangover here
+            # Reads are whole frames, so the VAD never carries samples over between blocks
+            frame_times = timestamp + np.arange(len(frames)) * self.vad.frame_duration
+            if self.echo_gate is not None:
+                mask &= self.echo_gate.speech_mask(frame_times, levels)
+
+            for frame_time, speech in zip(frame_times, mask):
+                if not speech:
+                    speech_frames = 0
+                    continue
+                if speech_frames == 0:
+                    speech_started_at = frame_time
+                speech_frames += 1
+                if speech_frames == self.min_speech_frames:
+                    self._trigger(speech_started_at)
+
+    def start(self):
+        """Subscribe to the capture service and start listening (once)."""
+        if self._thread is None:
+            subscription = self.capture_service.subscribe(self.name, buffer_duration=2)
+            self.capture_service.start()
+            self._running.set()
+            self._thread = threading.Thread(target=self._run, args=(subscription,), name="barge-in")
+            self._thread.daemon = True
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop listening and drop the capture subscription."""
+        self._running.clear()
+        self.capture_service.unsubscribe(self.name)
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
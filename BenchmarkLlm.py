@@ -0,0 +1,208 @@
+import json
+import time
+import random
+import asyncio
+import argparse
+import threading
+import numpy as np
+from LlmClient import OpenAiCompatibleChat, HedgedLlm
+
+# Local OpenAI-compatible chat server with injectable latency, for offline tests and benchmarks
+class StandInLlmServer:
+    """
+    Server for POST /v1/chat/completions (plain and streamed) that answers with a fixed
+    reply after a configurable delay. Runs on its own thread; requires aiohttp.
+
+    The delay before the first token is base_latency, except that a share
+    tail_probability of requests take tail_latency instead (a slow replica, a queue).
+    Pass latency, a function () -> seconds, to inject any other distribution. The
+    attributes can be changed while the server runs.
+
+    Parameters:
+    - host: Interface to listen on.
+    - port: Port to listen on (0 picks a free port).
+    - base_latency: Usual seconds before the first token.
+    - tail_latency: Seconds before the first token of a slow request.
+    - tail_probability: Share of slow requests.
+    - seconds_per_token: Delay between streamed tokens.
+    - reply: Text of every answer.
+    - latency: Optional function () -> seconds replacing the two-level distribution.
+    - seed: Seed of the random tail selection.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, base_latency=0.3, tail_latency=4.0, tail_probability=0.1,
+                 seconds_per_token=0.01, reply="Thanks for the update. Please share the test results by Friday.",
+                 latency=None, seed=None):
+        self.host = host
+        self.port = port
+        self.base_latency = base_latency
+        self.tail_latency = tail_latency
+        self.tail_probability = tail_probability
+        self.seconds_per_token = seconds_per_token
+        self.reply = reply
+        self.latency = latency
+        self.requests = 0
+        self._random = random.Random(seed)
+        self._loop = None
+        self._runner = None
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}/v1"
+
+    def _delay(self):
+        if self.latency is not None:
+            return self.latency()
+        if self._random.random() < self.tail_probability:
+            return self.tail_latency
+        return self.base_latency
+
+    async def _handle(self, request):
+        from aiohttp import web
+
+        body = await request.json()
+        self.requests += 1
+        created = int(time.time())
+        await asyncio.sleep(self._delay())
+
+        if not body.get("stream"):
+            return web.json_response({
+                "id": f"chatcmpl-{self.requests}", "object": "chat.completion", "created": created,
+                "model": body.get("model", "stand-in"),
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": self.reply}}],
+            })
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        words = self.reply.split(" ")
+        try:
+            await response.prepare(request)
+            for index, word in enumerate(words):
+                if index:
+                    await asyncio.sleep(self.seconds_per_token)
+                content = word + (" " if index < len(words) - 1 else "")
+                chunk = {"id": f"chatcmpl-{self.requests}", "object": "chat.completion.chunk",
+                         "created": created, "model": body.get("model", "stand-in"),
+                         "choices": [{"index": 0, "delta": {"content": content}, "finish_reason": None}]}
+                await response.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            await response.write(b"data: [DONE]\n\n")
+            await response.write_eof()
+        except ConnectionResetError:
+            pass  # The client gave up on this request (e.g., a cancelled hedge)
+        return response
+
+    async def _serve(self):
+        from aiohttp import web
+
+        application = web.Application()
+        application.router.add_post("/v1/chat/completions", self._handle)
+        self._runner = web.AppRunner(application)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    def start(self):
+        """Start serving on a background thread; returns self (see url)."""
+        if self._thread is None:
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._loop.run_forever, name="llm-stand-in")
+            self._thread.daemon = True
+            self._thread.start()
+            asyncio.run_coroutine_threadsafe(self._serve(), self._loop).result(timeout=10)
+        return self
+
+    def stop(self):
+        """Stop serving and close every connection."""
+        if self._thread is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result(timeout=10)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._thread = None
+
+# Function to compare first-token latency with and without hedging and deadlines
+def benchmark_hedging(base_url, requests=50, deadline=2.0, hedge_percentile=95):
+    """
+    Stream the same prompt repeatedly with the plain client and with HedgedLlm.
+
+    Parameters:
+    - base_url: URL of an OpenAI-compatible server (up to "/v1").
+    - requests: Requests per mode.
+    - deadline: Turn deadline of HedgedLlm (seconds).
+    - hedge_percentile: Latency percentile after which HedgedLlm hedges.
+
+    Returns:
+    - Dictionary with first-token latency percentiles per mode and HedgedLlm's counts.
+    """
+    prompt = "Summarize the status of the automation project."
+
+    async def run(llm):
+        latencies = []
+        for _ in range(requests):
+            started = time.perf_counter()
+            async for _ in llm.astream(prompt):
+                latencies.append(time.perf_counter() - started)
+                break
+        return latencies
+
+    async def run_modes():
+        plain = OpenAiCompatibleChat(base_url)
+        hedged = HedgedLlm(OpenAiCompatibleChat(base_url), deadline=deadline,
+                           hedge_percentile=hedge_percentile, initial_hedge_delay=deadline / 2)
+        try:
+            return await run(plain), await run(hedged), hedged.stats()
+        finally:
+            await plain.close()
+            await hedged.llm.close()
+
+    def summary(samples):
+        p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+        return {"p50": round(float(p50), 3), "p95": round(float(p95), 3), "p99": round(float(p99), 3),
+                "max": round(max(samples), 3)}
+
+    plain, hedged, stats = asyncio.run(run_modes())
+    return {
+        "requests": requests,
+        "plain": summary(plain),
+        "hedged": summary(hedged),
+        "hedged_counts": {name: stats[name] for name in
+                          ("hedged", "hedge_wins", "deadline_missed", "errors")},
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark hedged LLM requests.")
+    parser.add_argument("--url", help="OpenAI-compatible server URL up to /v1 (default: a local stand-in)")
+    parser.add_argument("--requests", type=int, default=50, help="Number of requests per mode")
+    parser.add_argument("--deadline", type=float, default=2.0, help="Turn deadline (seconds)")
+    parser.add_argument("--base-latency", type=float, default=0.3,
+                        help="Usual first-token delay of the stand-in server (seconds)")
+    parser.add_argument("--tail-latency", type=float, default=4.0,
+                        help="First-token delay of slow stand-in requests (seconds)")
+    parser.add_argument("--tail-probability", type=float, default=0.1,
+                        help="Share of slow stand-in requests")
+    parser.add_argument("--output", help="Append results as JSON lines to this file")
+    args = parser.parse_args(argv)
+
+    server = None
+    url = args.url
+    if url is None:
+        server = StandInLlmServer(base_latency=args.base_latency, tail_latency=args.tail_latency,
+                                  tail_probability=args.tail_probability, seed=0).start()
+        url = server.url
+    try:
+        results = benchmark_hedging(url, requests=args.requests, deadline=args.deadline)
+    finally:
+        if server is not None:
+            server.stop()
+    print(json.dumps(results))
+
+    if args.output:
+        with open(args.output, "a", encoding="utf-8") as output_file:
+            output_file.write(json.dumps(results) + "\n")
+    return results
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+import sys
+import json
+import time
+import argparse
+import numpy as np
+from GmeetHear import start_transcription
+from AsrBackends import get_backend
+from AudioReplay import ReplayCaptureService, load_audio
+from AudioPreprocess import AudioPreprocessor
+from VoiceActivity import FrameVAD
+from RepetitionFilter import RepetitionFilter
+
+# Function to read the resident memory of this process (in MB)
+def resident_memory_mb():
+    """Current RSS via psutil when installed, else the peak RSS reported by the OS."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 if sys.platform != "darwin" else peak / (1024 * 1024)
+
+# Function to generate speech-like test audio when no recording is given
+def synthetic_speech(duration=30, sample_rate=16000, burst=2.0, pause=1.0, seed=0):
+    """
+    Build alternating voiced bursts and pauses (exercises gating and endpointing, not WER).
+
+    Returns:
+    - float32 array at sample_rate.
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(burst * sample_rate)) / sample_rate
+    pieces = []
+    while sum(len(p) for p in pieces) < duration * sample_rate:
+        pitch = rng.uniform(100, 220)
+        voiced = sum(np.sin(2 * np.pi * pitch * h * t) / h for h in range(1, 6))
+        envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 4 * t) ** 2  # Syllable-rate modulation
+        pieces.append((0.1 * voiced * envelope).astype('float32'))
+        pieces.append((0.001 * rng.standard_normal(int(pause * sample_rate))).astype('float32'))
+    return np.concatenate(pieces)[:int(duration * sample_rate)]
+
+# Function to find when each utterance in a recording ends
+def speech_end_times(audio, audio_sample_rate, sample_rate=16000, **vad_options):
+    """
+    Run the frame VAD over a whole recording and return the end time of every utterance.
+
+    Returns:
+    - Sorted array of end times in seconds.
+    """
+    mono = AudioPreprocessor(audio.shape[1], audio_sample_rate, sample_rate,
+                             max_frames=len(audio)).process(audio)
+    vad = FrameVAD(sample_rate, **vad_options)
+    mask = vad.process(mono)
+    ends = np.flatnonzero(mask[:-1] & ~mask[1:]) + 1
+    if len(mask) and mask[-1]:
+        ends = np.append(ends, len(mask))
+    return ends * vad.frame_duration
+
+# Function to replay a recording through start_transcription turn after turn
+def run_replay(audio, audio_sample_rate, model_type, chunk_duration, backend="whisper",
+               realtime=False, transcription_options=None):
+    """
+    Transcribe a recording with the same chunking, gating and repetition logic as a meeting.
+
+    Returns:
+    - Dictionary with transcripts, turn return times (seconds into the replay) and
+      wall/CPU time spent.
+    """
+    source = ReplayCaptureService(audio, audio_sample_rate, realtime=realtime)
+    # Each run gets its own repetition filter so runs do not influence each other
+    options = dict(transcription_options or {})
+    options.setdefault("repetition_filter",
+                       RepetitionFilter(limit=options.get("repeating_word_limit", 5)))
+    transcripts = []
+    turn_times = []
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    while not source.exhausted():
+        transcripts.append(start_transcription(
+            chunk_duration=chunk_duration, model_type=model_type, backend=backend,
+            capture_service=source, **options
+        ))
+        turn_times.append(time.time() - source.started_at)
+    result = {
+        "transcripts": transcripts,
+        "turn_times": turn_times,
+        "wall_time": time.perf_counter() - wall_start,
+        "cpu_time": time.process_time() - cpu_start,
+    }
+    source.stop()
+    return result
+
+# Function to benchmark one model / chunk duration combination
+def benchmark(audio, audio_sample_rate, model_type, chunk_duration, backend="whisper",
+              measure_latency=True, transcription_options=None):
+    """
+    Measure real-time factor, CPU, memory and end-of-speech-to-transcript latency.
+
+    Returns:
+    - Dictionary of metrics for this configuration.
+    """
+    duration = len(audio) / audio_sample_rate
+    load_start = time.perf_counter()
+    get_backend(backend, model_type).load()  # Keep model loading out of the timings
+    load_time = time.perf_counter() - load_start
+
+    fast = run_replay(audio, audio_sample_rate, model_type, chunk_duration, backend,
+                      realtime=False, transcription_options=transcription_options)
+    metrics = {
+        "model_type": model_type,
+        "backend": backend,
+        "chunk_duration": chunk_duration,
+        "audio_seconds": round(duration, 2),
+        "load_seconds": round(load_time, 2),
+        "real_time_factor": round(fast["wall_time"] / duration, 4),
+        "cpu_seconds_per_audio_second": round(fast["cpu_time"] / duration, 4),
+        "resident_memory_mb": round(resident_memory_mb(), 1),
+        "turns": len(fast["transcripts"]),
+        "transcript": " ".join(t for t in fast["transcripts"] if t).strip(),
+    }
+
+    if measure_latency:
+        # Latency only makes sense when audio arrives at recording speed
+        options = transcription_options or {}
+        ends = speech_end_times(audio, audio_sample_rate,
+                                start_threshold=options.get("loudness_start_threshold", 0.03),
+                                stop_threshold=options.get("loudness_stop_threshold", 0.015))
+        live = run_replay(audio, audio_sample_rate, model_type, chunk_duration, backend,
+                          realtime=True, transcription_options=transcription_options)
+        latencies = []
+        for returned_at, transcript in zip(live["turn_times"], live["transcripts"]):
+            finished = ends[ends <= returned_at]
+            if transcript and len(finished):
+                latencies.append(returned_at - finished[-1])
+        if latencies:
+            metrics["latency_p50"] = round(float(np.percentile(latencies, 50)), 3)
+            metrics["latency_p95"] = round(float(np.percentile(latencies, 95)), 3)
+            metrics["latency_max"] = round(float(np.max(latencies)), 3)
+    return metrics
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark offline transcription throughput and latency.")
+    parser.add_argument("audio", nargs="?", help="WAV or .npy recording (omit to use --synthetic)")
+    parser.add_argument("--synthetic", type=float, default=30,
+                        help="Seconds of synthetic speech-like audio when no recording is given")
+    parser.add_argument("--sample-rate", type=int, default=16000, help="Sample rate of .npy input")
+    parser.add_argument("--models", nargs="+", default=["base.en"], help="Model types to compare")
+    parser.add_argument("--chunk-durations", nargs="+", type=int, default=[8],
+                        help="Chunk durations (seconds) to compare")
+    parser.add_argument("--backend", default="whisper", help="ASR backend name")
+    parser.add_argument("--no-latency", action="store_true",
+                        help="Skip the real-time replay used to measure latency")
+    parser.add_argument("--output", help="Append results as JSON lines to this file")
+    args = parser.parse_args(argv)
+
+    if args.audio:
+        audio, audio_sample_rate = load_audio(args.audio, args.sample_rate)
+    else:
+        audio, audio_sample_rate = synthetic_speech(args.synthetic).reshape(-1, 1), 16000
+
+    results = []
+    for model_type in args.models:
+        for chunk_duration in args.chunk_durations:
+            metrics = benchmark(audio, audio_sample_rate, model_type, chunk_duration,
+                                backend=args.backend, measure_latency=not args.no_latency)
+            results.append(metrics)
+            print(json.dumps({k: v for k, v in metrics.items() if k != "transcript"}))
+
+    if args.output:
+        with open(args.output, "a", encoding="utf-8") as output_file:
+            for metrics in results:
+                output_file.write(json.dumps(metrics) + "\n")
+    return results
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+import re
+import json
+import time
+import asyncio
+import argparse
+import threading
+import numpy as np
+from TtsPool import TtsConnectionPool, parse_message
+
+# Silent MPEG-2 Layer III frame: 24 kHz, 48 kbps, mono, 576 samples (24 ms) in 144 bytes
+SILENT_MP3_FRAME = bytes([0xFF, 0xF3, 0x64, 0xC0]) + bytes(140)
+
+# Local server speaking the edge_tts websocket protocol, for offline tests and benchmarks
+class StandInTtsServer:
+    """
+    Websocket server that answers edge_tts requests with silent MP3 audio.
+
+    Delays stand in for network costs: handshake_delay is paid once per connection
+    (TCP + TLS + websocket upgrade), first_audio_delay once per request. Runs on its own
+    thread; requires aiohttp (installed with edge_tts).
+
+    Parameters:
+    - host: Interface to listen on.
+    - port: Port to listen on (0 picks a free port).
+    - handshake_delay: Seconds added to every new connection.
+    - first_audio_delay: Seconds between a request and its first audio chunk.
+    - seconds_per_word: Length of the returned audio per word of text.
+    - chunk_frames: MP3 frames per audio message.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, handshake_delay=0.15, first_audio_delay=0.05,
+                 seconds_per_word=0.3, chunk_frames=32):
+        self.host = host
+        self.port = port
+        self.handshake_delay = handshake_delay
+        self.first_audio_delay = first_audio_delay
+        self.seconds_per_word = seconds_per_word
+        self.chunk_frames = chunk_frames
+        self.connections = 0
+        self.requests = 0
+        self._loop = None
+        self._runner = None
+        self._thread = None
+        self._websockets = set()
+
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}/edge/v1"
+
+    async def _handle(self, request):
+        from aiohttp import web
+
+        await asyncio.sleep(self.handshake_delay)
+        websocket = web.WebSocketResponse()
+        await websocket.prepare(request)
+        self.connections += 1
+        self._websockets.add(websocket)
+        try:
+            await self._serve_requests(websocket)
+        finally:
+            self._websockets.discard(websocket)
+        return websocket
+
+    async def _serve_requests(self, websocket):
+        from aiohttp import WSMsgType
+
+        async for message in websocket:
+            if message.type != WSMsgType.TEXT:
+                continue
+            headers, body = parse_message(message.data)
+            if headers.get("Path") != "ssml":
+                continue  # speech.config needs no answer
+            self.requests += 1
+            request_id = headers.get("X-RequestId", "")
+            await websocket.send_str(f"X-RequestId:{request_id}\r\nPath:turn.start\r\n\r\n{{}}")
+            await asyncio.sleep(self.first_audio_delay)
+
+            words = max(1, len(re.sub(r"<[^>]+>", " ", body).split()))
+            frames = int(np.ceil(words * self.seconds_per_word / 0.024))
+            header = (f"X-RequestId:{request_id}\r\nContent-Type:audio/mpeg\r\n"
+                      "Path:audio\r\n").encode("utf-8")
+            for start in range(0, frames, self.chunk_frames):
+                count = min(self.chunk_frames, frames - start)
+                await websocket.send_bytes(len(header).to_bytes(2, "big") + header
+                                           + SILENT_MP3_FRAME * count)
+            await websocket.send_str(f"X-RequestId:{request_id}\r\nPath:turn.end\r\n\r\n{{}}")
+
+    async def _serve(self, started):
+        from aiohttp import web
+
+        application = web.Application()
+        application.router.add_get("/edge/v1", self._handle)
+        self._runner = web.AppRunner(application)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        started.set()
+
+    async def _shutdown(self):
+        for websocket in list(self._websockets):
+            await websocket.close()
+        await self._runner.cleanup()
+
+    def start(self):
+        """Start serving on a background thread; returns self (see url)."""
+        if self._thread is None:
+            started = threading.Event()
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._loop.run_forever, name="tts-stand-in")
+            self._thread.daemon = True
+            self._thread.start()
+            asyncio.run_coroutine_threadsafe(self._serve(started), self._loop).result(timeout=10)
+            started.wait()
+        return self
+
+    def stop(self):
+        """Stop serving and close every connection."""
+        if self._thread is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result(timeout=10)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._thread = None
+
+# Function to time sentences synthesized with fresh connections and with the pool
+def benchmark_connection_reuse(url, sentences, voice="en-IN-NeerjaNeural", pool_size=2):
+    """
+    Synthesize each sentence once per request mode and compare time to first audio.
+
+    Parameters:
+    - url: Websocket URL of an edge_tts compatible server.
+    - sentences: Texts to synthesize, one request each.
+    - voice: Voice requested.
+    - pool_size: Connections of the pool.
+
+    Returns:
+    - Dictionary with first-audio and total latency percentiles per mode.
+    """
+
+    async def run(pool_factory):
+        first_audio, totals = [], []
+        pool = pool_factory()
+        try:
+            for sentence in sentences:
+                started = time.perf_counter()
+                first = None
+                async for _ in pool.stream(sentence, voice):
+                    if first is None:
+                        first = time.perf_counter() - started
+                first_audio.append(first)
+                totals.append(time.perf_counter() - started)
+            stats = pool.stats()
+        finally:
+            pool.close()
+        return first_audio, totals, stats
+
+    def summary(samples):
+        p50, p95 = np.percentile(samples, [50, 95])
+        return {"p50": round(float(p50), 3), "p95": round(float(p95), 3)}
+
+    results = {"sentences": len(sentences)}
+    # max_requests=1 replaces the connection after every request, like edge_tts.Communicate
+    modes = {
+        "fresh": lambda: TtsConnectionPool(size=1, url=url, max_requests=1),
+        "pooled": lambda: TtsConnectionPool(size=pool_size, url=url),
+    }
+    for mode, pool_factory in modes.items():
+        first_audio, totals, stats = asyncio.run(run(pool_factory))
+        results[mode] = {
+            "first_audio": summary(first_audio),
+            "total": summary(totals),
+            "connections": stats["connections"],
+        }
+    results["first_audio_saved_p50"] = round(
+        results["fresh"]["first_audio"]["p50"] - results["pooled"]["first_audio"]["p50"], 3
+    )
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark TTS connection reuse.")
+    parser.add_argument("--url", help="Websocket URL of a TTS server (default: a local stand-in)")
+    parser.add_argument("--sentences", type=int, default=20, help="Number of requests per mode")
+    parser.add_argument("--handshake-delay", type=float, default=0.15,
+                        help="Connection setup cost simulated by the stand-in server (seconds)")
+    parser.add_argument("--first-audio-delay", type=float, default=0.05,
+                        help="Per-request delay simulated by the stand-in server (seconds)")
+    parser.add_argument("--output", help="Append results as JSON lines to this file")
+    args = parser.parse_args(argv)
+
+    sentences = [f"This is test sentence number {i + 1} of the benchmark." for i in range(args.sentences)]
+    server = None
+    url = args.url
+    if url is None:
+        server = StandInTtsServer(handshake_delay=args.handshake_delay,
+                                  first_audio_delay=args.first_audio_delay).start()
+        url = server.url
+    try:
+        results = benchmark_connection_reuse(url, sentences)
+    finally:
+        if server is not None:
+            server.stop()
+    print(json.dumps(results))
+
+    if args.output:
+        with open(args.output, "a", encoding="utf-8") as output_file:
+            output_file.write(json.dumps(results) + "\n")
+    return results
+
+if __name__ == "__main__":
+    main()
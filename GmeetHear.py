@@ -1,191 +1,343 @@
-import sounddevice as sd
-import numpy as np
-import whisper
-import queue
-import threading
-import time
-import warnings
-import sys
-from collections import deque
-
-# Suppress specific warnings
-warnings.filterwarnings("ignore", category=UserWarning, module="whisper")
-warnings.filterwarnings("ignore", category=FutureWarning, module="torch")
-
-# Function to compute RMS for loudness monitoring
-def compute_rms(audio_chunk):
-    """Compute the Root Mean Square (RMS) for the loudness of the audio."""
-    return np.sqrt(np.mean(np.square(audio_chunk)))
-
-# Function to detect repetitive phrases or excessive repetitions
-def detect_repetitive_phrases(text, limit=5):
-    """
-    Detect if any phrase or word repeats too many times in sequence.
-
-    Parameters:
-    - text: Transcription text.
-    - limit: Max allowed repetition of words or phrases.
-    
-    Returns:
-    - True if repetition is detected, False otherwise.
-    """
-    words = text.split()
-    if len(words) == 0:
-        return False
-    
-    # Count repeated phrases
-    last_phrase = []
-    repeat_count = 0
-    max_repeat = limit
-    
-    for i in range(len(words)):
-        current_phrase = words[i:i+3]  # Check for repeating 3-word patterns
-
-        if current_phrase == last_phrase:
-            repeat_count += 1
-        else:
-            repeat_count = 0
-        
-        last_phrase = current_phrase
-
-        if repeat_count >= max_repeat:
-            return True  # Detected too many repetitions
-
-    return False
-
-# Main function to control the audio capture and transcription process
-def start_transcription(
-    chunk_duration=10, sample_rate=16000, loudness_start_threshold=0.1, 
-    loudness_stop_threshold=0.07, repeating_word_limit=5, silence_timeout=1, 
-    model_type="base.en", vac_input_device=0, channels=1):
-    """
-    Function to start the audio capture and transcription process.
-
-    Parameters:
-    - chunk_duration: Duration of each chunk to process (in seconds).
-    - sample_rate: Sample rate for audio recording (default 16000 Hz).
-    - loudness_start_threshold: Loudness threshold to start recording.
-    - loudness_stop_threshold: Loudness threshold to stop recording.
-    - repeating_word_limit: Maximum allowed repeated words/phrases in transcription.
-    - silence_timeout: Timeout for silence detection (in seconds).
-    - model_type: Whisper model type (e.g., "base.en").
-    - vac_input_device: Input device for capturing audio (e.g., VAC input device).
-    - channels: Number of audio channels to record (default 1).
-
-    Returns:
-    - Complete transcription text.
-    """
-    
-    audio_queue = queue.Queue()  # Queue to store audio data
-    chunk_size = chunk_duration * sample_rate  # Number of audio samples in each chunk
-    recording = False  # Flag to indicate if recording is active
-    transcriptions = []  # Store transcriptions
-
-    def audio_callback(indata, frames, time, status):
-        """Callback to handle incoming audio blocks from sounddevice."""
-        if status:
-            print(status, file=sys.stderr)
-        # Add audio data to the queue
-        audio_queue.put(indata.copy())
-
-    def capture_audio():
-        """Capture audio from the VAC input device using sounddevice."""
-        print("Capturing audio from VAC...")
-        with sd.InputStream(channels=channels, samplerate=sample_rate, callback=audio_callback,
-                            dtype='float32', blocksize=sample_rate, latency='low', device=vac_input_device):
-            while True:
-                time.sleep(1)  # Keep the audio stream alive
-
-    def transcribe_audio():
-        """Transcribe captured audio using Whisper and monitor loudness."""
-        nonlocal recording  # Access the recording flag
-
-        model = whisper.load_model(model_type)
-        last_transcription_time = time.time()
-
-        while True:
-            # Collect audio data for each chunk
-            audio_chunk = np.zeros(chunk_size, dtype='float32')
-            collected_samples = 0
-
-            # Collect enough samples to fill one chunk
-            while collected_samples < chunk_size:
-                if not audio_queue.empty():
-                    audio_data = audio_queue.get().flatten()
-
-                    # Determine how much audio to copy without exceeding the chunk size
-                    chunk_to_copy = min(len(audio_data), chunk_size - collected_samples)
-                    audio_chunk[collected_samples:collected_samples + chunk_to_copy] = audio_data[:chunk_to_copy]
-                    collected_samples += chunk_to_copy
-
-            # Normalize the audio chunk
-            audio_chunk = audio_chunk / np.max(np.abs(audio_chunk))
-
-            # Compute loudness using RMS
-            rms_value = compute_rms(audio_chunk)
-            print(f"Loudness (RMS): {rms_value:.4f}")
-
-            # Start recording if loudness exceeds the start threshold
-            if rms_value >= loudness_start_threshold:
-                if not recording:
-                    print("Loudness above start threshold. Starting recording.")
-                    recording = True
-
-            # Stop recording if loudness goes below the stop threshold
-            if rms_value <= loudness_stop_threshold:
-                if recording:
-                    print("Loudness below stop threshold. Stopping recording.")
-                    recording = False
-
-            # Only transcribe if recording is active
-            if recording:
-                # Transcribe the audio chunk using Whisper
-                result = model.transcribe(audio_chunk)
-                transcription = result["text"]
-
-                if transcription.strip():
-                    # Detect repeated phrases in transcription
-                    if detect_repetitive_phrases(transcription, repeating_word_limit):
-                        print("Repetitive phrases detected. Stopping the transcription process.")
-                        break
-
-                    # Append transcription to the list and print it
-                    transcriptions.append(transcription)
-                    print("Transcription:", transcription)
-
-                    # Reset transcription time after each valid transcription
-                    last_transcription_time = time.time()
-
-            else:
-                print("Recording is off, skipping transcription.")
-
-            # Check if silence timeout is reached
-            if time.time() - last_transcription_time > silence_timeout:
-                print("Silence detected. Ending transcription process.")
-                break
-
-        return " ".join(transcriptions)
-
-    # Start audio capture in a separate thread
-    capture_thread = threading.Thread(target=capture_audio)
-    capture_thread.daemon = True
-    capture_thread.start()
-
-    # Start the transcription process and return the final result
-    return transcribe_audio()
-
-# # Example usage: customize parameters as needed
-# transcription_result = start_transcription(
-#     chunk_duration=10,               # Set duration of audio chunks in seconds
-#     sample_rate=16000,               # Set the sample rate
-#     loudness_start_threshold=0.1,    # Set loudness threshold to start recording
-#     loudness_stop_threshold=0.08,    # Set loudness threshold to stop recording
-#     repeating_word_limit=5,          # Limit for detecting repeated phrases
-#     silence_timeout=5,               # Silence timeout to stop transcription
-#     model_type="base.en",            # Whisper model type (default is "base.en")
-#     vac_input_device=0,              # VAC input device (change as per your setup)
-#     channels=1                       # Number of audio channels (mono audio)
-# )
-
-# # Output the final transcription
-# print("Final Transcription:", transcription_result)
+import numpy as np
+import asyncio
+import time
+import warnings
+import sys
+from collections import deque
+from AudioCapture import get_capture_service
+from AsrBackends import get_backend, segments_text
+from StreamingTranscription import StreamingTranscriber, TranscriptEvent, words_to_event
+from VoiceActivity import FrameVAD, EndOfUtteranceDetector
+from RepetitionFilter import RepetitionFilter
+from Tracing import tracer
+
+# Suppress specific warnings
+warnings.filterwarnings("ignore", category=UserWarning, module="whisper")
+warnings.filterwarnings("ignore", category=FutureWarning, module="torch")
+
+# Function to compute RMS for loudness monitoring
+def compute_rms(audio_chunk):
+    """Compute the Root Mean Square (RMS) for the loudness of the audio."""
+    return np.sqrt(np.mean(np.square(audio_chunk)))
+
+# Function to detect repetitive phrases or excessive repetitions
+def detect_repetitive_phrases(text, limit=5):
+    """
+    Detect if any phrase or word repeats too many times in sequence.
+
+    Parameters:
+    - text: Transcription text.
+    - limit: Max allowed repetition of words or phrases.
+    
+    Returns:
+    - True if repetition is detected, False otherwise.
+    """
+    words = text.split()
+    if len(words) == 0:
+        return False
+    
+    # Count repeated phrases
+    last_phrase = []
+    repeat_count = 0
+    max_repeat = limit
+    
+    for i in range(len(words)):
+        current_phrase = words[i:i+3]  # Check for repeating 3-word patterns
+
+        if current_phrase == last_phrase:
+            repeat_count += 1
+        else:
+            repeat_count = 0
+        
+        last_phrase = current_phrase
+
+        if repeat_count >= max_repeat:
+            return True  # Detected too many repetitions
+
+    return False
+
+# Repetition filters reused by every turn of the session (reset per turn), one per limit
+_repetition_filters = {}
+
+# Function to get the session-wide repetition filter for a limit
+def get_repetition_filter(limit=5):
+    """Return the RepetitionFilter reused for the whole session for the given limit."""
+    if limit not in _repetition_filters:
+        _repetition_filters[limit] = RepetitionFilter(limit=limit)
+    return _repetition_filters[limit]
+
+# Main function to control the audio capture and transcription process
+def start_transcription(
+    chunk_duration=10, sample_rate=16000, loudness_start_threshold=0.03, 
+    loudness_stop_threshold=0.015, repeating_word_limit=5, silence_timeout=0.5, 
+    model_type="base.en", vac_input_device=0, channels=1, buffer_duration=30,
+    vad_frame_duration=0.02, vad_block_duration=0.1, backend="whisper", asr_workers=None,
+    capture_service=None, repetition_filter=None, since=None, on_partial=None,
+    speculation_silence=None, echo_gate=None):
+    """
+    Function to start the audio capture and transcription process.
+
+    Audio is classified frame by frame; only speech frames are passed to the ASR backend and the
+    turn ends as soon as the speaker has been silent for silence_timeout seconds.
+
+    Parameters:
+    - chunk_duration: Maximum seconds of speech decoded at once (in seconds).
+    - sample_rate: Sample rate for audio recording (default 16000 Hz).
+    - loudness_start_threshold: Absolute frame RMS needed to start speech.
+    - loudness_stop_threshold: Absolute frame RMS below which speech stops.
+    - repeating_word_limit: Maximum consecutive copies of a word/phrase kept in the transcript.
+    - silence_timeout: Trailing silence after speech that ends the turn (in seconds).
+    - model_type: Whisper model type (e.g., "base.en").
+    - vac_input_device: Input device for capturing audio (e.g., VAC input device).
+    - channels: Number of audio channels to record (default 1); they are averaged to mono.
+    - buffer_duration: Seconds of audio the capture subscription can hold before overrunning.
+    - vad_frame_duration: Length of each voice activity frame (0.01-0.03 seconds).
+    - vad_block_duration: Seconds of audio read and classified per iteration.
+    - backend: ASR backend name ("whisper", "whisper-int8", "faster-whisper").
+    - asr_workers: Optional AsrWorkerPool; when given, decoding runs out of process.
+    - capture_service: Optional audio source (e.g., AudioReplay.ReplayCaptureService) used
+      instead of the shared live capture service for vac_input_device.
+    - repetition_filter: Optional RepetitionFilter (default: the session-wide one); it is reset
+      at the start of the turn.
+    - since: Optional wall-clock time; buffered audio captured before it is skipped (e.g., the
+      bot's own speech before a participant interrupted it).
+    - on_partial: Optional callback given the transcript so far whenever the speaker pauses
+      for speculation_silence seconds (i.e., seems to be finishing), so work can start
+      before the turn ends.
+    - speculation_silence: Trailing silence that triggers on_partial (default: half of
+      silence_timeout).
+    - echo_gate: Optional BargeIn.EchoGate on the bot's output sink (with vad_frame_duration
+      frames); frames it explains by the bot's own voice count as silence, so a reply leaking
+      back into the capture does not become the next turn.
+
+    Returns:
+    - Complete transcription text.
+    """
+    
+    chunk_size = chunk_duration * sample_rate  # Maximum number of speech samples per decode
+    recording = False  # Flag to indicate if the speaker has started talking
+    transcriptions = []  # Store transcriptions
+    # Drops repetition loops (even across chunks) instead of ending the turn; a new turn
+    # starts a new run, so a short answer given again is kept
+    repetition_filter = repetition_filter or get_repetition_filter(repeating_word_limit)
+    repetition_filter.reset()
+
+    # The shared capture service keeps the device open across turns; our named
+    # subscription keeps buffering in between calls so no audio is lost
+    capture_service = capture_service or get_capture_service(vac_input_device, sample_rate, channels)
+    audio_buffer = capture_service.subscribe(
+        "GmeetHear", buffer_duration=max(buffer_duration, chunk_duration)
+    )
+    capture_service.start()  # No-op when the source is already running
+    if since is not None:
+        audio_buffer.discard_before(since)
+    if speculation_silence is None:
+        speculation_silence = silence_timeout / 2
+
+    def transcribe_audio():
+        """Transcribe captured speech with the ASR backend, skipping non-speech frames."""
+        nonlocal recording  # Access the recording flag
+
+        # Decode out of process when a worker pool is given, else with the shared in-process backend
+        asr = asr_workers or get_backend(backend, model_type)
+        vad = FrameVAD(sample_rate, frame_duration=vad_frame_duration,
+                       start_threshold=loudness_start_threshold,
+                       stop_threshold=loudness_stop_threshold)
+        end_of_utterance = EndOfUtteranceDetector(vad, end_silence_duration=silence_timeout)
+        block_size = int(vad_block_duration * sample_rate)
+        audio_block = np.zeros(block_size, dtype='float32')  # Reused for every read
+        speech_audio = np.zeros(chunk_size, dtype='float32')  # Speech-only audio to decode
+        speech_length = 0
+        reported_overruns = 0
+
+        def decode(length):
+            """Transcribe the buffered speech and keep it minus any repetition loops."""
+            with tracer.span("asr.decode", audio_seconds=round(length / sample_rate, 2)):
+                transcription = segments_text(asr.transcribe(speech_audio[:length]))
+
+            if transcription.strip():
+                print("Transcription:", transcription)
+                dropped = repetition_filter.dropped_words
+                filtered = repetition_filter.feed(transcription)
+                if repetition_filter.dropped_words > dropped:
+                    print(f"Dropped {repetition_filter.dropped_words - dropped} repeated words.")
+                if filtered:
+                    transcriptions.append(filtered)
+
+        while True:
+            # Block until the next small block is buffered (no busy-waiting)
+            samples, timestamp = audio_buffer.read_timed(block_size, out=audio_block)
+            if samples is None:
+                print("Audio capture stopped. Ending transcription process.")
+                break
+
+            # Report when transcription is falling behind real time
+            if audio_buffer.overruns > reported_overruns:
+                stats = audio_buffer.stats()
+                print(f"Audio buffer overrun: {stats['overruns']} overruns, "
+                      f"{stats['dropped_samples']} samples dropped", file=sys.stderr)
+                reported_overruns = stats['overruns']
+
+            # Classify frames and keep only speech for decoding
+            frames, mask = vad.process_frames(audio_block)
+            if echo_gate is not None and len(frames):
+                # Frames explained by what the bot played are its own voice, not the speaker
+                levels = np.sqrt(np.mean(np.square(frames), axis=1))
+                frame_times = timestamp + np.arange(len(frames)) * vad.frame_duration
+                mask &= echo_gate.speech_mask(frame_times, levels)
+            utterance_ended = end_of_utterance.update(mask)
+            speech = frames[mask].reshape(-1)
+
+            if len(speech) and not recording:
+                print("Speech detected. Starting recording.")
+                recording = True
+
+            # Decode early if the speech would overflow one chunk
+            if speech_length + len(speech) > chunk_size:
+                decode(speech_length)
+                speech_length = 0
+            speech_audio[speech_length:speech_length + len(speech)] = speech
+            speech_length += len(speech)
+
+            # End the turn shortly after the speaker stops
+            if utterance_ended:
+                print("End of utterance detected. Ending transcription process.")
+                if speech_length:
+                    decode(speech_length)
+                break
+
+            # The speaker paused: decode now and report the partial transcript, so the
+            # final transcript usually needs no decode once the silence timeout passes
+            if on_partial is not None and speech_length and end_of_utterance.speech_started \
+                    and end_of_utterance.trailing_silence >= speculation_silence:
+                decode(speech_length)
+                speech_length = 0
+                partial = " ".join(transcriptions + [repetition_filter.peek()]).strip()
+                if partial:
+                    on_partial(partial)
+
+        # Release the words the filter was still holding back
+        tail = repetition_filter.flush()
+        if tail:
+            transcriptions.append(tail)
+        return " ".join(transcriptions)
+
+    # Start the transcription process and return the final result
+    return transcribe_audio()
+
+# Streaming function that yields transcript updates while the speaker is talking
+def stream_transcription(
+    hop_duration=0.5, window_duration=15, sample_rate=16000, loudness_start_threshold=0.03,
+    loudness_stop_threshold=0.015, repeating_word_limit=5, silence_timeout=0.5,
+    model_type="base.en", vac_input_device=0, channels=1, buffer_duration=30,
+    backend="whisper", asr_workers=None, capture_service=None, repetition_filter=None):
+    """
+    Incrementally transcribe audio by decoding overlapping windows every hop.
+
+    Words are only committed once two consecutive windows agree on them, so words split
+    across window edges are not mangled. Latency is roughly one hop plus decode time.
+
+    Parameters:
+    - hop_duration: Seconds of new audio between decodes.
+    - window_duration: Maximum seconds of audio decoded at once.
+    - sample_rate: Sample rate for audio recording (default 16000 Hz).
+    - loudness_start_threshold: Absolute frame RMS needed to start speech.
+    - loudness_stop_threshold: Absolute frame RMS below which speech stops.
+    - repeating_word_limit: Maximum consecutive copies of a word/phrase kept in the transcript.
+    - silence_timeout: Trailing silence after speech that ends the turn (in seconds).
+    - model_type: Whisper model type (e.g., "base.en").
+    - vac_input_device: Input device for capturing audio (e.g., VAC input device).
+    - channels: Number of audio channels to record (default 1); they are averaged to mono.
+    - buffer_duration: Seconds of audio the capture subscription can hold before overrunning.
+    - backend: ASR backend name ("whisper", "whisper-int8", "faster-whisper").
+    - asr_workers: Optional AsrWorkerPool; when given, decoding runs out of process.
+    - capture_service: Optional audio source used instead of the shared live capture service.
+    - repetition_filter: Optional RepetitionFilter (default: the session-wide one); it is reset
+      at the start of the turn.
+
+    Yields:
+    - TranscriptEvent objects: "partial" for the unstable tail, "final" for committed words.
+    """
+    capture_service = capture_service or get_capture_service(vac_input_device, sample_rate, channels)
+    audio_buffer = capture_service.subscribe("GmeetHear", buffer_duration=buffer_duration)
+    capture_service.start()
+    transcriber = StreamingTranscriber(
+        asr_workers or get_backend(backend, model_type), sample_rate=sample_rate,
+        window_duration=window_duration
+    )
+    repetition_filter = repetition_filter or get_repetition_filter(repeating_word_limit)
+    repetition_filter.reset()  # Repeats are only detected within the turn
+
+    vad = FrameVAD(sample_rate, start_threshold=loudness_start_threshold,
+                   stop_threshold=loudness_stop_threshold)
+    end_of_utterance = EndOfUtteranceDetector(vad, end_silence_duration=silence_timeout)
+
+    hop_size = int(hop_duration * sample_rate)
+    # Read everything that arrived while the previous window was decoding
+    audio_block = np.zeros(audio_buffer.capacity, dtype='float32')
+    last_partial = ""
+
+    while True:
+        samples = audio_buffer.read_available(audio_block, min_count=hop_size)
+        if samples is None:
+            break
+        utterance_ended = end_of_utterance.update(vad.process(samples))
+        if end_of_utterance.speech_frames == 0:
+            continue  # Nothing said yet: do not spend decode time on silence
+        transcriber.insert_audio(samples)
+        committed, tentative = transcriber.process()
+
+        if committed:
+            event = words_to_event("final", committed)
+            filtered = repetition_filter.feed(event.text)
+            if filtered:
+                yield TranscriptEvent("final", filtered, event.start, event.end)
+
+        partial = " ".join(word for _, _, word in tentative)
+        if partial != last_partial:
+            last_partial = partial
+            if tentative:
+                yield words_to_event("partial", tentative)
+
+        if utterance_ended:
+            print("End of utterance detected. Ending transcription process.")
+            break
+
+    flushed = transcriber.finish()
+    end = flushed[-1][1] if flushed else transcriber.stream_time
+    # Keep the words the last feed releases as well as those still held back
+    released = repetition_filter.feed(" ".join(word for _, _, word in flushed)) if flushed else ""
+    tail = " ".join(text for text in (released, repetition_filter.flush()) if text)
+    if tail:
+        yield TranscriptEvent("final", tail, end, end)
+
+# Async wrapper so event-loop code can consume streaming transcripts
+async def astream_transcription(**kwargs):
+    """
+    Async iterator over stream_transcription events; decoding runs in a worker thread.
+
+    Parameters:
+    - kwargs: Passed through to stream_transcription.
+    """
+    events = stream_transcription(**kwargs)
+    while True:
+        event = await asyncio.to_thread(next, events, None)
+        if event is None:
+            break
+        yield event
+
+# # Example usage: customize parameters as needed
+# transcription_result = start_transcription(
+#     chunk_duration=10,               # Set duration of audio chunks in seconds
+#     sample_rate=16000,               # Set the sample rate
+#     loudness_start_threshold=0.1,    # Set loudness threshold to start recording
+#     loudness_stop_threshold=0.08,    # Set loudness threshold to stop recording
+#     repeating_word_limit=5,          # Limit for detecting repeated phrases
+#     silence_timeout=5,               # Silence timeout to stop transcription
+#     model_type="base.en",            # Whisper model type (default is "base.en")
+#     vac_input_device=0,              # VAC input device (change as per your setup)
+#     channels=1                       # Number of audio channels (mono audio)
+# )
+
+# # Output the final transcription
+# print("Final Transcription:", transcription_result)
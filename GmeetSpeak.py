@@ -1,56 +1,288 @@
-import asyncio
-import edge_tts
-import io
-import numpy as np
-import sounddevice as sd
-import soundfile as sf
-
-# List of voices available
-VOICES = [
-    'en-IN-NeerjaNeural', 
-    'en-IN-PrabhatNeural', 
-    'en-CA-ClaraNeural',
-    'en-CA-LiamNeural', 
-    'en-GB-LibbyNeural', 
-    'zh-CN-YunyangNeural',
-    'zh-CN-XiaoxiaoNeural'
-]
-
-# Function to fetch audio data using edge_tts
-async def amain(text: str, voice: str, rate: str, pitch: str) -> bytes:
-    communicate = edge_tts.Communicate(text=text, voice=voice, rate=rate, pitch=pitch)
-    audio_data = io.BytesIO()
-
-    async for chunk in communicate.stream():
-        if chunk['type'] == 'audio':
-            audio_data.write(chunk['data'])  # Write audio data to BytesIO
-
-    return audio_data.getvalue()  # Return audio data directly
-
-# Function to play audio through the virtual audio cable
-async def play_audio(text: str, voice_number: int = 0, rate: str = "+40%", pitch: str = "+10Hz"):
-    # Select the voice based on the voice_number provided
-    voice = VOICES[voice_number]
-
-    # Fetch audio from edge_tts in memory
-    audio_bytes = await amain(text, voice, rate, pitch)
-
-    # Read the audio bytes into numpy array directly (avoiding file write)
-    audio_data_np, sample_rate = sf.read(io.BytesIO(audio_bytes), dtype='float32')
-
-    # Set the correct device index for VB-Cable (use the appropriate index from your list)
-    device_index = 11  # Use DirectSound with index 11, or change to 13 for WASAPI
-
-    # Play audio using sounddevice on the virtual cable
-    sd.play(audio_data_np, samplerate=sample_rate, device=device_index)
-
-    # Wait until the audio has finished playing
-    sd.wait()
-
-# The main function to be called from another script
-async def speak(text: str, voice_number: int = 0, rate: str = "+10%", pitch: str = "+8Hz"):
-    await play_audio(text=text, voice_number=voice_number, rate=rate, pitch=pitch)
-
-# # Example of how to call it from another script:
-# asyncio.run(speak(text="How are you Vaishnavi ? I am Ching ,A Manager At Eco-soft Global Private Limited , I hope you are doing Well i wanted to Introduce you to my Boss Ameya!", voice_number=3, rate="+10%", pitch="+8Hz"))
-# asyncio.run(speak(text="Hi Vaishnavi , My Boss Ameya is the best Man in the world , I am SuckLee his assistant ", voice_number=0, rate="+7%",pitch="+10Hz"))
+import asyncio
+import io
+import time
+import numpy as np
+from AudioSink import get_output_sink
+from Mp3Stream import Mp3StreamDecoder
+from TtsCache import tts_cache, decode_mp3, load_prewarm_list, prewarm
+from TtsBackends import TtsSelector, get_tts_backend
+from TtsPool import get_tts_pool
+from Tracing import tracer
+
+# List of voices available
+VOICES = [
+    'en-IN-NeerjaNeural', 
+    'en-IN-PrabhatNeural', 
+    'en-CA-ClaraNeural',
+    'en-CA-LiamNeural', 
+    'en-GB-LibbyNeural', 
+    'zh-CN-YunyangNeural',
+    'zh-CN-XiaoxiaoNeural'
+]
+
+# Output device for VB-Cable, chosen by name (an index from sd.query_devices() also works)
+OUTPUT_DEVICE = "CABLE Input"
+OUTPUT_HOSTAPI = "DirectSound"  # Or "WASAPI"
+
+# edge_tts is used unless it takes longer than this; then the offline voice speaks instead
+TTS_DEADLINE = 2.0  # Seconds
+tts_selector = TtsSelector(get_tts_backend("edge-tts"), get_tts_backend("pyttsx3"), deadline=TTS_DEADLINE)
+
+# Function to stream audio data from edge_tts as it is synthesized
+async def astream(text: str, voice: str, rate: str, pitch: str):
+    # Through the shared pool: warm connections skip the handshake for every sentence after the
+    # first when pooling is enabled (see TtsPool.POOL_EDGE_TTS), edge_tts.Communicate otherwise
+    async for data in get_tts_pool().stream(text, voice, rate, pitch):
+        yield data  # MP3 bytes, as soon as they arrive
+
+# Function to fetch audio data using edge_tts
+async def amain(text: str, voice: str, rate: str, pitch: str) -> bytes:
+    audio_data = io.BytesIO()
+
+    async for data in astream(text, voice, rate, pitch):
+        audio_data.write(data)  # Write audio data to BytesIO
+
+    return audio_data.getvalue()  # Return audio data directly
+
+# Function to get the persistent output sink for the virtual audio cable
+def output_sink(device=OUTPUT_DEVICE, hostapi=OUTPUT_HOSTAPI):
+    """Return the shared output stream, opened once per session."""
+    return get_output_sink(device, hostapi if isinstance(device, str) else None)
+
+# Function to play audio through the virtual audio cable
+async def play_audio(text: str, voice_number: int = 0, rate: str = "+40%", pitch: str = "+10Hz",
+                     device=OUTPUT_DEVICE, use_cache=True):
+    """
+    Buffered mode: synthesize the whole utterance, decode it, then play it.
+    Phrases found in the TTS cache skip synthesis and decoding.
+
+    Returns:
+    - Dictionary with time_to_first_audio, synthesis_time and audio_duration (in seconds).
+    """
+    started = time.perf_counter()
+
+    # Select the voice based on the voice_number provided
+    voice = VOICES[voice_number]
+
+    if use_cache:
+        # Decoded audio from the TTS cache, or synthesized (with local fallback) and cached
+        audio_data_np, sample_rate = await synthesize(text, voice_number, rate, pitch)
+    else:
+        # Fetch audio from edge_tts in memory and decode it (avoiding file write)
+        audio_data_np, sample_rate = decode_mp3(await amain(text, voice, rate, pitch))
+    synthesis_time = time.perf_counter() - started
+
+    # Play audio on the virtual cable and wait until it has finished playing
+    playback = output_sink(device).play(audio_data_np, sample_rate)
+    try:
+        await playback.wait_async()
+    finally:
+        playback.cancel()  # No-op once finished; stops playback if we were cancelled
+
+    stats = {
+        "mode": "buffered",
+        "time_to_first_audio": (playback.started_at or time.perf_counter()) - started,
+        "synthesis_time": synthesis_time,
+        "audio_duration": len(audio_data_np) / sample_rate,
+    }
+    print(f"Time to first audio (buffered): {stats['time_to_first_audio']:.3f} s")
+    return stats
+
+# Function to play audio while it is still being synthesized
+async def stream_audio(text: str, voice_number: int = 0, rate: str = "+40%", pitch: str = "+10Hz",
+                       device=OUTPUT_DEVICE, prebuffer_duration=0.3, buffer_duration=30,
+                       use_cache=True):
+    """
+    Streaming mode: decode the MP3 stream incrementally and start playback as soon as
+    prebuffer_duration seconds of audio are decoded. Cached phrases are played straight
+    from the TTS cache, and newly streamed phrases are added to it.
+
+    Parameters:
+    - text, voice_number, rate, pitch: As for play_audio.
+    - device: Output device index or name.
+    - prebuffer_duration: Seconds of audio decoded before playback starts (guards
+      against underruns when the network stalls).
+    - buffer_duration: Seconds of decoded audio held at most while playback catches up.
+    - use_cache: Whether to read from and add to the TTS cache.
+
+    Returns:
+    - Dictionary with time_to_first_audio, synthesis_time, audio_duration and underruns.
+    """
+    started = time.perf_counter()
+    voice = VOICES[voice_number]
+    stats = {"mode": "streaming", "time_to_first_audio": None, "synthesis_time": None,
+             "audio_duration": 0.0, "underruns": 0, "cached": False}
+
+    cached = tts_cache.get(text, voice, rate, pitch) if use_cache else None
+    stats["cached"] = cached is not None
+    if cached is None and tts_selector.degraded():
+        # edge_tts has been too slow lately: use the buffered path with its local fallback
+        try:
+            cached = await synthesize(text, voice_number, rate, pitch)
+        except Exception as e:
+            print(f"The offline voice failed ({e!r}); skipping this sentence.")
+            return stats  # Nothing was synthesized
+    if cached is not None:
+        audio, sample_rate = cached
+        stats.update(synthesis_time=time.perf_counter() - started,
+                     audio_duration=len(audio) / sample_rate)
+        playback = await play_pcm(audio, sample_rate, device)
+        stats["time_to_first_audio"] = (playback.started_at or time.perf_counter()) - started
+        print(f"Time to first audio ({'cached' if stats['cached'] else 'fallback'}): "
+              f"{stats['time_to_first_audio']:.3f} s")
+        return stats
+
+    chunks = astream(text, voice, rate, pitch)
+    try:
+        # Give up on edge_tts if it does not start sending audio within the deadline
+        first_chunk = await asyncio.wait_for(chunks.__anext__(), timeout=tts_selector.deadline)
+    except StopAsyncIteration:
+        return stats  # Nothing was synthesized
+    except Exception as e:
+        await chunks.aclose()
+        tts_selector.record_failure(time.perf_counter() - started,
+                                    error=None if isinstance(e, asyncio.TimeoutError) else e)
+        print(f"edge_tts did not start in time ({e!r}); using the offline voice.")
+        try:
+            audio, sample_rate = await tts_selector.synthesize_fallback(text, voice, rate, pitch)
+        except Exception as fallback_error:
+            print(f"The offline voice failed too ({fallback_error!r}); skipping this sentence.")
+            return stats  # Nothing was synthesized
+        stats.update(synthesis_time=time.perf_counter() - started,
+                     audio_duration=len(audio) / sample_rate)
+        playback = await play_pcm(audio, sample_rate, device)
+        stats["time_to_first_audio"] = (playback.started_at or time.perf_counter()) - started
+        return stats
+
+    async def all_chunks():
+        yield first_chunk
+        async for data in chunks:
+            yield data
+
+    decoder = Mp3StreamDecoder()
+    decoded = []  # Decoded pieces, kept to add the phrase to the cache
+    playback = None
+    try:
+        async for data in all_chunks():
+            pcm = decoder.feed(data)
+            if not len(pcm):
+                continue
+            if playback is None:
+                # The sample rate is known once the first frames are decoded
+                playback = output_sink(device).open_stream(
+                    decoder.sample_rate, buffer_duration=buffer_duration,
+                    prebuffer_duration=prebuffer_duration
+                )
+            await playback.write_async(pcm)
+            decoded.append(pcm)
+        pcm = decoder.flush()
+        if len(pcm):
+            if playback is None:
+                playback = output_sink(device).open_stream(decoder.sample_rate)
+            await playback.write_async(pcm)
+            decoded.append(pcm)
+        stats["synthesis_time"] = time.perf_counter() - started
+        tts_selector.primary.latency.record(stats["synthesis_time"])
+        if playback is None:
+            return stats  # Nothing was synthesized
+        playback.finish()
+        if use_cache:
+            tts_cache.put(text, voice, rate, pitch, np.concatenate(decoded), decoder.sample_rate)
+        await playback.wait_async()
+    finally:
+        if playback is not None:
+            playback.cancel()
+            if playback.started_at is not None:
+                tracer.mark("first_audio", playback.started_at)
+
+    stats["audio_duration"] = sum(len(pcm) for pcm in decoded) / decoder.sample_rate
+    stats["underruns"] = playback.underruns
+    stats["time_to_first_audio"] = (playback.started_at or time.perf_counter()) - started
+    print(f"Time to first audio (streaming): {stats['time_to_first_audio']:.3f} s")
+    return stats
+
+# Function to synthesize text to PCM without playing it
+async def synthesize(text: str, voice_number: int = 0, rate: str = "+10%", pitch: str = "+8Hz"):
+    """
+    Synthesize text and decode it to PCM.
+
+    Returns:
+    - (audio, sample_rate) with audio as a float32 array of shape (frames, channels).
+    """
+    voice = VOICES[voice_number]
+    with tracer.span("tts.synthesize") as span:
+        cached = tts_cache.get(text, voice, rate, pitch)
+        span["cached"] = cached is not None
+        if cached is not None:
+            return cached
+        audio, sample_rate, backend = await tts_selector.synthesize(text, voice, rate, pitch)
+        span["backend"] = backend.name
+    if backend.remote:
+        # Offline fallback audio is not cached, so the edge_tts voice is used next time
+        tts_cache.put(text, voice, rate, pitch, audio, sample_rate)
+    return audio, sample_rate
+
+# Function to play decoded PCM without blocking the event loop
+async def play_pcm(audio, sample_rate, device=OUTPUT_DEVICE):
+    """
+    Play (frames, channels) float32 audio and return when it has finished.
+
+    Cancelling the awaiting task stops playback within one output block.
+
+    Returns:
+    - The finished Playback (its started_at gives the time the first sample was played).
+    """
+    playback = output_sink(device).play(audio, sample_rate)
+    try:
+        await playback.wait_async()
+    finally:
+        playback.cancel()
+        if playback.started_at is not None:
+            tracer.mark("first_audio", playback.started_at)
+    return playback
+
+# Function to compare time-to-first-audio of the buffered and streaming modes
+async def compare_playback(text: str, voice_number: int = 0, rate: str = "+10%", pitch: str = "+8Hz",
+                           device=OUTPUT_DEVICE):
+    """Speak text once in each mode and return both sets of playback stats."""
+    # Bypass the TTS cache so both modes pay for synthesis
+    buffered = await play_audio(text, voice_number, rate, pitch, device=device, use_cache=False)
+    streaming = await stream_audio(text, voice_number, rate, pitch, device=device, use_cache=False)
+    print(f"Time to first audio: buffered {buffered['time_to_first_audio']:.3f} s, "
+          f"streaming {streaming['time_to_first_audio']:.3f} s")
+    return {"buffered": buffered, "streaming": streaming}
+
+# Function to fill the TTS cache with fixed phrases at startup
+async def prewarm_tts_cache(phrases=(), path=None):
+    """
+    Synthesize fixed phrases into the TTS cache so they later play instantly.
+
+    Parameters:
+    - phrases: Dictionaries with "text" and optional "voice_number", "rate" and "pitch".
+    - path: Optional JSON file with more phrases in the same format.
+
+    Returns:
+    - Number of phrases that were not cached yet.
+    """
+    phrases = list(phrases) + load_prewarm_list(path)
+    return await prewarm(
+        [
+            {"text": phrase["text"], "voice": VOICES[phrase.get("voice_number", 0)],
+             "rate": phrase.get("rate", "+10%"), "pitch": phrase.get("pitch", "+8Hz")}
+            for phrase in phrases
+        ],
+        fetch=amain,
+    )
+
+# The main function to be called from another script
+@tracer.traced("tts.speak")
+async def speak(text: str, voice_number: int = 0, rate: str = "+10%", pitch: str = "+8Hz",
+                streaming: bool = True):
+    if streaming:
+        return await stream_audio(text=text, voice_number=voice_number, rate=rate, pitch=pitch)
+    return await play_audio(text=text, voice_number=voice_number, rate=rate, pitch=pitch)
+
+# # Example of how to call it from another script:
+# asyncio.run(speak(text="How are you Vaishnavi ? I am Ching ,A Manager At Eco-soft Global Private Limited , I hope you are doing Well i wanted to Introduce you to my Boss Ameya!", voice_number=3, rate="+10%", pitch="+8Hz"))
+# asyncio.run(speak(text="Hi Vaishnavi , My Boss Ameya is the best Man in the world , I am SuckLee his assistant ", voice_number=0, rate="+7%",pitch="+10Hz"))
+# asyncio.run(compare_playback(text="Could you tell me what progress is being made on the automation project?"))
@@ -0,0 +1,60 @@
+import threading
+from collections import deque
+import numpy as np
+
+# Rolling window of latency samples with percentile queries
+class RollingLatency:
+    """
+    Keep the most recent latency measurements of an operation.
+
+    Parameters:
+    - window: Number of most recent samples kept.
+    """
+
+    def __init__(self, window=50):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0  # Samples recorded since creation
+        self.total = 0.0  # Sum of the samples recorded since creation
+
+    def __len__(self):
+        return len(self._samples)
+
+    def record(self, seconds):
+        """Add one measurement (in seconds)."""
+        with self._lock:
+            self._samples.append(float(seconds))
+            self.count += 1
+            self.total += float(seconds)
+
+    def clear(self):
+        """Forget the window (e.g., once a degraded service has recovered)."""
+        with self._lock:
+            self._samples.clear()
+
+    def percentile(self, q, default=None):
+        """
+        Return the q-th percentile (0-100) of the window.
+
+        Returns:
+        - Latency in seconds, or default when nothing has been recorded yet.
+        """
+        with self._lock:
+            if not self._samples:
+                return default
+            return float(np.percentile(self._samples, q))
+
+    def summary(self):
+        """Return count, p50, p95, p99 and max of the window (seconds, rounded)."""
+        with self._lock:
+            samples = list(self._samples)
+        if not samples:
+            return {"count": self.count}
+        p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+        return {
+            "count": self.count,
+            "p50": round(float(p50), 3),
+            "p95": round(float(p95), 3),
+            "p99": round(float(p99), 3),
+            "max": round(max(samples), 3),
+        }
@@ -0,0 +1,247 @@
+import json
+import time
+import asyncio
+import threading
+from LatencyStats import RollingLatency
+
+# Reply spoken when the LLM misses the turn deadline
+FALLBACK_REPLY = "Sorry, give me a moment on that. Let's continue with the next update."
+
+# Message or stream chunk with the same .content attribute as LangChain's messages
+class LlmText:
+    """
+    Parameters:
+    - content: Text of the message or chunk.
+    - canned: True for the fallback text used when the deadline was missed.
+    """
+
+    def __init__(self, content, canned=False):
+        self.content = content
+        self.canned = canned
+
+# Minimal async client for OpenAI-compatible chat servers (llama.cpp, vLLM, Ollama, stand-ins)
+class OpenAiCompatibleChat:
+    """
+    Chat completions over HTTP with the ainvoke/astream interface of LangChain chat
+    models. Requires aiohttp (installed with edge_tts).
+
+    Parameters:
+    - base_url: Server URL up to and including "/v1".
+    - model: Model name sent with every request.
+    - api_key: Optional bearer token.
+    - temperature: Sampling temperature.
+    - timeout: Seconds a request may take in total.
+    """
+
+    def __init__(self, base_url, model="local", api_key=None, temperature=0, timeout=60):
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.api_key = api_key
+        self.temperature = temperature
+        self.timeout = timeout
+        self._session = None
+
+    def _payload(self, prompt, stream):
+        return {"model": self.model, "temperature": self.temperature, "stream": stream,
+                "messages": [{"role": "user", "content": prompt}]}
+
+    def _open(self):
+        import aiohttp
+
+        if self._session is None or self._session.closed:
+            headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else None
+            self._session = aiohttp.ClientSession(
+                headers=headers, timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+        return self._session
+
+    async def ainvoke(self, prompt):
+        async with self._open().post(f"{self.base_url}/chat/completions",
+                                     json=self._payload(prompt, False)) as response:
+            response.raise_for_status()
+            data = await response.json()
+        return LlmText(data["choices"][0]["message"]["content"] or "")
+
+    async def astream(self, prompt):
+        async with self._open().post(f"{self.base_url}/chat/completions",
+                                     json=self._payload(prompt, True)) as response:
+            response.raise_for_status()
+            # Server-sent events: one "data: {json}" line per chunk, then "data: [DONE]"
+            async for line in response.content:
+                line = line.decode("utf-8").strip()
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                delta = json.loads(data)["choices"][0].get("delta", {})
+                if delta.get("content"):
+                    yield LlmText(delta["content"])
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+# Chat model wrapper that bounds the latency of every turn
+class HedgedLlm:
+    """
+    Wrap a chat model (anything with ainvoke/astream, e.g. ChatGroq) so that a slow
+    completion cannot stall the meeting:
+
+    - When a request has not answered (or, when streaming, produced its first token)
+      after the model's recent p95 latency, a duplicate request is sent; whichever
+      answers first is used and the other is cancelled.
+    - When neither answers within the deadline, both are cancelled and a canned
+      reply is returned instead (LlmText with canned=True).
+
+    Parameters:
+    - llm: Chat model to wrap (configure it without retries of its own).
+    - deadline: Seconds a turn may wait for the answer (first token when streaming).
+    - hedge_percentile: Latency percentile after which the duplicate request is sent.
+    - initial_hedge_delay: Hedge delay used until min_samples latencies are known.
+    - min_samples: Measurements needed before the percentile is trusted.
+    - fallback_reply: Text returned when the deadline is missed.
+    - latency_window: Samples kept per latency window.
+    """
+
+    def __init__(self, llm, deadline=6.0, hedge_percentile=95, initial_hedge_delay=2.0, min_samples=5,
+                 fallback_reply=FALLBACK_REPLY, latency_window=50):
+        self.llm = llm
+        self.deadline = deadline
+        self.hedge_percentile = hedge_percentile
+        self.initial_hedge_delay = initial_hedge_delay
+        self.min_samples = min_samples
+        self.fallback_reply = fallback_reply
+        # Latencies of answered requests only; deadline misses are counted, not recorded
+        self.latency = RollingLatency(latency_window)  # Complete answers (ainvoke)
+        self.first_token_latency = RollingLatency(latency_window)  # First tokens (astream)
+        self._lock = threading.Lock()
+        self.counts = {"requests": 0, "hedged": 0, "hedge_wins": 0, "deadline_missed": 0, "errors": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self.counts[name] += 1
+
+    def hedge_delay(self, latency):
+        """Seconds to wait before sending the duplicate request."""
+        if len(latency) < self.min_samples:
+            delay = self.initial_hedge_delay
+        else:
+            delay = latency.percentile(self.hedge_percentile)
+        return min(delay, self.deadline)
+
+    async def _race(self, start, latency):
+        """
+        Run start() and, after the hedge delay (or a failure), a second start(); return the
+        first result. Requests still running when this returns are cancelled.
+
+        Returns:
+        - (result, hedged_won), or (None, False) when the deadline passed or both failed.
+        """
+        started = time.perf_counter()
+        hedge_at = started + self.hedge_delay(latency)
+        deadline_at = started + self.deadline
+        attempts = {asyncio.ensure_future(start()): 0}
+        running = set(attempts)
+        error = None
+        try:
+            while running:
+                now = time.perf_counter()
+                if now >= deadline_at:
+                    break
+                wake_at = min(hedge_at, deadline_at) if len(attempts) < 2 else deadline_at
+                done, running = await asyncio.wait(running, timeout=max(0.0, wake_at - now),
+                                                   return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        latency.record(time.perf_counter() - started)
+                        return task.result(), attempts[task] == 1
+                    error = task.exception()
+                    self._count("errors")
+                # Hedge once the first request is late, or right away if it failed
+                if len(attempts) < 2 and (time.perf_counter() >= hedge_at or not running):
+                    self._count("hedged")
+                    task = asyncio.ensure_future(start())
+                    attempts[task] = 1
+                    running.add(task)
+        finally:
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+        if error is not None and not running:
+            print(f"LLM requests failed: {error!r}")
+        else:
+            # Misses stay out of the latency window: recorded as the deadline, a few stalls
+            # would push the hedge percentile up to the deadline and stop hedging altogether
+            self._count("deadline_missed")
+        return None, False
+
+    async def ainvoke(self, prompt, fallback=None):
+        """
+        Return the model's answer, or LlmText(fallback or fallback_reply, canned=True) when
+        the deadline is missed.
+        """
+        self._count("requests")
+        result, hedge_won = await self._race(lambda: self.llm.ainvoke(prompt), self.latency)
+        if result is None:
+            print(f"No LLM answer within {self.deadline:.1f} s; using the fallback reply.")
+            return LlmText(self.fallback_reply if fallback is None else fallback, canned=True)
+        if hedge_won:
+            self._count("hedge_wins")
+        return result
+
+    async def astream(self, prompt, fallback=None):
+        """
+        Stream the model's answer. The deadline and hedging apply to the first token, and
+        a stream that then pauses for longer than the deadline ends early.
+        """
+        self._count("requests")
+        streams = []
+
+        async def first_chunk():
+            stream = self.llm.astream(prompt)
+            streams.append(stream)
+            try:
+                return stream, await stream.__anext__()
+            except StopAsyncIteration:
+                return stream, None  # Empty answer
+
+        try:
+            result, hedge_won = await self._race(first_chunk, self.first_token_latency)
+            if result is None:
+                print(f"No LLM answer within {self.deadline:.1f} s; using the fallback reply.")
+                yield LlmText(self.fallback_reply if fallback is None else fallback, canned=True)
+                return
+            if hedge_won:
+                self._count("hedge_wins")
+            stream, chunk = result
+            if chunk is None:
+                return
+            yield chunk
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(stream.__anext__(), timeout=self.deadline)
+                except StopAsyncIteration:
+                    break
+                except asyncio.TimeoutError:
+                    self._count("deadline_missed")
+                    print(f"LLM stream stalled for {self.deadline:.1f} s; ending the reply.")
+                    break
+                yield chunk
+        finally:
+            # Close the losing request's stream as well as the winner's
+            for stream in streams:
+                if hasattr(stream, "aclose"):
+                    try:
+                        await stream.aclose()
+                    except Exception:
+                        pass
+
+    def stats(self):
+        """Return request counts and latency summaries."""
+        with self._lock:
+            counts = dict(self.counts)
+        counts["latency"] = self.latency.summary()
+        counts["first_token_latency"] = self.first_token_latency.summary()
+        return counts
@@ -0,0 +1,209 @@
+import gc
+import os
+import sys
+import time
+import threading
+from collections import OrderedDict
+
+# Function to load a Whisper model (default loader for the registry)
+def load_whisper_model(model_type):
+    """Load an openai-whisper model by name (e.g., "base.en")."""
+    import whisper
+    return whisper.load_model(model_type)
+
+# Function to estimate how much memory a loaded model keeps resident
+def model_memory_bytes(model):
+    """
+    Estimate the resident size of a model from its parameters, buffers and the packed
+    weights of dynamically quantized layers.
+
+    Parameters:
+    - model: Loaded model (torch modules are measured exactly, others report 0).
+
+    Returns:
+    - Size in bytes.
+    """
+    total = 0
+    for attribute in ("parameters", "buffers"):
+        tensors = getattr(model, attribute, None)
+        if callable(tensors):
+            total += sum(t.numel() * t.element_size() for t in tensors())
+    # quantize_dynamic keeps int8 weights in packed params, which are not parameters; a layer
+    # and its packed params both unpack them, so each storage is counted once
+    modules = getattr(model, "modules", None)
+    if callable(modules):
+        packed = {}
+        for module in modules():
+            weight_bias = getattr(module, "_weight_bias", None)
+            if callable(weight_bias):
+                for tensor in weight_bias():
+                    if tensor is not None:
+                        packed[tensor.data_ptr()] = tensor.numel() * tensor.element_size()
+        total += sum(packed.values())
+    return total
+
+# Function to read the resident memory of this process
+def resident_memory_bytes():
+    """
+    Returns:
+    - Current RSS in bytes (via psutil when installed, else from the OS), or None when the
+      platform does not report it.
+    """
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        if sys.platform == "win32":
+            import ctypes
+            from ctypes import wintypes
+
+            class ProcessMemoryCounters(ctypes.Structure):
+                _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD)] + [
+                    (field, ctypes.c_size_t) for field in (
+                        "PeakWorkingSetSize", "WorkingSetSize", "QuotaPeakPagedPoolUsage",
+                        "QuotaPagedPoolUsage", "QuotaPeakNonPagedPoolUsage",
+                        "QuotaNonPagedPoolUsage", "PagefileUsage", "PeakPagefileUsage")]
+
+            counters = ProcessMemoryCounters()
+            counters.cb = ctypes.sizeof(counters)
+            process = ctypes.windll.kernel32.GetCurrentProcess()
+            if not ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+                return None
+            return counters.WorkingSetSize
+        with open("/proc/self/statm", "r") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+# Process-wide cache of loaded speech models
+class ModelRegistry:
+    """
+    Loads each model once and hands out the same instance on later calls.
+
+    Models are kept in least-recently-used order; when a memory budget is set and the
+    loaded models exceed it, the least recently used ones are evicted. Torch models are
+    sized from their weights; engines that keep theirs outside torch (e.g., CTranslate2)
+    are sized by the growth of the process RSS during their load, which also counts
+    whatever other threads allocate meanwhile.
+
+    Parameters:
+    - memory_budget_mb: Maximum total resident size of loaded models (None for no limit).
+    - loader: Function that loads a model given its name (default: openai-whisper).
+    """
+
+    def __init__(self, memory_budget_mb=None, loader=load_whisper_model):
+        self.memory_budget_mb = memory_budget_mb
+        self.loader = loader
+        self._models = OrderedDict()  # name -> model, least recently used first
+        self._info = {}  # name -> load statistics
+        self._loading = {}  # name -> Event set when an in-flight load finishes
+        self._lock = threading.Lock()
+
+    def get(self, name, loader=None):
+        """
+        Return the loaded model for name, loading it on first use.
+
+        Parameters:
+        - name: Model name (e.g., "small.en").
+        - loader: Optional loader overriding the registry default for this model.
+
+        Returns:
+        - Loaded model instance (the same object on every call until evicted).
+        """
+        while True:
+            with self._lock:
+                if name in self._models:
+                    self._models.move_to_end(name)
+                    self._info[name]["hits"] += 1
+                    return self._models[name]
+                pending = self._loading.get(name)
+                if pending is None:
+                    pending = self._loading[name] = threading.Event()
+                    break
+            # Another thread is loading this model; wait for it instead of loading twice
+            pending.wait()
+
+        try:
+            resident_before = resident_memory_bytes()
+            start = time.perf_counter()
+            model = (loader or self.loader)(name)
+            load_time = time.perf_counter() - start
+            memory_bytes = model_memory_bytes(model)
+            if not memory_bytes and resident_before is not None:
+                memory_bytes = max(0, (resident_memory_bytes() or resident_before) - resident_before)
+            with self._lock:
+                self._models[name] = model
+                self._info[name] = {
+                    "load_time": load_time,
+                    "memory_mb": memory_bytes / (1024 * 1024),
+                    "hits": 0,
+                }
+                self._evict_over_budget(keep=name)
+            print(f"Loaded model {name} in {load_time:.2f}s ({memory_bytes / (1024 * 1024):.0f} MB)")
+            return model
+        finally:
+            with self._lock:
+                self._loading.pop(name, None)
+            pending.set()
+
+    def warm(self, name, loader=None):
+        """
+        Load a model in a background thread so the first real call finds it ready.
+
+        Returns:
+        - The started daemon thread.
+        """
+        thread = threading.Thread(target=self.get, args=(name, loader), name=f"warm-{name}")
+        thread.daemon = True
+        thread.start()
+        return thread
+
+    def _evict_over_budget(self, keep=None):
+        """Evict least recently used models until the memory budget is met (lock held)."""
+        if self.memory_budget_mb is None:
+            return
+        for name in list(self._models):
+            if self._resident_mb() <= self.memory_budget_mb:
+                break
+            if name != keep:
+                self._drop(name)
+
+    def _resident_mb(self):
+        return sum(self._info[name]["memory_mb"] for name in self._models)
+
+    def _drop(self, name):
+        del self._models[name]
+        self._info.pop(name, None)
+        print(f"Evicted model {name} from the registry")
+
+    def evict(self, name):
+        """Unload a model so its memory can be reclaimed."""
+        with self._lock:
+            if name in self._models:
+                self._drop(name)
+        gc.collect()
+
+    def loaded(self):
+        """Return the names of the loaded models, least recently used first."""
+        with self._lock:
+            return list(self._models)
+
+    def stats(self):
+        """Return load time, resident memory and hit count for every loaded model."""
+        with self._lock:
+            return {name: dict(self._info[name]) for name in self._models}
+
+# Shared registry used by the transcription functions
+model_registry = ModelRegistry()
+
+# Function to get a cached Whisper model
+def get_whisper_model(model_type):
+    """Return the shared Whisper model for model_type, loading it once per process."""
+    return model_registry.get(model_type)
+
+# Function to start loading a Whisper model in the background
+def warm_whisper_model(model_type):
+    """Begin loading model_type in the background (e.g., at application startup)."""
+    return model_registry.warm(model_type)
@@ -0,0 +1,192 @@
+import io
+import numpy as np
+import soundfile as sf
+
+# Bitrates (kbit/s) of MPEG Layer III frames, indexed by the 4-bit bitrate field
+_BITRATES = {
+    "mpeg1": (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    "mpeg2": (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+# Sample rates indexed by the 2-bit version field and then the 2-bit sample rate field
+_SAMPLE_RATES = {
+    3: (44100, 48000, 32000),  # MPEG-1
+    2: (22050, 24000, 16000),  # MPEG-2
+    0: (11025, 12000, 8000),   # MPEG-2.5
+}
+
+# Function to parse one MPEG Layer III frame header
+def parse_mp3_header(data, offset=0):
+    """
+    Parse the 4-byte MP3 frame header at offset.
+
+    Parameters:
+    - data: Bytes-like object holding the stream.
+    - offset: Position of the header in data.
+
+    Returns:
+    - (frame_length, sample_rate, samples_per_frame), or None if there is no valid
+      Layer III header at offset.
+    """
+    if offset + 4 > len(data):
+        return None
+    b0, b1, b2 = data[offset], data[offset + 1], data[offset + 2]
+    if b0 != 0xFF or b1 & 0xE0 != 0xE0:
+        return None
+    version = (b1 >> 3) & 0x03
+    layer = (b1 >> 1) & 0x03
+    bitrate_index = b2 >> 4
+    rate_index = (b2 >> 2) & 0x03
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+        return None  # Reserved values, or not Layer III / free format
+
+    padding = (b2 >> 1) & 0x01
+    sample_rate = _SAMPLE_RATES[version][rate_index]
+    if version == 3:
+        bitrate = _BITRATES["mpeg1"][bitrate_index] * 1000
+        return 144 * bitrate // sample_rate + padding, sample_rate, 1152
+    bitrate = _BITRATES["mpeg2"][bitrate_index] * 1000
+    return 72 * bitrate // sample_rate + padding, sample_rate, 576
+
+# Function to check whether an MP3 frame is a Xing/Info/VBRI header frame
+def _is_info_frame(frame):
+    """True if the frame carries the stream's Xing, Info or VBRI header instead of audio."""
+    head = bytes(frame[:64])
+    return b"Xing" in head or b"Info" in head or b"VBRI" in head
+
+# Incremental MP3 decoder for audio that arrives over the network in pieces
+class Mp3StreamDecoder:
+    """
+    Decode an MP3 byte stream to PCM while it is still arriving.
+
+    Incoming bytes are split into frames using their headers. Every decode_frames complete
+    frames are decoded with soundfile together with already-decoded frames in front of
+    them, so the bit reservoir and overlap of the first new frame are primed; only the
+    samples of the new frames are returned. Made for constant-bitrate streams such as
+    edge_tts sends; streams that cannot be split (e.g., not Layer III) are decoded in one
+    piece by flush().
+
+    Parameters:
+    - decode_frames: New frames decoded per call into soundfile (latency vs. overhead).
+    - preroll_frames: Previous frames re-decoded to prime the decoder (None: as many as the
+      bit reservoir can reach back, plus two).
+    """
+
+    def __init__(self, decode_frames=8, preroll_frames=None):
+        self.decode_frames = decode_frames
+        self.preroll_frames = preroll_frames
+        self.sample_rate = None
+        self.samples_per_frame = None
+        self._data = bytearray()
+        self._frames = []  # (start, end) byte offsets of complete frames
+        self._scan = 0  # Offset where the next frame header is expected
+        self._decoded = 0  # Number of frames already returned as PCM
+        self._splittable = True
+
+    def _skip_id3(self):
+        """Skip an ID3v2 tag at the start of the stream; False until the tag is complete."""
+        if self._scan or not self._data.startswith(b"ID3"):
+            return True
+        if len(self._data) < 10:
+            return False
+        size = 0
+        for byte in self._data[6:10]:
+            size = (size << 7) | (byte & 0x7F)
+        if len(self._data) < 10 + size:
+            return False
+        self._scan = 10 + size
+        return True
+
+    def _split_frames(self):
+        """Record every complete frame that has arrived since the last call."""
+        if not self._skip_id3():
+            return
+        data = self._data
+        while self._scan + 4 <= len(data):
+            header = parse_mp3_header(data, self._scan)
+            if header is None:
+                if not self._frames:
+                    # Leading garbage: give up on splitting if no sync word shows up soon
+                    if self._scan > 4096:
+                        self._splittable = False
+                        return
+                self._scan += 1  # Resynchronise on the next header
+                continue
+            length, sample_rate, samples_per_frame = header
+            if self._scan + length > len(data):
+                return
+            if self.sample_rate is None:
+                self.sample_rate = sample_rate
+                self.samples_per_frame = samples_per_frame
+                if _is_info_frame(data[self._scan:self._scan + length]):
+                    # Gapless info of the whole file, no audio: it would make the decoder trim
+                    # the start of whichever run of frames it is decoded with
+                    self._scan += length
+                    continue
+            self._frames.append((self._scan, self._scan + length))
+            self._scan += length
+
+    def _decode(self, data):
+        """Decode a self-contained run of MP3 frames to mono float32."""
+        audio, sample_rate = sf.read(io.BytesIO(bytes(data)), dtype='float32')
+        self.sample_rate = sample_rate
+        return audio.mean(axis=1) if audio.ndim > 1 else audio
+
+    def _preroll_start(self):
+        """Index of the first already-decoded frame to decode again before the new ones."""
+        if self.preroll_frames is not None:
+            return max(0, self._decoded - self.preroll_frames)
+        # The first new frame may take up to 511 (MPEG-1) or 255 bytes of its data from the
+        # frames before it, and the decoder needs two more frames before its output settles
+        reservoir = 511 if self.samples_per_frame == 1152 else 255
+        first = self._decoded
+        while first > 0 and reservoir > 0:
+            first -= 1
+            start, end = self._frames[first]
+            reservoir -= end - start
+        return max(0, first - 2)
+
+    def _decode_frames(self, end):
+        """Decode frames up to end (exclusive) and return the PCM of the new ones."""
+        first = self._preroll_start()
+        # soundfile estimates the length of a run without an info frame from its size and
+        # may cut the last few samples, so one frame after the new ones is decoded as well
+        # (at the end of the stream, a copy of the last frame)
+        data = self._data[self._frames[first][0]:self._frames[end - 1][1]]
+        start, stop = self._frames[min(end, len(self._frames) - 1)]
+        audio = self._decode(data + self._data[start:stop])
+        # Drop the preroll and the lookahead: keep the samples that belong to the new frames
+        audio = audio[(self._decoded - first) * self.samples_per_frame:
+                      (end - first) * self.samples_per_frame]
+        self._decoded = end
+        return audio
+
+    def feed(self, data):
+        """
+        Add received MP3 bytes.
+
+        Parameters:
+        - data: Next piece of the MP3 stream.
+
+        Returns:
+        - Mono float32 PCM that could be decoded so far (may be empty).
+        """
+        self._data.extend(data)
+        if self._splittable:
+            self._split_frames()
+        # The newest frame is kept back as the lookahead of the frames before it
+        if not self._splittable or len(self._frames) - 1 - self._decoded < self.decode_frames:
+            return np.zeros(0, dtype='float32')
+        return self._decode_frames(len(self._frames) - 1)
+
+    def flush(self):
+        """Decode everything that is left once the stream has ended."""
+        if self._splittable and self._frames:
+            if self._decoded == len(self._frames):
+                return np.zeros(0, dtype='float32')
+            return self._decode_frames(len(self._frames))
+        if not self._data:
+            return np.zeros(0, dtype='float32')
+        # The stream could not be split into frames: decode it in one piece
+        audio = self._decode(self._data)
+        self._data.clear()
+        return audio
@@ -0,0 +1,228 @@
+import asyncio
+import functools
+from collections import deque
+
+# Function to get the tiktoken encoding once, if tiktoken is installed
+@functools.lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    return tiktoken.get_encoding("cl100k_base")
+
+# Function to count the tokens of a piece of text
+def count_tokens(text):
+    """
+    Count tokens with tiktoken's cl100k_base when installed, else estimate them (about four
+    characters per token, at least one per word), which is close for English prompts.
+    """
+    if not text:
+        return 0
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return max(len(text.split()), (len(text) + 3) // 4)
+
+# Function to cut text down to a number of tokens at word boundaries
+def truncate_tokens(text, max_tokens, keep="head"):
+    """
+    Parameters:
+    - text: Text to shorten.
+    - max_tokens: Token budget.
+    - keep: "head" keeps the beginning, "tail" keeps the end (e.g., the latest history).
+
+    Returns:
+    - The text itself if it fits, else the longest run of whole words that does.
+    """
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+    words = text.split()
+    low, high = 0, len(words)  # Binary search for the number of words that fits
+    while low < high:
+        middle = (low + high + 1) // 2
+        part = words[:middle] if keep == "head" else words[-middle:]
+        if count_tokens(" ".join(part)) <= max_tokens:
+            low = middle
+        else:
+            high = middle - 1
+    if not low:
+        return ""
+    return " ".join(words[:low] if keep == "head" else words[-low:])
+
+# Budget of one prompt section
+class PromptSection:
+    """
+    Parameters:
+    - budget: Tokens the section may use at most (None: whatever the other sections and
+      the fixed text leave).
+    - priority: Sections with lower priority are trimmed first when the prompt is too long.
+    - keep: Part kept when trimming ("head" or "tail").
+    """
+
+    def __init__(self, budget, priority=0, keep="head"):
+        self.budget = budget
+        self.priority = priority
+        self.keep = keep
+
+# Fits the variable parts of a prompt into a fixed token budget
+class PromptBuilder:
+    """
+    Each section is first cut to its own budget; if the sections together still exceed
+    what the fixed text leaves of max_tokens, the lowest-priority sections are trimmed
+    further until they fit. The prompt therefore stays the same size however much
+    retrieval or history returns.
+
+    Parameters:
+    - max_tokens: Tokens the whole prompt may use, fixed text (e.g., the instructions)
+      included; the fixed text itself is never trimmed.
+    - sections: Dictionary of section name -> PromptSection.
+    """
+
+    def __init__(self, max_tokens, sections):
+        self.max_tokens = max_tokens
+        self.sections = sections
+
+    def fit(self, fixed="", **texts):
+        """
+        Trim the given section texts to the budget.
+
+        Parameters:
+        - fixed: Text sent in full (e.g., the instructions); its tokens are taken off max_tokens.
+        - texts: Section name -> text.
+
+        Returns:
+        - (fitted, report): dictionary of section name -> trimmed text, and a dictionary
+          with the tokens used per section and by the fixed text, the total and the names
+          of trimmed sections.
+        """
+        fixed_tokens = count_tokens(fixed)
+        fitted, tokens, trimmed = {}, {}, []
+        for name, text in texts.items():
+            section = self.sections[name]
+            text = " ".join((text or "").split())
+            fitted[name] = text if section.budget is None else \
+                truncate_tokens(text, section.budget, section.keep)
+            tokens[name] = count_tokens(fitted[name])
+            if fitted[name] != text:
+                trimmed.append(name)
+
+        excess = sum(tokens.values()) - max(0, self.max_tokens - fixed_tokens)
+        for name in sorted(fitted, key=lambda name: self.sections[name].priority):
+            if excess <= 0:
+                break
+            section = self.sections[name]
+            fitted[name] = truncate_tokens(fitted[name], tokens[name] - excess, section.keep)
+            excess -= tokens[name] - count_tokens(fitted[name])
+            tokens[name] = count_tokens(fitted[name])
+            if name not in trimmed:
+                trimmed.append(name)
+
+        return fitted, {"tokens": tokens, "fixed": fixed_tokens,
+                        "total": fixed_tokens + sum(tokens.values()), "trimmed": trimmed}
+
+# Summary of the whole session, updated in the background as turns age out
+class RollingSummary:
+    """
+    Keep the last keep_turns exchanges verbatim and fold older ones into a summary of
+    at most max_tokens tokens. Folding sends only the current summary and the turns that
+    aged out, so each update costs the same however long the meeting runs; it runs as a
+    background task and never delays a reply.
+
+    Parameters:
+    - summarize: Async function (prompt) -> text, e.g. an LLM call; without it the
+      summary is the aged-out turns trimmed to max_tokens.
+    - keep_turns: Latest exchanges kept verbatim.
+    - max_tokens: Size cap of the summary.
+    """
+
+    def __init__(self, summarize=None, keep_turns=2, max_tokens=250):
+        self.summarize = summarize
+        self.keep_turns = keep_turns
+        self.max_tokens = max_tokens
+        self.summary = ""
+        self.turns = deque()  # Latest exchanges as {"user": ..., "reply": ...}
+        self._pending = []  # Aged-out exchanges not folded into the summary yet
+        self._task = None
+        self.updates = 0
+
+    def add_turn(self, user, reply=None):
+        """
+        Record an exchange as soon as the user has spoken; must be called on the event loop.
+
+        Parameters:
+        - user: The user's words.
+        - reply: The reply, if already known; otherwise pass it to finish_turn() later.
+
+        Returns:
+        - The exchange's dictionary.
+        """
+        turn = {"user": user, "reply": reply or "", "finished": reply is not None}
+        self.turns.append(turn)
+        while len(self.turns) > self.keep_turns:
+            self._pending.append(self.turns.popleft())
+        self._start_fold()
+        return turn
+
+    def finish_turn(self, turn, reply, user=None):
+        """
+        Fill in the reply (and optionally a cleaned-up version of the user's words) of an
+        exchange from add_turn(); it is only folded into the summary after this.
+        """
+        turn["reply"] = reply
+        if user is not None:
+            turn["user"] = user
+        turn["finished"] = True
+        self._start_fold()
+
+    def _start_fold(self):
+        if self._pending and self._pending[0]["finished"] and (self._task is None or self._task.done()):
+            self._task = asyncio.ensure_future(self._fold())
+
+    @staticmethod
+    def _format(turns):
+        return " ".join(
+            f"User: {turn['user'].strip()}"
+            + (f" Manager: {turn['reply'].strip()}" if turn["reply"].strip() else "")
+            for turn in turns
+        )
+
+    def recent(self):
+        """Return the exchanges not folded into the summary yet, oldest first."""
+        return self._format(self._pending + list(self.turns))
+
+    async def _fold(self):
+        while True:
+            # Only exchanges whose reply is known, oldest first, so order is kept
+            ready = 0
+            while ready < len(self._pending) and self._pending[ready]["finished"]:
+                ready += 1
+            if not ready:
+                return
+            turns = self._pending[:ready]
+            if self.summarize is None:
+                summary = f"{self.summary} {self._format(turns)}"
+            else:
+                prompt = (
+                    "Update the running summary of a meeting with the new exchanges. Keep "
+                    "decisions, owners, dates, numbers and open questions; drop small talk. "
+                    f"Answer with the summary only, in at most {self.max_tokens * 3 // 4} words.\n"
+                    f"Current summary: {self.summary or '(empty)'}\n"
+                    f"New exchanges: {self._format(turns)}"
+                )
+                try:
+                    summary = await self.summarize(prompt)
+                except Exception as e:
+                    print(f"Error occurred while updating the session summary: {e}")
+                    return  # The turns stay pending and are folded with the next ones
+            # Over-long summaries keep their latest part
+            self.summary = truncate_tokens(" ".join(summary.split()), self.max_tokens, keep="tail")
+            del self._pending[:len(turns)]
+            self.updates += 1
+
+    async def close(self):
+        """Wait for a running update (e.g., before the summary is saved)."""
+        if self._task is not None:
+            await asyncio.gather(self._task, return_exceptions=True)
@@ -0,0 +1,126 @@
+import random
+from collections import deque
+from StreamingTranscription import normalize_word
+
+_MODULUS = (1 << 61) - 1  # Mersenne prime keeps rolling-hash collisions negligible
+
+# Filter that removes runaway repetitions from the transcript of a turn
+class RepetitionFilter:
+    """
+    Drop repeated phrases (tandem repeats) from a stream of transcribed words.
+
+    Every kept word extends a rolling polynomial hash, so comparing the last n words with
+    the n words before them costs O(1) for each n in ngram_sizes. When a phrase of n words
+    has been repeated more than limit times in a row, the extra copy is removed and only
+    that copy is dropped; the transcription carries on. State spans calls, so loops that
+    cross chunk boundaries are caught as well; call reset() between turns so that a short
+    answer repeated in successive turns is kept.
+
+    A word is held back only while a phrase run in progress could still grow past the
+    limit and roll it back; other words are released as soon as they are fed.
+
+    Parameters:
+    - limit: Maximum number of consecutive copies of a phrase that are kept.
+    - ngram_sizes: Phrase lengths (in words) checked for repetition.
+    """
+
+    def __init__(self, limit=3, ngram_sizes=tuple(range(1, 17))):
+        self.limit = max(1, limit)
+        self.ngram_sizes = tuple(sorted(set(ngram_sizes)))
+        self._base = random.randrange(1 << 20, _MODULUS - 1)
+        self._powers = {n: pow(self._base, n, _MODULUS) for n in self.ngram_sizes}
+        self.dropped_words = 0  # Over every turn
+        self.reset()
+
+    def reset(self):
+        """Forget the words seen so far (e.g., at the start of a turn); held-back words are discarded."""
+        history = 4 * self.ngram_sizes[-1]  # Enough to compare 2n words even right after a rollback
+        # Per kept word: prefix hash and the repeat run length for every n-gram size
+        self._prefix = deque([0], maxlen=history + 1)
+        self._runs = deque([(0,) * len(self.ngram_sizes)], maxlen=history + 1)
+        self._kept = 0  # Number of kept words since the last reset
+        self._pending = deque()  # Kept words not yet released
+
+    def _window_hash(self, end, length):
+        """Hash of the `length` kept words ending `end` words before the newest one."""
+        prefix = self._prefix
+        last = len(prefix) - 1 - end
+        return (prefix[last] - prefix[last - length] * self._powers[length]) % _MODULUS
+
+    def _append(self, word):
+        """Keep one word and drop the newest copy if a phrase now repeats too often."""
+        token = hash(normalize_word(word)) % _MODULUS
+        self._prefix.append((self._prefix[-1] * self._base + token) % _MODULUS)
+        self._kept += 1
+        self._pending.append(word)
+
+        runs = []
+        excess = 0
+        previous = self._runs[-1]
+        available = len(self._prefix) - 1
+        for index, n in enumerate(self.ngram_sizes):
+            if available >= 2 * n and self._window_hash(0, n) == self._window_hash(n, n):
+                run = previous[index] + 1
+            else:
+                run = 0
+            runs.append(run)
+            # A run of (copies - 2) * n + 1 means `copies` back-to-back copies just completed
+            if not excess and run == (self.limit - 1) * n + 1:
+                excess = n
+        self._runs.append(tuple(runs))
+
+        if excess:
+            # Roll back the copy that exceeded the limit
+            for _ in range(excess):
+                self._prefix.pop()
+                self._runs.pop()
+                if self._pending:
+                    self._pending.pop()
+            self._kept -= excess
+            self.dropped_words += excess
+
+    def _held_back(self):
+        """Number of newest kept words that a later rollback could still remove."""
+        held, distance = 0, 0
+        # Rollbacks of held words return to the state after an older word, so every such
+        # state is checked as well as the newest one
+        while distance <= held and distance < len(self._runs):
+            for n, run in zip(self.ngram_sizes, self._runs[-1 - distance]):
+                # A rollback of n words needs the run to reach (limit - 1) * n + 1, and each new
+                # word adds at most one to it (and moves the older words one further back)
+                words_needed = max(1, (self.limit - 1) * n + 1 - run)
+                held = max(held, distance + n - words_needed)
+            distance += 1
+        return held
+
+    def feed(self, text):
+        """
+        Filter the next piece of transcript.
+
+        Parameters:
+        - text: Newly transcribed text.
+
+        Returns:
+        - Text of the words that are now final (lags the input only during a repeat).
+        """
+        for word in text.split():
+            self._append(word)
+        released = []
+        held = self._held_back()
+        while len(self._pending) > held:
+            released.append(self._pending.popleft())
+        return " ".join(released)
+
+    def peek(self):
+        """Return the held-back words without releasing them (e.g., for a partial transcript)."""
+        return " ".join(self._pending)
+
+    def flush(self):
+        """Release every held-back word (e.g., at the end of a turn); state is kept."""
+        released = " ".join(self._pending)
+        self._pending.clear()
+        return released
+
+    def filter(self, text):
+        """Filter a complete piece of text in one call (feed followed by flush)."""
+        return " ".join(part for part in (self.feed(text), self.flush()) if part)
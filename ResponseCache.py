@@ -0,0 +1,204 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+from StreamingTranscription import normalize_word
+
+# Function to reduce text to the words that matter for cache lookups
+def normalize_prompt(text):
+    """Lower-case the words and drop punctuation, so trivial differences still match."""
+    return " ".join(word for word in map(normalize_word, text.split()) if word)
+
+# Lookup key of a cached response, with its embedding computed only when needed
+class CacheKey:
+    """
+    Parameters:
+    - stage: Name of the LLM call (e.g., "cleanup" or "reply"); counted separately.
+    - text: Text the response depends on (e.g., the user's words).
+    - namespace: Anything else that must match exactly (e.g., the prompt template and the
+      context the response was built on).
+    - embed: Function (list of texts) -> list of vectors, or None for exact matching only.
+    """
+
+    def __init__(self, stage, text, namespace="", embed=None):
+        self.stage = stage
+        self.text = normalize_prompt(text)
+        self.namespace = hashlib.sha256(f"{stage}\n{namespace}".encode("utf-8")).hexdigest()
+        self.digest = hashlib.sha256(f"{self.namespace}\n{self.text}".encode("utf-8")).hexdigest()
+        self._embed = embed
+        self._embedding = None
+
+    @property
+    def semantic(self):
+        """True when the key may match similar texts, not only the same one."""
+        return self._embed is not None
+
+    @property
+    def embedding(self):
+        """Unit-length embedding of the normalized text (None without an embedder)."""
+        if self._embedding is None and self._embed is not None and self.text:
+            vector = np.asarray(self._embed([self.text])[0], dtype='float32')
+            norm = np.linalg.norm(vector)
+            self._embedding = vector / norm if norm else vector
+        return self._embedding
+
+# Two-tier cache of LLM responses: exact hash first, then embedding similarity
+class ResponseCache:
+    """
+    Cache of LLM responses for prompts that repeat (e.g., the same status update in every
+    stand-up). A lookup first tries the SHA-256 of the normalized text, which costs no
+    embedding; on a miss it embeds the text and returns the most similar entry of the same
+    stage and namespace if its cosine similarity reaches threshold.
+
+    Only keys created with semantic=True take part in the similarity tier; responses that
+    must not stand in for different words (e.g., a cleaned-up transcript) use exact keys.
+
+    Entries expire after ttl seconds and the least recently used ones are evicted beyond
+    max_entries. With a path the cache is kept in a JSON file, so it survives restarts;
+    stores are batched into one write save_delay seconds after the first of them (call
+    save() before exiting). All methods are thread-safe; lookups that embed are blocking
+    and belong in an executor.
+
+    Parameters:
+    - embed: Function (list of texts) -> list of vectors (e.g., LongTermMemory.embed_texts),
+      or None for the exact tier only.
+    - threshold: Minimum cosine similarity of a semantic hit.
+    - ttl: Seconds an entry stays valid.
+    - max_entries: Number of entries kept at most.
+    - path: Optional JSON file the cache is loaded from and saved to.
+    - save_delay: Seconds stores are collected before the file is rewritten.
+    """
+
+    def __init__(self, embed=None, threshold=0.92, ttl=7 * 24 * 3600, max_entries=512, path=None,
+                 save_delay=30.0):
+        self.embed = embed
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.path = path
+        self.save_delay = save_delay
+        self._lock = threading.Lock()
+        self._save_timer = None  # Pending batched save
+        # digest -> {"namespace", "stage", "text", "value", "created", "embedding"}, oldest first
+        self._entries = OrderedDict()
+        self.counts = {}  # stage -> {"exact_hits", "semantic_hits", "misses"}
+        self._load()
+
+    def key(self, stage, text, namespace="", semantic=True):
+        """
+        Return the CacheKey for get() and put().
+
+        Parameters:
+        - semantic: False to match the exact normalized text only.
+        """
+        return CacheKey(stage, text, namespace, self.embed if semantic else None)
+
+    def _count(self, stage, outcome):
+        counts = self.counts.setdefault(stage, {"exact_hits": 0, "semantic_hits": 0, "misses": 0})
+        counts[outcome] += 1
+
+    def _expire(self, now):
+        """Drop expired entries (caller holds the lock)."""
+        for digest in [d for d, entry in self._entries.items() if now - entry["created"] > self.ttl]:
+            del self._entries[digest]
+
+    def get(self, key):
+        """
+        Look up a response.
+
+        Returns:
+        - The cached value, or None on a miss.
+        """
+        with self._lock:
+            self._expire(time.time())
+            entry = self._entries.get(key.digest)
+            if entry is not None:
+                self._entries.move_to_end(key.digest)
+                self._count(key.stage, "exact_hits")
+                return entry["value"]
+            candidates = [(digest, entry) for digest, entry in self._entries.items()
+                          if entry["namespace"] == key.namespace and entry["embedding"] is not None]
+        # Semantic tier: embed outside the lock (exact keys and empty texts have no embedding)
+        embedding = key.embedding if candidates else None
+        if embedding is None:
+            with self._lock:
+                self._count(key.stage, "misses")
+            return None
+
+        # Compare with every candidate at once
+        similarities = np.stack([entry["embedding"] for _, entry in candidates]) @ embedding
+        best = int(np.argmax(similarities))
+        with self._lock:
+            digest, entry = candidates[best]
+            if similarities[best] < self.threshold or digest not in self._entries:
+                self._count(key.stage, "misses")
+                return None
+            self._entries.move_to_end(digest)
+            self._count(key.stage, "semantic_hits")
+            return entry["value"]
+
+    def put(self, key, value):
+        """Store a response (JSON serializable), evicting the least recently used entries."""
+        embedding = key.embedding
+        with self._lock:
+            self._entries.pop(key.digest, None)
+            self._entries[key.digest] = {
+                "namespace": key.namespace, "stage": key.stage, "text": key.text,
+                "value": value, "created": time.time(), "embedding": embedding,
+            }
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            if self.path and self._save_timer is None:
+                self._save_timer = threading.Timer(self.save_delay, self.save)
+                self._save_timer.daemon = True
+                self._save_timer.start()
+
+    def stats(self):
+        """Return hit and miss counts per stage, with the hit rate."""
+        with self._lock:
+            result = {}
+            for stage, counts in self.counts.items():
+                lookups = sum(counts.values())
+                hits = counts["exact_hits"] + counts["semantic_hits"]
+                result[stage] = dict(counts, hit_rate=round(hits / lookups, 3) if lookups else 0.0)
+            result["entries"] = len(self._entries)
+            return result
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as cache_file:
+                entries = json.load(cache_file)
+        except (OSError, ValueError) as e:
+            print(f"Could not load the response cache {self.path}: {e}")
+            return
+        now = time.time()
+        for digest, entry in entries:
+            if now - entry["created"] > self.ttl:
+                continue
+            if entry.get("embedding") is not None:
+                entry["embedding"] = np.asarray(entry["embedding"], dtype='float32')
+            self._entries[digest] = entry
+
+    def save(self):
+        """Write the cache to its JSON file now (no-op without a path)."""
+        if not self.path:
+            return
+        with self._lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+            entries = [
+                (digest, dict(entry, embedding=None if entry["embedding"] is None
+                              else entry["embedding"].tolist()))
+                for digest, entry in self._entries.items()
+            ]
+        # Write then rename, so a crash never leaves a half-written cache behind
+        temporary = f"{self.path}.{threading.get_ident()}.tmp"
+        with open(temporary, "w", encoding="utf-8") as cache_file:
+            json.dump(entries, cache_file)
+        os.replace(temporary, self.path)
@@ -1,48 +1,44 @@
-import asyncio
-import edge_tts
-import io
-import pygame
-
-VOICES = [
-    'en-IN-NeerjaNeural', 
-    'en-IN-PrabhatNeural', 
-    'en-CA-ClaraNeural',
-    'en-CA-LiamNeural', 
-    'en-GB-LibbyNeural', 
-    'zh-CN-YunyangNeural',
-    'zh-CN-XiaoxiaoNeural'
-]
-
-async def amain(text: str, voice: str, rate: str, pitch: str) -> io.BytesIO:
-    communicate = edge_tts.Communicate(text=text, voice=voice, rate=rate, pitch=pitch)
-    audio_data = io.BytesIO()
-
-    # Iterate over the async generator to get the chunks of audio
-    async for chunk in communicate.stream():
-        if chunk['type'] == 'audio':
-            audio_data.write(chunk['data'])  # Write audio data to BytesIO
-
-    audio_data.seek(0)  # Reset stream position to the start
-    return audio_data
-
-async def play_audio(text: str, voice_number: int = 0, rate: str = "+40%", pitch: str = "+10Hz"):
-    # Initialize pygame mixer for playing audio
-    pygame.mixer.init()
-
-    # Select the voice based on the voice_number provided
-    voice = VOICES[voice_number]
-
-    # Fetch audio from edge_tts in memory
-    audio_data = await amain(text, voice, rate, pitch)
-
-    # Load the audio stream into pygame for playback
-    pygame.mixer.music.load(audio_data, "mp3")
-
-    # Play the audio
-    pygame.mixer.music.play()
-
-    # Wait for the audio to finish playing
-    while pygame.mixer.music.get_busy():
-        pygame.time.Clock().tick(10)
-
+import asyncio
+import io
+from AudioSink import get_output_sink
+from TtsCache import cached_synthesis
+from TtsPool import get_tts_pool
+
+VOICES = [
+    'en-IN-NeerjaNeural', 
+    'en-IN-PrabhatNeural', 
+    'en-CA-ClaraNeural',
+    'en-CA-LiamNeural', 
+    'en-GB-LibbyNeural', 
+    'zh-CN-YunyangNeural',
+    'zh-CN-XiaoxiaoNeural'
+]
+
+async def amain(text: str, voice: str, rate: str, pitch: str) -> io.BytesIO:
+    audio_data = io.BytesIO()
+
+    # Iterate over the audio chunks (over a pooled connection when pooling is enabled)
+    async for data in get_tts_pool().stream(text, voice, rate, pitch):
+        audio_data.write(data)  # Write audio data to BytesIO
+
+    audio_data.seek(0)  # Reset stream position to the start
+    return audio_data
+
+async def play_audio(text: str, voice_number: int = 0, rate: str = "+40%", pitch: str = "+10Hz",
+                     device=None):
+    # Select the voice based on the voice_number provided
+    voice = VOICES[voice_number]
+
+    # Decoded audio from the TTS cache, or fetched from edge_tts and cached
+    audio, sample_rate = await cached_synthesis(text, voice, rate, pitch, fetch=amain)
+
+    # Queue it on the persistent output stream (default speakers unless a device is given)
+    playback = get_output_sink(device).play(audio, sample_rate)
+
+    # Wait for the audio to finish playing (signalled by the sink, no polling)
+    try:
+        await playback.wait_async()
+    finally:
+        playback.cancel()  # Stops playback if we were cancelled
+
 # asyncio.run(play_audio(text="Your String here ", voice_number=0, rate="+10%", pitch="+8Hz"))
\ No newline at end of file
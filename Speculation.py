@@ -0,0 +1,172 @@
+import time
+import asyncio
+import difflib
+from StreamingTranscription import normalize_word
+
+# Function to compare two transcripts word by word
+def transcript_similarity(a, b):
+    """
+    Return the similarity (0-1) of two transcripts, ignoring case and punctuation.
+    """
+    words_a = [word for word in map(normalize_word, a.split()) if word]
+    words_b = [word for word in map(normalize_word, b.split()) if word]
+    if not words_a and not words_b:
+        return 1.0
+    return difflib.SequenceMatcher(None, words_a, words_b, autojunk=False).ratio()
+
+# Async stream that is consumed ahead of time and can be read later
+class BufferedStream:
+    """
+    Drain an async iterable in a background task, buffering its items, so that work such
+    as LLM generation starts before anyone is ready to consume it. Iterating yields the
+    buffered items first and then follows the live stream.
+
+    Parameters:
+    - source: Async iterable to drain.
+    """
+
+    def __init__(self, source):
+        self.items = []
+        self.started_at = time.perf_counter()
+        self.first_item_at = None  # perf_counter time the first item arrived
+        self._changed = asyncio.Event()
+        self._finished = False
+        self._error = None
+        self._task = asyncio.ensure_future(self._drain(source))
+
+    async def _drain(self, source):
+        try:
+            async for item in source:
+                if self.first_item_at is None:
+                    self.first_item_at = time.perf_counter()
+                self.items.append(item)
+                self._changed.set()
+        except asyncio.CancelledError:
+            if hasattr(source, "aclose"):
+                await source.aclose()
+            raise
+        except Exception as e:
+            self._error = e
+        finally:
+            self._finished = True
+            self._changed.set()
+
+    @property
+    def done(self):
+        return self._finished
+
+    def cancel(self):
+        """Stop consuming the source (e.g., stop paying for tokens nobody will hear)."""
+        self._task.cancel()
+
+    async def aclose(self):
+        """Same as cancel(), for consumers that close the async generators they are given."""
+        self.cancel()
+
+    async def __aiter__(self):
+        index = 0
+        while True:
+            if index < len(self.items):
+                index += 1
+                yield self.items[index - 1]
+                continue
+            if self._finished:
+                break
+            self._changed.clear()
+            await self._changed.wait()
+        if self._error is not None:
+            raise self._error
+
+# Work started on a partial transcript, kept or discarded once the final one arrives
+class Speculation:
+    """
+    Parameters:
+    - text: Partial transcript the work was started for.
+    - stream: BufferedStream of the work's output.
+    - context: Anything the caller needs to use the result (e.g., the prepared prompt).
+    """
+
+    def __init__(self, text, stream, context=None):
+        self.text = text
+        self.stream = stream
+        self.context = context
+
+# Starts speculative work on partial transcripts and checks it against the final one
+class Speculator:
+    """
+    Keep at most one speculation running: each new partial transcript replaces the
+    previous speculation (which is cancelled), and resolve() keeps the speculation only if
+    the final transcript matches it closely enough.
+
+    Parameters:
+    - start: Function (partial_text) -> Speculation, called on the event loop.
+    - threshold: Minimum transcript_similarity for the speculation to be used.
+    """
+
+    def __init__(self, start, threshold=0.9):
+        self.start = start
+        self.threshold = threshold
+        self.current = None
+        self.turns = 0
+        self.hits = 0
+        self.started = 0  # Speculations started (cancelled ones included)
+        self.wasted_items = 0  # Output items (e.g., LLM tokens) of discarded speculations
+        self.saved_seconds = 0.0
+
+    def on_partial(self, text):
+        """Speculate on a new partial transcript (replaces the running speculation)."""
+        if not text.strip():
+            return
+        if self.current is not None:
+            if transcript_similarity(self.current.text, text) >= 1.0:
+                return  # Same words: keep the running work
+            self.discard()
+        self.current = self.start(text)
+        self.started += 1
+
+    def discard(self):
+        """Cancel the running speculation, if any."""
+        if self.current is not None:
+            self.current.stream.cancel()
+            self.wasted_items += len(self.current.stream.items)
+            self.current = None
+
+    def resolve(self, text):
+        """
+        Match the final transcript against the running speculation.
+
+        Returns:
+        - (speculation, report): the Speculation to use (None on a miss) and a dictionary
+          with the similarity, hit flag and seconds of latency saved.
+        """
+        self.turns += 1
+        speculation, self.current = self.current, None
+        report = {"speculated": speculation is not None, "hit": False, "similarity": None,
+                  "saved_seconds": 0.0}
+        if speculation is None:
+            return None, report
+        report["similarity"] = round(transcript_similarity(speculation.text, text), 3)
+        if report["similarity"] < self.threshold:
+            self.current = speculation
+            self.discard()
+            return None, report
+        # The work has been running since the speculation started; it saved the time up
+        # to now, or up to its first output if that arrived earlier
+        stream = speculation.stream
+        now = time.perf_counter()
+        saved = min(now, stream.first_item_at or now) - stream.started_at
+        self.hits += 1
+        self.saved_seconds += saved
+        report.update(hit=True, saved_seconds=round(saved, 3))
+        return speculation, report
+
+    def stats(self):
+        """Return hit rate, latency saved and the output wasted on discarded speculations."""
+        return {
+            "turns": self.turns,
+            "hits": self.hits,
+            "hit_rate": round(self.hits / self.turns, 3) if self.turns else 0.0,
+            "speculations": self.started,
+            "saved_seconds": round(self.saved_seconds, 3),
+            "wasted_items": self.wasted_items,
+        }
@@ -0,0 +1,335 @@
+import re
+import time
+import asyncio
+from GmeetSpeak import OUTPUT_DEVICE, synthesize, play_pcm
+
+# Abbreviations that end with a period but do not end a sentence
+_ABBREVIATIONS = {"mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "vs", "etc", "e.g", "i.e", "approx"}
+_SENTENCE_END = re.compile(r"(?<=[.!?])[\"')\]]*\s+")
+
+# Function to split text into sentences that can be synthesized separately
+def split_sentences(text, min_length=20):
+    """
+    Split text at sentence boundaries.
+
+    Parameters:
+    - text: Text to split.
+    - min_length: Sentences shorter than this (in characters) are merged into the next one,
+      so short fragments like "Okay." do not each pay a synthesis round trip.
+
+    Returns:
+    - List of sentences (whitespace-normalised, never empty).
+    """
+    sentences = []
+    current = ""
+    start = 0
+    text = " ".join(text.split())
+    for match in _SENTENCE_END.finditer(text):
+        piece = text[start:match.end()].strip()
+        last_word = piece.rsplit(" ", 1)[-1].rstrip(".").lower()
+        if last_word in _ABBREVIATIONS:
+            continue  # "Dr. Smith", "e.g. the API" and the like
+        current = f"{current} {piece}".strip()
+        start = match.end()
+        if len(current) >= min_length:
+            sentences.append(current)
+            current = ""
+    current = f"{current} {text[start:].strip()}".strip()
+    if current:
+        if sentences and len(current) < min_length:
+            sentences[-1] = f"{sentences[-1]} {current}"
+        else:
+            sentences.append(current)
+    return sentences
+
+# Incremental sentence splitter for text that arrives in fragments
+class SentenceStream:
+    """
+    Cut a stream of text fragments (e.g., LLM tokens) into sentences as soon as they are
+    complete, using the same rules as split_sentences.
+
+    Parameters:
+    - min_length: As for split_sentences.
+    - max_length: Text longer than this without a sentence end is cut at the last comma
+      (or space), so a run-on sentence does not hold back speech.
+    """
+
+    def __init__(self, min_length=20, max_length=300):
+        self.min_length = min_length
+        self.max_length = max_length
+        self._pending = ""
+
+    def feed(self, fragment):
+        """
+        Add a fragment of text.
+
+        Returns:
+        - List of sentences completed by this fragment (often empty).
+        """
+        self._pending += fragment
+        # A sentence end only counts once the whitespace after it has arrived
+        end = 0
+        for match in _SENTENCE_END.finditer(self._pending):
+            last_word = (self._pending[:match.start()].split() or [""])[-1].rstrip(".").lower()
+            if last_word not in _ABBREVIATIONS:
+                end = match.end()
+        if end and len(self._pending[:end].strip()) >= self.min_length:
+            complete, self._pending = self._pending[:end], self._pending[end:]
+            return split_sentences(complete, self.min_length)
+        if len(self._pending) > self.max_length:
+            cut = self._pending.rfind(", ", 0, self.max_length) + 1 or self._pending.rfind(" ", 0, self.max_length)
+            if cut > 0:
+                complete, self._pending = self._pending[:cut], self._pending[cut:]
+                return [" ".join(complete.split())]
+        return []
+
+    def flush(self):
+        """Return what is left at the end of the stream (as a list of sentences)."""
+        sentences = split_sentences(self._pending, self.min_length)
+        self._pending = ""
+        return sentences
+
+# One sentence on its way through the queue
+class _Utterance:
+    __slots__ = ("text", "generation", "audio", "sample_rate")
+
+    def __init__(self, text, generation):
+        self.text = text
+        self.generation = generation
+        self.audio = None
+        self.sample_rate = None
+
+# Pipelined text-to-speech: synthesizes sentence N+1 while sentence N plays
+class SpeechQueue:
+    """
+    Queue of text to speak, split into sentences.
+
+    A synthesis task fetches TTS audio for upcoming sentences while a playback task plays
+    the current one, so after the first sentence synthesis is hidden behind playback.
+
+    Parameters:
+    - voice_number: Index into GmeetSpeak.VOICES.
+    - rate: Speaking rate passed to edge_tts (e.g., "+10%").
+    - pitch: Pitch passed to edge_tts (e.g., "+8Hz").
+    - device: Output device index or name.
+    - lookahead: Number of synthesized sentences held ready ahead of playback.
+    """
+
+    def __init__(self, voice_number=0, rate="+10%", pitch="+8Hz", device=OUTPUT_DEVICE, lookahead=1):
+        self.voice_number = voice_number
+        self.rate = rate
+        self.pitch = pitch
+        self.device = device
+        self.lookahead = lookahead
+        self._texts = None
+        self._ready = None
+        self._idle = None
+        self._tasks = []
+        self._synthesis = None  # Future of the sentence being synthesized
+        self._playback = None  # Future of the sentence being played
+        self._generation = 0  # Bumped by cancel() so in-flight sentences are discarded
+        self._pending = 0  # Sentences queued, synthesizing or playing in this generation
+        self.spoken = 0  # Sentences played to the end
+
+    @property
+    def depth(self):
+        """Number of sentences not yet played (queued, synthesizing, ready or playing)."""
+        return self._pending
+
+    @property
+    def speaking(self):
+        """True while a sentence is being played."""
+        return self._playback is not None and not self._playback.done()
+
+    def start(self):
+        """Start the synthesis and playback tasks on the running event loop (once)."""
+        if not self._tasks:
+            self._texts = asyncio.Queue()
+            self._ready = asyncio.Queue(maxsize=self.lookahead)
+            self._idle = asyncio.Event()
+            self._idle.set()
+            self._tasks = [
+                asyncio.ensure_future(self._synthesize_loop()),
+                asyncio.ensure_future(self._playback_loop()),
+            ]
+        return self
+
+    def put(self, text):
+        """
+        Queue text for speaking without waiting for it.
+
+        Returns:
+        - Number of sentences the text was split into.
+        """
+        self.start()
+        sentences = split_sentences(text)
+        for sentence in sentences:
+            self._texts.put_nowait(_Utterance(sentence, self._generation))
+        self._pending += len(sentences)
+        if self._pending:
+            self._idle.clear()
+        return len(sentences)
+
+    async def say(self, text):
+        """Queue text and wait until everything queued so far has been spoken."""
+        self.put(text)
+        await self.join()
+
+    async def join(self):
+        """Wait until the queue is empty and nothing is playing."""
+        if self._idle is not None:
+            await self._idle.wait()
+
+    def cancel(self):
+        """Stop the current sentence immediately and drop every queued one."""
+        if not self._tasks:
+            return
+        self._generation += 1
+        for queue in (self._texts, self._ready):
+            while not queue.empty():
+                queue.get_nowait()
+        for future in (self._synthesis, self._playback):
+            if future is not None:
+                future.cancel()
+        self._pending = 0
+        self._idle.set()
+
+    async def close(self):
+        """Cancel everything and stop the background tasks."""
+        self.cancel()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def _done(self, utterance):
+        """Account for one sentence leaving the queue."""
+        if utterance.generation != self._generation:
+            return  # Already written off by cancel()
+        self._pending -= 1
+        if self._pending <= 0:
+            self._pending = 0
+            self._idle.set()
+
+    async def _synthesize_loop(self):
+        while True:
+            utterance = await self._texts.get()
+            if utterance.generation != self._generation:
+                continue
+            self._synthesis = asyncio.ensure_future(
+                synthesize(utterance.text, self.voice_number, self.rate, self.pitch)
+            )
+            # asyncio.wait does not raise when only the synthesis itself was cancelled
+            await asyncio.wait([self._synthesis])
+            if self._synthesis.cancelled():
+                continue
+            if self._synthesis.exception() is not None:
+                print(f"Speech synthesis failed: {self._synthesis.exception()}")
+                self._done(utterance)
+                continue
+            utterance.audio, utterance.sample_rate = self._synthesis.result()
+            if utterance.generation != self._generation:
+                continue
+            await self._ready.put(utterance)  # Waits while lookahead sentences are ready
+
+    async def _playback_loop(self):
+        while True:
+            utterance = await self._ready.get()
+            if utterance.generation != self._generation:
+                continue
+            self._playback = asyncio.ensure_future(
+                play_pcm(utterance.audio, utterance.sample_rate, self.device)
+            )
+            await asyncio.wait([self._playback])
+            if self._playback.cancelled():
+                continue
+            if self._playback.exception() is not None:
+                print(f"Speech playback failed: {self._playback.exception()}")
+            else:
+                self.spoken += 1
+            self._done(utterance)
+
+# Function to speak a long text with sentence pipelining
+async def speak_sentences(text: str, voice_number: int = 0, rate: str = "+10%", pitch: str = "+8Hz",
+                          device=OUTPUT_DEVICE, barge_in=None):
+    """
+    Speak text sentence by sentence, synthesizing the next sentence during playback.
+
+    Parameters:
+    - barge_in: Optional BargeIn.BargeInMonitor; when a participant talks over the bot,
+      the remaining sentences are dropped.
+
+    Returns:
+    - True if the speech was interrupted by a barge-in, else False.
+    """
+    queue = SpeechQueue(voice_number, rate, pitch, device)
+    interrupted = False
+    if barge_in is not None:
+        loop = asyncio.get_running_loop()
+
+        def on_barge_in():
+            nonlocal interrupted
+            interrupted = True
+            loop.call_soon_threadsafe(queue.cancel)
+
+        barge_in.add_listener(on_barge_in)
+    try:
+        await queue.say(text)
+    finally:
+        if barge_in is not None:
+            barge_in.remove_listener(on_barge_in)
+        await queue.close()
+    return interrupted
+
+# Function to speak text while it is still being generated
+async def speak_stream(fragments, voice_number: int = 0, rate: str = "+10%", pitch: str = "+8Hz",
+                       device=OUTPUT_DEVICE, barge_in=None):
+    """
+    Speak an async stream of text fragments (e.g., LLM tokens), handing each sentence to
+    synthesis and playback as soon as it is complete.
+
+    Parameters:
+    - fragments: Async iterable of text pieces.
+    - voice_number, rate, pitch, device: As for SpeechQueue.
+    - barge_in: Optional BargeIn.BargeInMonitor; when a participant talks over the bot,
+      speech stops and the rest of the stream is not consumed.
+
+    Returns:
+    - (text, interrupted): the text received and whether a barge-in stopped the speech.
+    """
+    started = time.perf_counter()
+    queue = SpeechQueue(voice_number, rate, pitch, device)
+    splitter = SentenceStream()
+    received = []
+    first_sentence = None
+    interrupted = False
+    if barge_in is not None:
+        loop = asyncio.get_running_loop()
+
+        def on_barge_in():
+            nonlocal interrupted
+            interrupted = True
+            loop.call_soon_threadsafe(queue.cancel)
+
+        barge_in.add_listener(on_barge_in)
+    try:
+        async for fragment in fragments:
+            received.append(fragment)
+            for sentence in splitter.feed(fragment):
+                if first_sentence is None:
+                    first_sentence = time.perf_counter() - started
+                    print(f"Time to first sentence: {first_sentence:.3f} s")
+                queue.put(sentence)
+            if interrupted:
+                if hasattr(fragments, "aclose"):
+                    await fragments.aclose()  # Stop generating text nobody will hear
+                break
+        else:
+            for sentence in splitter.flush():
+                queue.put(sentence)
+        await queue.join()
+    finally:
+        if barge_in is not None:
+            barge_in.remove_listener(on_barge_in)
+        await queue.close()
+    return "".join(received), interrupted
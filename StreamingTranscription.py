@@ -0,0 +1,169 @@
+import re
+import numpy as np
+from dataclasses import dataclass
+
+# Event emitted by the streaming transcriber
+@dataclass
+class TranscriptEvent:
+    """
+    One update from the streaming transcriber.
+
+    Attributes:
+    - kind: "partial" for words that may still change, "final" for committed words.
+    - text: Text of the update (newly committed words for "final", the unstable tail for "partial").
+    - start: Stream time of the first word, in seconds.
+    - end: Stream time of the last word, in seconds.
+    """
+    kind: str
+    text: str
+    start: float
+    end: float
+
+# Function to compare words regardless of case and punctuation
+def normalize_word(word):
+    """Lower-case a word and strip surrounding punctuation for agreement checks."""
+    return re.sub(r"[^\w']", "", word.lower())
+
+# Function to extract timed words from ASR segments
+def segment_words(segments, offset=0.0):
+    """
+    Flatten segments (transcribed with word_timestamps=True) into timed words.
+
+    Parameters:
+    - segments: List of Segment objects returned by an ASR backend.
+    - offset: Stream time of the first sample passed to the backend.
+
+    Returns:
+    - List of (start, end, word) tuples in stream time.
+    """
+    return [
+        (start + offset, end + offset, word)
+        for segment in segments
+        for start, end, word in segment.words
+    ]
+
+# Sliding-window transcriber that only commits words two consecutive decodes agree on
+class StreamingTranscriber:
+    """
+    Incrementally transcribe a stream by re-decoding a sliding window of recent audio.
+
+    Each call to process() decodes all audio since the last committed word. Words that
+    match the previous decode are committed (local agreement), the rest stay tentative.
+    Committed audio is trimmed from the window so decode cost stays bounded.
+
+    Parameters:
+    - backend: ASR backend (or AsrWorkerPool) used to decode each window.
+    - sample_rate: Sample rate of the inserted audio (default 16000 Hz).
+    - window_duration: Maximum seconds of audio decoded at once.
+    - min_decode_duration: Minimum buffered seconds before the first decode.
+    """
+
+    def __init__(self, backend, sample_rate=16000, window_duration=15, min_decode_duration=1.0):
+        self.backend = backend
+        self.sample_rate = sample_rate
+        self.window_size = int(window_duration * sample_rate)
+        self.min_decode_size = int(min_decode_duration * sample_rate)
+        self._window = np.zeros(self.window_size, dtype='float32')  # Preallocated window
+        self._window_length = 0  # Samples currently held in the window
+        self._window_offset = 0.0  # Stream time of the first sample in the window
+        self.committed = []  # (start, end, word) committed so far
+        self._hypothesis = []  # Tentative words from the previous decode
+
+    @property
+    def stream_time(self):
+        """Stream time of the end of the inserted audio, in seconds."""
+        return self._window_offset + self._window_length / self.sample_rate
+
+    @property
+    def committed_end(self):
+        return self.committed[-1][1] if self.committed else 0.0
+
+    @property
+    def text(self):
+        """All committed words as one string."""
+        return " ".join(word for _, _, word in self.committed)
+
+    def insert_audio(self, samples):
+        """Append audio to the window, dropping the oldest audio if it would overflow."""
+        count = len(samples)
+        if count >= self.window_size:
+            self._drop_front(self._window_length + count - self.window_size)
+            samples = samples[-self.window_size:]
+            count = len(samples)
+        elif self._window_length + count > self.window_size:
+            self._drop_front(self._window_length + count - self.window_size)
+        self._window[self._window_length:self._window_length + count] = samples
+        self._window_length += count
+
+    def _drop_front(self, count):
+        """Discard the first count samples of the window."""
+        count = min(count, self._window_length)
+        if count <= 0:
+            return
+        remaining = self._window_length - count
+        self._window[:remaining] = self._window[count:self._window_length]
+        self._window_length = remaining
+        self._window_offset += count / self.sample_rate
+        self._hypothesis = [w for w in self._hypothesis if w[0] >= self._window_offset]
+
+    def _trim_committed(self):
+        """Drop audio that ends before the last committed word."""
+        if self.committed:
+            cut = int((self.committed_end - self._window_offset) * self.sample_rate)
+            self._drop_front(cut)
+
+    def _prompt(self):
+        """Recent committed text passed to the backend as context for the next window."""
+        return " ".join(word for _, _, word in self.committed[-30:]) or None
+
+    def process(self):
+        """
+        Decode the current window and update committed and tentative words.
+
+        Returns:
+        - (committed, tentative) lists of (start, end, word) tuples; committed holds only
+          the words newly committed by this call.
+        """
+        if self._window_length < self.min_decode_size:
+            return [], list(self._hypothesis)
+
+        audio = self._window[:self._window_length]
+        segments = self.backend.transcribe(audio, prompt=self._prompt(), word_timestamps=True)
+        words = [w for w in segment_words(segments, self._window_offset)
+                 if w[1] > self.committed_end and w[2]]
+
+        # Commit the longest prefix both decodes agree on
+        agreed = 0
+        for new, old in zip(words, self._hypothesis):
+            if normalize_word(new[2]) != normalize_word(old[2]):
+                break
+            agreed += 1
+        newly_committed = words[:agreed]
+        self.committed.extend(newly_committed)
+        self._hypothesis = words[agreed:]
+        self._trim_committed()
+        return newly_committed, list(self._hypothesis)
+
+    def finish(self):
+        """
+        Commit whatever is still tentative (e.g., when the speaker has stopped).
+
+        Returns:
+        - List of (start, end, word) tuples committed by this call.
+        """
+        flushed = self._hypothesis
+        self.committed.extend(flushed)
+        self._hypothesis = []
+        self._window_offset = self.stream_time
+        self._window_length = 0
+        return flushed
+
+# Function to turn timed words into a transcript event
+def words_to_event(kind, words):
+    """Build a TranscriptEvent from a non-empty list of (start, end, word) tuples."""
+    return TranscriptEvent(
+        kind=kind,
+        text=" ".join(word for _, _, word in words),
+        start=words[0][0],
+        end=words[-1][1],
+    )
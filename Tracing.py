@@ -0,0 +1,272 @@
+import os
+import json
+import time
+import asyncio
+import threading
+import functools
+import itertools
+import contextvars
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from LatencyStats import RollingLatency
+
+# Turn the code currently runs for (tasks inherit it; executor calls need Tracer.wrap)
+_current_turn = contextvars.ContextVar("current_turn", default=None)
+
+# Timeline of one conversational turn
+class TurnTrace:
+    """
+    Spans and marks (named instants, e.g. "heard" or "first_audio") of one turn, with
+    times in seconds since the turn started.
+    """
+
+    def __init__(self, turn_id):
+        self.id = turn_id
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self.spans = []
+        self.marks = {}
+
+    def offset(self, perf_time=None):
+        """Seconds between the start of the turn and perf_time (default: now)."""
+        return (time.perf_counter() if perf_time is None else perf_time) - self._started
+
+    def to_dict(self):
+        return {"turn": self.id, "started_at": round(self.started_at, 3),
+                "marks": {name: round(value, 4) for name, value in self.marks.items()},
+                "spans": self.spans}
+
+# Collects stage latencies as rolling percentiles and per-turn timelines
+class Tracer:
+    """
+    Record how long each stage takes. A span costs two clock reads and an append under
+    a lock, so tracing can stay on in production; percentiles are only computed when
+    metrics are exported.
+
+    Spans are aggregated per name into a RollingLatency window. Those recorded while a
+    turn is active (see start_turn and activate) are also kept on the turn, which is
+    appended to trace_path as one JSON line when it ends, followed by a line with the
+    rolling metrics in metrics_path.
+
+    Parameters:
+    - window: Samples kept per span name.
+    - trace_path: JSONL file receiving one line per finished turn (None to skip).
+    - metrics_path: JSONL file receiving the metrics after every turn (None to skip).
+    - enabled: When False, spans cost a single attribute check.
+    """
+
+    def __init__(self, window=500, trace_path=None, metrics_path=None, enabled=True):
+        self.window = window
+        self.trace_path = trace_path
+        self.metrics_path = metrics_path
+        self.enabled = enabled
+        self._latencies = {}
+        self._lock = threading.Lock()
+        self._turn_ids = itertools.count(1)
+
+    def record(self, name, seconds, started=None, **attributes):
+        """
+        Record a duration measured elsewhere.
+
+        Parameters:
+        - name: Stage name, e.g. "llm.first_token".
+        - seconds: Duration.
+        - started: perf_counter time the stage began (placing it on the turn's timeline).
+        - attributes: Extra JSON-serializable details kept on the turn.
+        """
+        if not self.enabled:
+            return
+        self._latency(name).record(seconds)
+        turn = _current_turn.get()
+        if turn is not None:
+            span = {"name": name, "duration": round(seconds, 4)}
+            if started is not None:
+                span["start"] = round(turn.offset(started), 4)
+            span.update(attributes)
+            turn.spans.append(span)
+
+    def _latency(self, name):
+        with self._lock:
+            latency = self._latencies.get(name)
+            if latency is None:
+                latency = self._latencies[name] = RollingLatency(self.window)
+            return latency
+
+    @contextmanager
+    def span(self, name, **attributes):
+        """Time the enclosed block (works in coroutines and threads alike)."""
+        if not self.enabled:
+            yield attributes
+            return
+        started = time.perf_counter()
+        try:
+            yield attributes  # The block may add attributes, e.g. span["cached"] = True
+        except (GeneratorExit, asyncio.CancelledError):
+            attributes["cancelled"] = True
+            raise
+        except BaseException as e:
+            attributes["error"] = type(e).__name__
+            raise
+        finally:
+            self.record(name, time.perf_counter() - started, started, **attributes)
+
+    def traced(self, name):
+        """Decorator that wraps every call of a function or coroutine function in a span."""
+        def decorator(function):
+            if asyncio.iscoroutinefunction(function):
+                @functools.wraps(function)
+                async def async_wrapper(*args, **kwargs):
+                    with self.span(name):
+                        return await function(*args, **kwargs)
+                return async_wrapper
+
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def mark(self, name, perf_time=None):
+        """
+        Note the first time something happened in the current turn (e.g., "first_audio").
+
+        Parameters:
+        - perf_time: perf_counter time it happened (default: now).
+        """
+        turn = _current_turn.get()
+        if self.enabled and turn is not None and name not in turn.marks:
+            turn.marks[name] = turn.offset(perf_time)
+
+    def start_turn(self):
+        """Return a new TurnTrace (activate it to attribute spans to it)."""
+        return TurnTrace(next(self._turn_ids))
+
+    @contextmanager
+    def activate(self, turn):
+        """Attribute the spans of the enclosed block (and tasks it creates) to turn."""
+        token = _current_turn.set(turn)
+        try:
+            yield turn
+        finally:
+            _current_turn.reset(token)
+
+    @staticmethod
+    def wrap(function):
+        """Return function bound to the current turn, for run_in_executor and threads."""
+        context = contextvars.copy_context()
+        return functools.partial(context.run, function)
+
+    def end_turn(self, turn, **marks_between):
+        """
+        Finish a turn: record the intervals between its marks and write it out.
+
+        Parameters:
+        - turn: The TurnTrace.
+        - marks_between: Span name -> (first mark, second mark), e.g.
+          response_latency=("heard", "first_audio"); intervals with a missing mark are skipped.
+        """
+        if not self.enabled:
+            return
+        for name, (first, second) in marks_between.items():
+            if first in turn.marks and second in turn.marks:
+                seconds = turn.marks[second] - turn.marks[first]
+                self._latency(f"turn.{name}").record(seconds)
+                turn.spans.append({"name": f"turn.{name}", "start": round(turn.marks[first], 4),
+                                   "duration": round(seconds, 4)})
+        if self.trace_path:
+            self._append(self.trace_path, turn.to_dict())
+        if self.metrics_path:
+            self._append(self.metrics_path, {"time": round(time.time(), 3), "metrics": self.metrics()})
+
+    @staticmethod
+    def _append(path, record):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as output_file:
+            output_file.write(json.dumps(record) + "\n")
+
+    def metrics(self):
+        """Return the rolling count, p50, p95, p99 and max of every span name."""
+        with self._lock:
+            latencies = dict(self._latencies)
+        return {name: latencies[name].summary() for name in sorted(latencies)}
+
+    def prometheus(self):
+        """Return the metrics in the Prometheus text exposition format."""
+        with self._lock:
+            latencies = dict(self._latencies)
+        lines = ["# HELP stage_latency_seconds Rolling latency of each traced stage.",
+                 "# TYPE stage_latency_seconds summary"]
+        for name in sorted(latencies):
+            latency = latencies[name]
+            for quantile in (50, 95, 99):
+                value = latency.percentile(quantile)
+                if value is not None:
+                    lines.append(f'stage_latency_seconds{{stage="{name}",quantile="{quantile / 100}"}} '
+                                 f"{value:.6f}")
+            lines.append(f'stage_latency_seconds_sum{{stage="{name}"}} {latency.total:.6f}')
+            lines.append(f'stage_latency_seconds_count{{stage="{name}"}} {latency.count}')
+        return "\n".join(lines) + "\n"
+
+# Local HTTP endpoint that serves the tracer's metrics
+class MetricsServer:
+    """
+    Serve /metrics (Prometheus text format) and /metrics.json from a background thread.
+
+    Parameters:
+    - tracer: Tracer to export.
+    - host: Interface to listen on (localhost by default).
+    - port: Port to listen on (0 picks a free port).
+    """
+
+    def __init__(self, tracer, host="127.0.0.1", port=9464):
+        self.tracer = tracer
+        self.host = host
+        self.port = port
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        """Start serving; returns self."""
+        if self._server is not None:
+            return self
+        tracer = self.tracer
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body, content_type = tracer.prometheus(), "text/plain; version=0.0.4"
+                elif self.path == "/metrics.json":
+                    body, content_type = json.dumps(tracer.metrics()), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                data = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass  # Scrapes are not worth a line in the console
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics")
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        self._server = None
+
+# Session-wide tracer used by every module
+tracer = Tracer()
@@ -0,0 +1,175 @@
+import re
+import threading
+from GmeetHear import detect_repetitive_phrases
+from RepetitionFilter import RepetitionFilter
+from StreamingTranscription import normalize_word
+
+# Hesitations that carry no meaning for the reply
+FILLER_WORDS = {"um", "umm", "uh", "uhh", "uhm", "erm", "hmm", "mm", "ah"}
+
+# Whisper's non-speech annotations, e.g. "[BLANK_AUDIO]" or "(music)"
+_ANNOTATION = re.compile(r"\[[^\]]*\]|\([^)]*\)")
+
+# Markers of the structured single-call reply
+TRANSCRIPT_MARKER = "TRANSCRIPT:"
+REPLY_MARKER = "REPLY:"
+
+# Function to build the pattern that finds a marker however the model decorated it
+def _marker_pattern(marker):
+    """
+    Match marker case-insensitively anywhere in the text, with markdown emphasis, headings
+    or quotes and whitespace around it (e.g., "**Transcript:**" or "### REPLY :").
+    """
+    word = re.escape(marker.rstrip(":"))
+    return re.compile(rf"[*_#>`\s]*\b{word}\b[*_`\s]*:[*_`]*[ \t]*", re.IGNORECASE)
+
+_TRANSCRIPT_PATTERN = _marker_pattern(TRANSCRIPT_MARKER)
+_REPLY_PATTERN = _marker_pattern(REPLY_MARKER)
+
+# Characters of leading preamble (e.g., "Sure, here you go:") searched for the transcript
+# marker before a streamed reply is treated as unstructured
+MAX_PREAMBLE_CHARS = 160
+
+# Instructions appended to a single-call prompt so the model returns both parts
+STRUCTURED_REPLY_INSTRUCTIONS = (
+    f"Answer in exactly this format: a first line starting with '{TRANSCRIPT_MARKER}' followed by "
+    "the user's words rewritten without spelling mistakes, grammatical errors or repeated words "
+    "(add 'okay bye' if the user wants to end the conversation), then a line starting with "
+    f"'{REPLY_MARKER}' followed by your reply."
+)
+
+# Function to clean up a transcript without an LLM
+def normalize_transcript(text, limit=3):
+    """
+    Deterministically tidy a transcript: drop annotations and filler words, remove
+    repetition loops, and normalise whitespace and sentence case.
+
+    Repeats are removed with a filter of its own per call (the transcript has already
+    passed the session's filter), so nothing carries over between turns. The default
+    limit keeps genuine repeats such as "very, very good" or "no, no".
+
+    Parameters:
+    - text: Raw transcript.
+    - limit: Consecutive copies of a word or phrase that are kept.
+
+    Returns:
+    - (normalized_text, dropped_words) where dropped_words counts removed repeats.
+    """
+    text = _ANNOTATION.sub(" ", text)
+    words = [word for word in text.split() if normalize_word(word) not in FILLER_WORDS]
+    repetition_filter = RepetitionFilter(limit=limit)
+    text = repetition_filter.filter(" ".join(words))
+    if text:
+        text = text[0].upper() + text[1:]
+        if text[-1] not in ".!?":
+            text += "."
+    return text, repetition_filter.dropped_words
+
+# Function to decide whether a transcript can skip the LLM cleanup call
+def is_clean(text, dropped_words=0, limit=3, max_dropped_ratio=0.2):
+    """
+    Check a normalized transcript for signs that it still needs the LLM rewrite.
+
+    Parameters:
+    - text: Normalized transcript.
+    - dropped_words: Words removed by normalize_transcript.
+    - limit: Repetition limit passed to detect_repetitive_phrases.
+    - max_dropped_ratio: Share of repeated words above which the transcript is treated as
+      a recognition loop rather than a clean sentence.
+
+    Returns:
+    - True if the transcript can be used as it is.
+    """
+    word_count = len(text.split())
+    if word_count == 0:
+        return False
+    if detect_repetitive_phrases(text, limit):
+        return False
+    return dropped_words <= max_dropped_ratio * (word_count + dropped_words)
+
+# Function to split a complete structured reply into its two parts
+def parse_structured_reply(text):
+    """
+    Markers are found wherever they are, so a preamble or markdown around them is dropped.
+
+    Returns:
+    - (transcript, reply); transcript is None when the model ignored the format.
+    """
+    reply_match = _REPLY_PATTERN.search(text)
+    if reply_match is None:
+        return None, text.strip()
+    head = text[:reply_match.start()]
+    transcript_match = _TRANSCRIPT_PATTERN.search(head)
+    transcript = head[transcript_match.end():].strip(" \t\n*_`") if transcript_match else ""
+    return transcript or None, text[reply_match.end():].strip()
+
+# Splits a streamed structured reply so that only the reply part is spoken
+class StructuredReply:
+    """
+    Wrap the token stream of a single-call request. reply_tokens() yields only the text
+    after the reply marker (so it can go straight to speech); the cleaned transcript is
+    available as .transcript once the marker has been seen. When no transcript marker
+    appears within the first MAX_PREAMBLE_CHARS characters, the model is taken to have
+    ignored the format and everything is treated as the reply.
+
+    Parameters:
+    - tokens: Async iterable of text pieces.
+    """
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.transcript = None
+
+    async def reply_tokens(self):
+        buffer = ""
+        in_reply = False
+        try:
+            async for token in self.tokens:
+                if in_reply:
+                    yield token
+                    continue
+                buffer += token
+                # Split once the reply itself has started, so markdown closing the marker
+                # (e.g., the "**" of "**REPLY:**") is never spoken
+                reply_match = _REPLY_PATTERN.search(buffer)
+                if reply_match is not None and buffer[reply_match.end():].strip(" \t\n*_`"):
+                    self.transcript, reply = parse_structured_reply(buffer)
+                    in_reply = True
+                    if reply:
+                        yield reply
+                elif len(buffer) >= MAX_PREAMBLE_CHARS and reply_match is None \
+                        and not _TRANSCRIPT_PATTERN.search(buffer):
+                    in_reply = True  # No structure: speak everything
+                    yield buffer
+            if not in_reply and buffer:
+                self.transcript, reply = parse_structured_reply(buffer)
+                if reply:
+                    yield reply
+        finally:
+            if hasattr(self.tokens, "aclose"):
+                await self.tokens.aclose()
+
+# Counter of turns that took the single-call fast path
+class FastPathStats:
+    """Count turns answered with one LLM call versus cleanup plus reply."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.fast = 0
+        self.slow = 0
+
+    def record(self, fast):
+        with self._lock:
+            if fast:
+                self.fast += 1
+            else:
+                self.slow += 1
+
+    @property
+    def rate(self):
+        """Share of turns that took the fast path (0 before the first turn)."""
+        total = self.fast + self.slow
+        return self.fast / total if total else 0.0
+
+    def summary(self):
+        return {"fast": self.fast, "slow": self.slow, "rate": round(self.rate, 3)}
@@ -0,0 +1,312 @@
+import os
+import time
+import asyncio
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from LatencyStats import RollingLatency
+from TtsCache import decode_mp3
+
+# Function to turn an edge_tts style percentage ("+10%") into a number
+def _percent(value):
+    try:
+        return float(str(value).strip().rstrip("%"))
+    except ValueError:
+        return 0.0
+
+# Base class every text-to-speech engine implements
+class TtsBackend:
+    """
+    Text-to-speech engine with a stable contract:
+    await synthesize(text, voice, rate, pitch) -> (audio, sample_rate),
+    with audio as a float32 array of shape (frames, channels).
+
+    Each backend keeps a rolling window of its synthesis latencies, used by TtsSelector.
+    """
+
+    name = None
+    remote = False  # True when synthesis goes over the network
+
+    def __init__(self, latency_window=50):
+        self.latency = RollingLatency(latency_window)
+
+    async def synthesize(self, text, voice, rate="+10%", pitch="+8Hz"):
+        """
+        Synthesize text.
+
+        Parameters:
+        - text: Text to speak.
+        - voice: edge_tts voice name (local engines map it to a voice they have).
+        - rate: Speaking rate change, e.g. "+10%".
+        - pitch: Pitch change, e.g. "+8Hz".
+
+        Returns:
+        - (audio, sample_rate)
+        """
+        raise NotImplementedError
+
+# Microsoft Edge online voices (the default, needs network access)
+class EdgeTtsBackend(TtsBackend):
+    """
+    edge_tts over the network (through the shared connection pool), decoded from MP3.
+
+    Parameters:
+    - url: Websocket URL of a compatible server (None for the edge_tts service).
+    """
+
+    name = "edge-tts"
+    remote = True
+
+    def __init__(self, url=None, latency_window=50):
+        super().__init__(latency_window)
+        self.url = url
+
+    async def stream(self, text, voice, rate="+10%", pitch="+8Hz"):
+        """Yield MP3 bytes as they arrive."""
+        from TtsPool import get_tts_pool
+        async for data in get_tts_pool(self.url).stream(text, voice, rate, pitch):
+            yield data
+
+    async def synthesize(self, text, voice, rate="+10%", pitch="+8Hz"):
+        audio_bytes = bytearray()
+        async for data in self.stream(text, voice, rate, pitch):
+            audio_bytes.extend(data)
+        if not audio_bytes:
+            return np.zeros((0, 1), dtype='float32'), 24000
+        return decode_mp3(bytes(audio_bytes))
+
+# Offline engine using the operating system voices (pip install pyttsx3)
+class Pyttsx3Backend(TtsBackend):
+    """
+    pyttsx3 (SAPI5 on Windows, NSSpeechSynthesizer on macOS, eSpeak on Linux).
+    Runs on a dedicated thread because the engine is blocking and not thread-safe.
+
+    Parameters:
+    - base_rate: Words per minute that correspond to a rate of "+0%".
+    """
+
+    name = "pyttsx3"
+
+    def __init__(self, base_rate=180, latency_window=50):
+        super().__init__(latency_window)
+        self.base_rate = base_rate
+        self._engine = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pyttsx3")
+
+    def _pick_voice(self, engine, voice):
+        """Use a local voice for the same language as the edge_tts voice when there is one."""
+        language = voice.split("-")[0].lower() if voice else "en"
+        for local_voice in engine.getProperty('voices') or []:
+            languages = " ".join(str(item) for item in (getattr(local_voice, 'languages', None) or []))
+            if language in f"{local_voice.id} {local_voice.name} {languages}".lower():
+                return local_voice.id
+        return None
+
+    def _synthesize_blocking(self, text, voice, rate):
+        import pyttsx3
+        from AudioReplay import load_audio
+
+        if self._engine is None:
+            self._engine = pyttsx3.init()
+        engine = self._engine
+        local_voice = self._pick_voice(engine, voice)
+        if local_voice is not None:
+            engine.setProperty('voice', local_voice)
+        engine.setProperty('rate', int(self.base_rate * (1 + _percent(rate) / 100)))
+
+        handle, path = tempfile.mkstemp(suffix=".wav")
+        os.close(handle)
+        try:
+            engine.save_to_file(text, path)
+            engine.runAndWait()
+            return load_audio(path)
+        finally:
+            os.remove(path)
+
+    async def synthesize(self, text, voice, rate="+10%", pitch="+8Hz"):
+        # pyttsx3 has no portable pitch control, so pitch is ignored
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._synthesize_blocking, text, voice, rate)
+
+# Deterministic engine with injectable latency, used to test fallback without network
+class StandInTtsBackend(TtsBackend):
+    """
+    Produces a short tone per word after a configurable delay; stands in for a remote
+    service (remote=True) or a local engine (remote=False) in offline tests.
+
+    Parameters:
+    - latency: Base delay before audio is returned (seconds).
+    - jitter: Extra random delay of up to this many seconds.
+    - failure_rate: Fraction of requests that raise ConnectionError.
+    - remote: Whether to behave like a network backend.
+    - sample_rate: Sample rate of the generated audio.
+    - seed: Random seed for reproducible latencies.
+    """
+
+    name = "stand-in"
+
+    def __init__(self, latency=0.1, jitter=0.0, failure_rate=0.0, remote=True, sample_rate=24000,
+                 seed=None, latency_window=50):
+        super().__init__(latency_window)
+        self.base_latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.remote = remote
+        self.sample_rate = sample_rate
+        self._random = np.random.default_rng(seed)
+        self.requests = 0
+
+    async def synthesize(self, text, voice, rate="+10%", pitch="+8Hz"):
+        self.requests += 1
+        await asyncio.sleep(self.base_latency + self.jitter * self._random.random())
+        if self._random.random() < self.failure_rate:
+            raise ConnectionError("stand-in TTS request failed")
+        words = max(1, len(text.split()))
+        t = np.arange(int(0.25 * self.sample_rate)) / self.sample_rate
+        tone = (0.1 * np.sin(2 * np.pi * 220 * t)).astype('float32')
+        return np.tile(tone, words).reshape(-1, 1), self.sample_rate
+
+# Latency-aware choice between a remote backend and a local fallback
+class TtsSelector:
+    """
+    Send requests to the primary backend, but fall back to the local one when the
+    primary misses the deadline or fails, or when its rolling latency percentile is
+    already above the deadline. While degraded, the primary is probed in the background
+    every probe_interval seconds; a probe that meets the deadline clears the primary's
+    latency window so it is used again right away.
+
+    Parameters:
+    - primary: Preferred backend (usually remote).
+    - fallback: Backend used when the primary is too slow (usually local).
+    - deadline: Seconds a primary synthesis may take before the fallback is used.
+    - percentile: Latency percentile compared with the deadline (e.g., 95).
+    - min_samples: Measurements needed before the percentile is trusted.
+    - probe_interval: Seconds between background probes of a degraded primary.
+    """
+
+    def __init__(self, primary, fallback, deadline=2.0, percentile=95, min_samples=5,
+                 probe_interval=30.0):
+        self.primary = primary
+        self.fallback = fallback
+        self.deadline = deadline
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.probe_interval = probe_interval
+        self._last_probe = 0.0
+        self._probe = None
+        self._lock = threading.Lock()
+        self.counts = {"primary": 0, "fallback": 0, "deadline_missed": 0, "errors": 0}
+
+    def degraded(self):
+        """True when the primary's recent latency percentile is above the deadline."""
+        if len(self.primary.latency) < self.min_samples:
+            return False
+        return self.primary.latency.percentile(self.percentile) > self.deadline
+
+    def record_failure(self, elapsed, error=None):
+        """Count a primary request that missed the deadline or failed (e.g., when streaming)."""
+        self.primary.latency.record(max(elapsed, self.deadline))
+        with self._lock:
+            self.counts["deadline_missed" if error is None else "errors"] += 1
+
+    async def _timed(self, backend, text, voice, rate, pitch):
+        started = time.perf_counter()
+        result = await backend.synthesize(text, voice, rate, pitch)
+        backend.latency.record(time.perf_counter() - started)
+        return result
+
+    def _maybe_probe(self, text, voice, rate, pitch):
+        """Send one background request to the degraded primary to refresh its latency."""
+        now = time.monotonic()
+        if (self._probe is not None and not self._probe.done()) or now - self._last_probe < self.probe_interval:
+            return
+        self._last_probe = now
+
+        async def probe():
+            started = time.perf_counter()
+            try:
+                await asyncio.wait_for(self.primary.synthesize(text, voice, rate, pitch),
+                                       timeout=self.deadline * 4)
+            except Exception:
+                self.primary.latency.record(time.perf_counter() - started)
+                return
+            elapsed = time.perf_counter() - started
+            if elapsed <= self.deadline:
+                self.primary.latency.clear()  # Recovered: stop using the fallback
+            self.primary.latency.record(elapsed)
+
+        self._probe = asyncio.ensure_future(probe())
+
+    async def synthesize_fallback(self, text, voice, rate="+10%", pitch="+8Hz"):
+        """Synthesize with the fallback backend (counted in the stats)."""
+        with self._lock:
+            self.counts["fallback"] += 1
+        return await self._timed(self.fallback, text, voice, rate, pitch)
+
+    async def synthesize(self, text, voice, rate="+10%", pitch="+8Hz"):
+        """
+        Synthesize with the primary backend unless it is too slow.
+
+        Returns:
+        - (audio, sample_rate, backend) where backend is the one that produced the audio.
+        """
+        if self.degraded():
+            self._maybe_probe(text, voice, rate, pitch)
+        else:
+            started = time.perf_counter()
+            try:
+                audio, sample_rate = await asyncio.wait_for(
+                    self._timed(self.primary, text, voice, rate, pitch), timeout=self.deadline
+                )
+                with self._lock:
+                    self.counts["primary"] += 1
+                return audio, sample_rate, self.primary
+            except asyncio.TimeoutError:
+                self.record_failure(time.perf_counter() - started)
+                print(f"{self.primary.name} missed the {self.deadline:.1f} s deadline; "
+                      f"using {self.fallback.name}.")
+            except Exception as e:
+                self.record_failure(time.perf_counter() - started, error=e)
+                print(f"{self.primary.name} failed ({e}); using {self.fallback.name}.")
+        audio, sample_rate = await self.synthesize_fallback(text, voice, rate, pitch)
+        return audio, sample_rate, self.fallback
+
+    def stats(self):
+        """Return request counts and latency summaries of both backends."""
+        with self._lock:
+            counts = dict(self.counts)
+        return {
+            **counts,
+            "degraded": self.degraded(),
+            "primary_latency": self.primary.latency.summary(),
+            "fallback_latency": self.fallback.latency.summary(),
+        }
+
+# Backends that can be selected by name
+TTS_BACKENDS = {
+    backend.name: backend
+    for backend in (EdgeTtsBackend, Pyttsx3Backend, StandInTtsBackend)
+}
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+# Function to get a shared backend instance by name
+def get_tts_backend(name="edge-tts"):
+    """
+    Return the shared TTS backend registered under name.
+
+    Parameters:
+    - name: One of TTS_BACKENDS ("edge-tts", "pyttsx3", "stand-in").
+
+    Returns:
+    - TtsBackend instance (the same object on every call).
+    """
+    if name not in TTS_BACKENDS:
+        raise ValueError(f"Unknown TTS backend '{name}'. Choose from: {', '.join(TTS_BACKENDS)}")
+    with _backends_lock:
+        backend = _backends.get(name)
+        if backend is None:
+            backend = _backends[name] = TTS_BACKENDS[name]()
+    return backend
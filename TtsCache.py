@@ -0,0 +1,208 @@
+import io
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+
+# Default location and size cap of the phrase cache (override with environment variables)
+DEFAULT_CACHE_DIR = os.environ.get(
+    "TTS_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "tts_cache")
+)
+DEFAULT_CACHE_MB = float(os.environ.get("TTS_CACHE_MB", 256))
+
+# Function to compute the content address of a synthesized phrase
+def cache_key(text, voice, rate, pitch):
+    """Return the hex digest identifying (text, voice, rate, pitch)."""
+    payload = json.dumps([" ".join(text.split()), voice, rate, pitch], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+# Content-addressed on-disk cache of decoded TTS audio
+class TtsCache:
+    """
+    Cache of synthesized phrases stored as decoded PCM (.npy), keyed by text, voice,
+    rate and pitch.
+
+    Hits are read straight from disk, so repeated phrases skip both the network and MP3
+    decoding. The least recently used entries are deleted once the cache grows
+    beyond max_mb; recency survives restarts through the files' modification times.
+
+    Parameters:
+    - directory: Folder holding the cached audio.
+    - max_mb: Size cap of the cache in megabytes.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_mb=DEFAULT_CACHE_MB):
+        self.directory = directory
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (path, sample_rate, size), oldest first
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+        self._scan()
+
+    def _scan(self):
+        """Index the files already on disk, least recently used first."""
+        if not os.path.isdir(self.directory):
+            return
+        found = []
+        for name in os.listdir(self.directory):
+            key, _, rest = name.partition("-")
+            if not name.endswith(".npy") or not rest[:-4].isdigit():
+                continue
+            path = os.path.join(self.directory, name)
+            stat = os.stat(path)
+            found.append((stat.st_mtime, key, path, int(rest[:-4]), stat.st_size))
+        for _, key, path, sample_rate, size in sorted(found):
+            self._entries[key] = (path, sample_rate, size)
+            self._size += size
+
+    def get(self, text, voice, rate, pitch):
+        """
+        Look up a phrase.
+
+        Returns:
+        - (audio, sample_rate) with audio of shape (frames, channels), or None on a miss.
+        """
+        key = cache_key(text, voice, rate, pitch)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        path, sample_rate, _ = entry
+        try:
+            audio = np.load(path)
+            os.utime(path)  # Record the use for LRU order across restarts
+        except OSError:
+            with self._lock:
+                self._forget(key)
+            return None
+        return audio, sample_rate
+
+    def put(self, text, voice, rate, pitch, audio, sample_rate):
+        """Store decoded audio for a phrase, evicting old phrases beyond the size cap."""
+        key = cache_key(text, voice, rate, pitch)
+        audio = np.ascontiguousarray(audio, dtype='float32')
+        audio = audio.reshape(len(audio), -1)
+        path = os.path.join(self.directory, f"{key}-{int(sample_rate)}.npy")
+        os.makedirs(self.directory, exist_ok=True)
+        data = io.BytesIO()
+        np.save(data, audio)
+        # Write then rename, so a crash never leaves a half-written phrase behind
+        temporary = f"{path}.{threading.get_ident()}.tmp"
+        with open(temporary, "wb") as cache_file:
+            cache_file.write(data.getbuffer())
+        os.replace(temporary, path)
+
+        with self._lock:
+            self._forget(key)
+            self._entries[key] = (path, int(sample_rate), data.tell())
+            self._size += data.tell()
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                oldest = next(iter(self._entries))
+                old_path = self._entries[oldest][0]
+                self._forget(oldest)
+                try:
+                    os.remove(old_path)
+                except OSError:
+                    pass
+
+    def _forget(self, key):
+        """Drop an entry from the index (caller holds the lock)."""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= entry[2]
+
+    def __contains__(self, phrase):
+        return cache_key(*phrase) in self._entries
+
+    def stats(self):
+        """Return hit/miss counters and the cache size."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "size_mb": round(self._size / (1024 * 1024), 2),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+# Shared cache used by GmeetSpeak and Speak
+tts_cache = TtsCache()
+
+# Function to decode synthesized MP3 bytes to PCM
+def decode_mp3(audio_bytes):
+    """Decode MP3 bytes to (audio, sample_rate) with audio of shape (frames, channels)."""
+    import soundfile as sf
+    audio, sample_rate = sf.read(io.BytesIO(audio_bytes), dtype='float32')
+    return audio.reshape(len(audio), -1), sample_rate
+
+# Function to synthesize through the cache
+async def cached_synthesis(text, voice, rate, pitch, fetch, cache=None):
+    """
+    Return decoded audio for a phrase, synthesizing it only on a cache miss.
+
+    Parameters:
+    - text, voice, rate, pitch: Phrase to synthesize.
+    - fetch: Coroutine function (text, voice, rate, pitch) returning MP3 bytes.
+    - cache: TtsCache to use (default: the shared tts_cache).
+
+    Returns:
+    - (audio, sample_rate) with audio of shape (frames, channels).
+    """
+    cache = cache or tts_cache
+    cached = cache.get(text, voice, rate, pitch)
+    if cached is not None:
+        return cached
+    audio_bytes = await fetch(text, voice, rate, pitch)
+    if hasattr(audio_bytes, "getvalue"):
+        audio_bytes = audio_bytes.getvalue()
+    if not audio_bytes:
+        return np.zeros((0, 1), dtype='float32'), 24000
+    audio, sample_rate = decode_mp3(audio_bytes)
+    cache.put(text, voice, rate, pitch, audio, sample_rate)
+    return audio, sample_rate
+
+# Function to read a pre-warm list of phrases
+def load_prewarm_list(path):
+    """
+    Load phrases to pre-warm from a JSON file: a list of objects with a "text" key and
+    optional "voice_number", "rate" and "pitch" keys.
+
+    Returns:
+    - List of dictionaries (empty if the file does not exist).
+    """
+    if not path or not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as prewarm_file:
+        return json.load(prewarm_file)
+
+# Function to synthesize every phrase of a pre-warm list that is not cached yet
+async def prewarm(phrases, fetch, cache=None):
+    """
+    Make sure each phrase is in the cache.
+
+    Parameters:
+    - phrases: Iterable of dictionaries with text, voice, rate and pitch.
+    - fetch: Coroutine function (text, voice, rate, pitch) returning MP3 bytes.
+    - cache: TtsCache to fill (default: the shared tts_cache).
+
+    Returns:
+    - Number of phrases that had to be synthesized.
+    """
+    cache = cache or tts_cache
+    synthesized = 0
+    for phrase in phrases:
+        key = (phrase["text"], phrase["voice"], phrase["rate"], phrase["pitch"])
+        if key in cache:
+            continue
+        try:
+            await cached_synthesis(*key, fetch=fetch, cache=cache)
+            synthesized += 1
+        except Exception as e:
+            print(f"Could not pre-warm '{phrase['text']}': {e}")
+    return synthesized
@@ -0,0 +1,494 @@
+import os
+import ssl
+import time
+import uuid
+import atexit
+import random
+import asyncio
+import functools
+import threading
+from xml.sax.saxutils import escape
+from LatencyStats import RollingLatency
+
+# Output format requested from the service (the same as edge_tts uses)
+AUDIO_FORMAT = "audio-24khz-48kbitrate-mono-mp3"
+
+# Longest text of one request in UTF-8 bytes after XML escaping (the limit edge_tts splits at)
+MAX_REQUEST_BYTES = 4096
+
+# Pool connections to the edge_tts service itself (opt in with EDGE_TTS_POOLED=1). This
+# speaks the service's private websocket protocol, which can change without notice; by
+# default requests to the service go through the public edge_tts.Communicate instead
+POOL_EDGE_TTS = os.environ.get("EDGE_TTS_POOLED", "0") == "1"
+
+# edge_tts releases [first, last) whose service URL, headers and DRM token the pool was
+# tested with; with any other release requests go through the public edge_tts.Communicate
+EDGE_TTS_TESTED_VERSIONS = ((7, 0), (8, 0))
+
+_END = object()  # Marks the end of a request's audio on the caller's queue
+
+# Function to expand a short voice name ("en-IN-NeerjaNeural") to the name the service expects
+def service_voice_name(voice):
+    parts = voice.split("-", 2)
+    if len(parts) < 3 or voice.startswith("Microsoft Server Speech"):
+        return voice
+    language, region, name = parts
+    if "-" in name:  # e.g., "zh-CN-liaoning-XiaobeiNeural"
+        extra, name = name.split("-", 1)
+        region = f"{region}-{extra}"
+    return f"Microsoft Server Speech Text to Speech Voice ({language}-{region}, {name})"
+
+# Function to build the SSML document for one request
+def build_ssml(text, voice, rate="+0%", pitch="+0Hz", volume="+0%"):
+    # The service rejects most control characters
+    text = "".join(" " if ord(c) < 32 and c not in "\t\n\r" else c for c in text)
+    return (
+        "<speak version='1.0' xmlns='http://www.w3.org/2001/10/synthesis' xml:lang='en-US'>"
+        f"<voice name='{service_voice_name(voice)}'>"
+        f"<prosody pitch='{pitch}' rate='{rate}' volume='{volume}'>{escape(text)}</prosody>"
+        "</voice></speak>"
+    )
+
+# Function to split text into pieces that each fit one service request
+def split_text(text, max_bytes=MAX_REQUEST_BYTES):
+    """
+    Split text at whitespace so that every piece stays within max_bytes once escaped for
+    SSML; words longer than that are cut.
+
+    Returns:
+    - List of non-empty pieces, in order.
+    """
+    def size(piece):
+        return len(escape(piece).encode("utf-8"))
+
+    longest_cut = max(1, max_bytes // 5)  # An escaped character takes at most 5 bytes ("&amp;")
+    pieces, current = [], ""
+    for word in text.split():
+        while size(word) > max_bytes:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(word[:longest_cut])
+            word = word[longest_cut:]
+        candidate = f"{current} {word}" if current else word
+        if size(candidate) > max_bytes:
+            pieces.append(current)
+            candidate = word
+        current = candidate
+    if current:
+        pieces.append(current)
+    return pieces
+
+# Function to load the edge_tts internals the pool connects with, if this release was tested
+@functools.lru_cache(maxsize=1)
+def edge_tts_internals():
+    """
+    Returns:
+    - (constants module, DRM class) of the installed edge_tts, or None when it is missing
+      or not a release in EDGE_TTS_TESTED_VERSIONS.
+    """
+    try:
+        from edge_tts import constants
+        from edge_tts.drm import DRM
+        from edge_tts.version import __version__, __version_info__
+    except ImportError:
+        return None
+    first, last = EDGE_TTS_TESTED_VERSIONS
+    if not first <= tuple(__version_info__[:2]) < last or not all(
+            hasattr(constants, name) for name in ("WSS_URL", "WSS_HEADERS", "SEC_MS_GEC_VERSION")):
+        print(f"edge_tts {__version__} is not a tested release; TTS connections are not pooled.")
+        return None
+    return constants, DRM
+
+def _timestamp():
+    return time.strftime("%a %b %d %Y %H:%M:%S GMT+0000 (Coordinated Universal Time)", time.gmtime())
+
+# Function to split a service message into its header dictionary and body
+def parse_message(data):
+    """
+    Parse a text (str) or binary (bytes) websocket message.
+
+    Binary messages start with a 2-byte big-endian header length; text messages separate
+    headers from the body with an empty line.
+
+    Returns:
+    - (headers, body) with str header names and values, and a str or bytes body.
+    """
+    if isinstance(data, str):
+        head, _, body = data.partition("\r\n\r\n")
+    else:
+        header_length = int.from_bytes(data[:2], "big")
+        head, body = data[2:2 + header_length].decode("utf-8", "replace"), data[2 + header_length:]
+    headers = {}
+    for line in head.split("\r\n"):
+        key, _, value = line.partition(":")
+        headers[key.strip()] = value.strip()
+    return headers, body
+
+# One websocket to the speech service, reused for consecutive requests
+class TtsConnection:
+    """
+    A warm connection to the edge_tts (Microsoft Edge read-aloud) websocket.
+
+    The output format is configured once per connection; every later request only
+    sends its SSML, so reusing the connection saves the TCP/TLS/websocket handshake.
+    Requests on one connection are strictly sequential.
+
+    Parameters:
+    - websocket: Open aiohttp ClientWebSocketResponse.
+    - receive_timeout: Longest wait for the next message of a request (seconds).
+    """
+
+    def __init__(self, websocket, receive_timeout=30):
+        self.websocket = websocket
+        self.receive_timeout = receive_timeout
+        self.opened_at = time.monotonic()
+        self.last_used = self.opened_at
+        self.requests = 0
+        self._configured = False
+
+    @property
+    def closed(self):
+        return self.websocket.closed
+
+    async def request(self, text, voice, rate, pitch, put):
+        """
+        Synthesize text, calling put(mp3_bytes) for every audio chunk as it arrives.
+
+        Raises:
+        - ConnectionError when the connection fails or closes before the turn ends.
+        """
+        import aiohttp
+
+        if not self._configured:
+            await self.websocket.send_str(
+                f"X-Timestamp:{_timestamp()}\r\n"
+                "Content-Type:application/json; charset=utf-8\r\n"
+                "Path:speech.config\r\n\r\n"
+                '{"context":{"synthesis":{"audio":{"metadataoptions":{'
+                '"sentenceBoundaryEnabled":"false","wordBoundaryEnabled":"false"},'
+                f'"outputFormat":"{AUDIO_FORMAT}"'
+                "}}}}\r\n"
+            )
+            self._configured = True
+        request_id = uuid.uuid4().hex
+        self.requests += 1
+        await self.websocket.send_str(
+            f"X-RequestId:{request_id}\r\n"
+            "Content-Type:application/ssml+xml\r\n"
+            f"X-Timestamp:{_timestamp()}Z\r\n"
+            "Path:ssml\r\n\r\n"
+            f"{build_ssml(text, voice, rate, pitch)}"
+        )
+        while True:
+            message = await asyncio.wait_for(self.websocket.receive(), self.receive_timeout)
+            if message.type not in (aiohttp.WSMsgType.TEXT, aiohttp.WSMsgType.BINARY):
+                raise ConnectionError(f"TTS connection closed ({message.type.name})")
+            headers, body = parse_message(message.data)
+            if headers.get("X-RequestId", request_id) != request_id:
+                continue  # Left over from an earlier request on this connection
+            path = headers.get("Path")
+            if message.type == aiohttp.WSMsgType.BINARY:
+                if path == "audio" and body:
+                    put(body)
+            elif path == "turn.end":
+                self.last_used = time.monotonic()
+                return
+
+    async def close(self):
+        if not self.websocket.closed:
+            await self.websocket.close()
+
+# Pool of warm connections shared by every speaker in the process
+class TtsConnectionPool:
+    """
+    Keeps up to size warm edge_tts connections and spreads requests across them.
+
+    The pool owns a background event loop, so its connections outlive the event loops of
+    individual asyncio.run() calls; stream() and synthesize() can be awaited from any loop.
+    A request that fails on a reused connection before any audio arrived (e.g., the server
+    closed it while idle) is retried on a fresh one. Failed connection attempts back off
+    exponentially (with jitter) so an outage is not hammered with reconnects.
+
+    Connections to the edge_tts service (url None) are only pooled when pool_service is
+    set and the installed edge_tts is a tested release; otherwise every request goes
+    through edge_tts.Communicate with a connection of its own.
+
+    Parameters:
+    - size: Maximum connections, which is also the number of concurrent requests.
+    - url: Websocket URL of a compatible server (None connects to the edge_tts service).
+    - pool_service: Pool connections to the edge_tts service (default: EDGE_TTS_POOLED).
+    - idle_timeout: Connections idle for longer are closed instead of reused (seconds).
+    - max_requests: Requests served by one connection before it is replaced.
+    - connect_timeout: Longest wait for a connection to open (seconds).
+    - receive_timeout: Longest wait for the next message of a request (seconds).
+    - retries: Extra attempts for a request that failed before any audio arrived.
+    - backoff: Delay before the first reconnect after a failed connection attempt (seconds).
+    - max_backoff: Upper bound of the reconnect delay (seconds).
+    """
+
+    def __init__(self, size=2, url=None, idle_timeout=20.0, max_requests=200, connect_timeout=10,
+                 receive_timeout=30, retries=2, backoff=0.5, max_backoff=8.0, pool_service=None):
+        self.size = size
+        self.url = url
+        self.pool_service = POOL_EDGE_TTS if pool_service is None else pool_service
+        self.idle_timeout = idle_timeout
+        self.max_requests = max_requests
+        self.connect_timeout = connect_timeout
+        self.receive_timeout = receive_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._session = None
+        self._semaphore = None
+        self._idle = []  # Idle connections, most recently used last
+        self._failures = 0  # Consecutive failed connection attempts
+        self.connect_latency = RollingLatency()  # Time to open a connection
+        self.first_audio_latency = RollingLatency()  # Request sent to first audio chunk
+        self.counts = {"requests": 0, "reused": 0, "connections": 0, "retries": 0,
+                       "connect_failures": 0}
+
+    def _start(self):
+        """Start the pool's event loop thread (once) and return the loop."""
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="tts-pool")
+                self._thread.daemon = True
+                self._thread.start()
+        return self._loop
+
+    def _pooled(self):
+        """True if requests run on the pool's own connections rather than edge_tts.Communicate."""
+        if self.url is not None:
+            return True
+        return self.pool_service and edge_tts_internals() is not None
+
+    def _connect_target(self):
+        """Return (url, headers, ssl) for a new connection."""
+        if self.url is not None:
+            return f"{self.url}?ConnectionId={uuid.uuid4().hex}", {}, None
+        constants, DRM = edge_tts_internals()
+
+        url = (f"{constants.WSS_URL}&ConnectionId={uuid.uuid4().hex}"
+               f"&Sec-MS-GEC={DRM.generate_sec_ms_gec()}"
+               f"&Sec-MS-GEC-Version={constants.SEC_MS_GEC_VERSION}")
+        headers = dict(constants.WSS_HEADERS)
+        if hasattr(DRM, "headers_with_muid"):
+            headers = DRM.headers_with_muid(headers)
+        try:
+            import certifi
+            context = ssl.create_default_context(cafile=certifi.where())
+        except ImportError:
+            context = ssl.create_default_context()
+        return url, headers, context
+
+    async def _open(self):
+        """Open a new connection, waiting out the backoff after earlier failures."""
+        import aiohttp
+
+        if self._failures:
+            delay = min(self.max_backoff, self.backoff * 2 ** (self._failures - 1))
+            await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+        if self._session is None:
+            self._session = aiohttp.ClientSession(trust_env=True)
+        url, headers, context = self._connect_target()
+        started = time.perf_counter()
+        try:
+            websocket = await asyncio.wait_for(
+                self._session.ws_connect(url, headers=headers, ssl=context, compress=15),
+                self.connect_timeout,
+            )
+        except (aiohttp.ClientError, OSError, asyncio.TimeoutError) as e:
+            self._failures += 1
+            self.counts["connect_failures"] += 1
+            raise ConnectionError(f"Could not connect to the TTS service: {e!r}") from e
+        self._failures = 0
+        self.connect_latency.record(time.perf_counter() - started)
+        self.counts["connections"] += 1
+        return TtsConnection(websocket, self.receive_timeout)
+
+    async def _acquire(self):
+        """Return the warmest usable idle connection, or a new one."""
+        while self._idle:
+            connection = self._idle.pop()
+            if (connection.closed or connection.requests >= self.max_requests
+                    or time.monotonic() - connection.last_used > self.idle_timeout):
+                await connection.close()
+                continue
+            return connection
+        return await self._open()
+
+    async def _request_text(self, text, voice, rate, pitch, put):
+        """Synthesize text of any length, one request per piece that fits (on the pool's loop)."""
+        for piece in split_text(text):
+            await self._request(piece, voice, rate, pitch, put)
+
+    async def _request(self, text, voice, rate, pitch, put):
+        """Run one request on a pooled connection (on the pool's loop)."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.size)
+        async with self._semaphore:
+            self.counts["requests"] += 1
+            for attempt in range(self.retries + 1):
+                received = False
+
+                def on_audio(data):
+                    nonlocal received
+                    if not received:
+                        received = True
+                        self.first_audio_latency.record(time.perf_counter() - sent_at)
+                    put(data)
+
+                try:
+                    connection = await self._acquire()
+                except ConnectionError:
+                    if attempt == self.retries:
+                        raise
+                    self.counts["retries"] += 1
+                    continue
+                reused = connection.requests > 0
+                sent_at = time.perf_counter()
+                try:
+                    await connection.request(text, voice, rate, pitch, on_audio)
+                except BaseException as e:
+                    # Mid-request state is unknown, so the connection is never reused
+                    await connection.close()
+                    if isinstance(e, (asyncio.CancelledError, KeyboardInterrupt)) or received \
+                            or attempt == self.retries:
+                        raise
+                    self.counts["retries"] += 1
+                    continue
+                if reused:
+                    self.counts["reused"] += 1
+                self._idle.append(connection)
+                return
+
+    async def _warm(self, count):
+        opened = []
+        try:
+            while len(self._idle) + len(opened) < count:
+                opened.append(await self._open())
+        finally:
+            self._idle.extend(opened)
+
+    async def warm(self, count=None):
+        """Open connections ahead of the first request (default: size connections)."""
+        if not self._pooled():
+            return
+        future = asyncio.run_coroutine_threadsafe(self._warm(count or self.size), self._start())
+        await asyncio.wrap_future(future)
+
+    async def stream(self, text, voice, rate="+10%", pitch="+8Hz"):
+        """
+        Yield MP3 bytes of the synthesized text as they arrive (from any event loop).
+
+        Parameters:
+        - text: Text to speak.
+        - voice: edge_tts voice name (e.g., "en-IN-NeerjaNeural").
+        - rate: Speaking rate change, e.g. "+10%".
+        - pitch: Pitch change, e.g. "+8Hz".
+        """
+        if not self._pooled():
+            # The public edge_tts API, with a new connection per request
+            import edge_tts
+            async for chunk in edge_tts.Communicate(text, voice, rate=rate, pitch=pitch).stream():
+                if chunk["type"] == "audio":
+                    yield chunk["data"]
+            return
+
+        loop = asyncio.get_running_loop()
+        chunks = asyncio.Queue()
+
+        def put(item):
+            try:
+                loop.call_soon_threadsafe(chunks.put_nowait, item)
+            except RuntimeError:
+                pass  # The caller's loop has already closed
+
+        future = asyncio.run_coroutine_threadsafe(
+            self._request_text(text, voice, rate, pitch, put), self._start()
+        )
+        future.add_done_callback(lambda _: put(_END))
+        try:
+            while True:
+                item = await chunks.get()
+                if item is _END:
+                    break
+                yield item
+            if not future.cancelled() and future.exception() is not None:
+                raise future.exception()
+        finally:
+            future.cancel()  # Abandons the request (and its connection) if we stopped early
+
+    async def synthesize(self, text, voice, rate="+10%", pitch="+8Hz"):
+        """Return the complete MP3 bytes of the synthesized text."""
+        audio = bytearray()
+        async for data in self.stream(text, voice, rate, pitch):
+            audio.extend(data)
+        return bytes(audio)
+
+    async def _close(self):
+        idle, self._idle = self._idle, []
+        for connection in idle:
+            await connection.close()
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def close(self):
+        """Close every connection and stop the pool's event loop."""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._close(), loop).result(timeout=5)
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+        self._semaphore = None
+
+    def stats(self):
+        """Return request/connection counters and latency summaries."""
+        return {
+            **self.counts,
+            "idle": len(self._idle),
+            "connect_latency": self.connect_latency.summary(),
+            "first_audio_latency": self.first_audio_latency.summary(),
+        }
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+# Function to get the process-wide connection pool for a TTS server
+def get_tts_pool(url=None, size=2):
+    """
+    Return the shared connection pool for url.
+
+    Parameters:
+    - url: Websocket URL of a compatible server (None for the edge_tts service).
+    - size: Connections of a newly created pool.
+
+    Returns:
+    - TtsConnectionPool (the same instance on every call with the same url).
+    """
+    with _pools_lock:
+        pool = _pools.get(url)
+        if pool is None:
+            pool = _pools[url] = TtsConnectionPool(size=size, url=url)
+    return pool
+
+# Function to close every pool (called automatically at exit)
+def shutdown_tts_pools():
+    """Close all shared connection pools and forget them."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+
+atexit.register(shutdown_tts_pools)
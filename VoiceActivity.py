@@ -0,0 +1,180 @@
+import numpy as np
+
+# Function to compute per-frame loudness and zero-crossing rate
+def frame_features(audio, frame_size):
+    """
+    Split audio into non-overlapping frames and compute features for each frame.
+
+    Parameters:
+    - audio: 1-D float array (trailing samples that do not fill a frame are ignored).
+    - frame_size: Number of samples per frame.
+
+    Returns:
+    - (rms, zcr) arrays with one value per frame; zcr is the fraction of sign changes.
+    """
+    frame_count = len(audio) // frame_size
+    frames = audio[:frame_count * frame_size].reshape(frame_count, frame_size)
+    rms = np.sqrt(np.mean(np.square(frames), axis=1))
+    signs = np.signbit(frames)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (frame_size - 1)
+    return rms, zcr
+
+# Frame-level voice activity detector with hysteresis and hangover
+class FrameVAD:
+    """
+    Streaming voice activity detector working on 10-30 ms frames.
+
+    A frame starts speech when its RMS reaches start_threshold and its zero-crossing
+    rate looks like speech rather than hiss; speech then continues while frames stay above
+    stop_threshold, plus a hangover so short pauses between words are not cut.
+
+    Parameters:
+    - sample_rate: Sample rate of the audio (default 16000 Hz).
+    - frame_duration: Frame length in seconds (0.01-0.03).
+    - start_threshold: Absolute RMS needed to start speech.
+    - stop_threshold: Absolute RMS below which speech stops (after the hangover).
+    - zcr_threshold: Maximum zero-crossing rate for a frame to start speech.
+    - hangover_duration: Seconds of non-speech kept after speech ends.
+    """
+
+    def __init__(self, sample_rate=16000, frame_duration=0.02, start_threshold=0.1,
+                 stop_threshold=0.07, zcr_threshold=0.35, hangover_duration=0.2):
+        self.sample_rate = sample_rate
+        self.frame_size = int(sample_rate * frame_duration)
+        self.frame_duration = self.frame_size / sample_rate
+        self.start_threshold = start_threshold
+        self.stop_threshold = min(stop_threshold, start_threshold)
+        self.zcr_threshold = zcr_threshold
+        self.hangover_frames = int(round(hangover_duration / self.frame_duration))
+        self.reset()
+
+    def reset(self):
+        """Forget all state carried between blocks."""
+        self._in_speech = False  # Hysteresis state at the end of the last block
+        self._frames_since_speech = self.hangover_frames + 1
+        self._remainder = np.zeros(0, dtype='float32')  # Samples that did not fill a frame
+
+    def process(self, audio):
+        """
+        Classify every complete frame of audio, carrying state across calls.
+
+        Parameters:
+        - audio: 1-D float array of new samples.
+
+        Returns:
+        - Boolean array with one entry per frame (True for speech, hangover included).
+        """
+        return self.process_frames(audio)[1]
+
+    def process_frames(self, audio):
+        """
+        Like process(), but also return the frames the mask refers to.
+
+        Samples left over from the previous call are prepended, so the frames may start
+        slightly before audio does.
+
+        Returns:
+        - (frames, mask) where frames is a (frame_count, frame_size) array.
+        """
+        if len(self._remainder):
+            audio = np.concatenate((self._remainder, audio))
+        frame_count = len(audio) // self.frame_size
+        self._remainder = audio[frame_count * self.frame_size:].copy()
+        frames = audio[:frame_count * self.frame_size].reshape(frame_count, self.frame_size)
+        if frame_count == 0:
+            return frames, np.zeros(0, dtype=bool)
+
+        rms, zcr = frame_features(audio, self.frame_size)
+        start = (rms >= self.start_threshold) & (zcr <= self.zcr_threshold)
+        active = rms >= self.stop_threshold
+
+        # Hysteresis: a run of active frames is speech if any of its frames starts speech,
+        # or if it continues speech from the previous block
+        run_starts = active & ~np.concatenate(([False], active[:-1]))
+        run_ids = np.cumsum(run_starts)
+        run_has_start = np.zeros(run_ids[-1] + 1, dtype=bool)
+        np.logical_or.at(run_has_start, run_ids[start], True)
+        if self._in_speech and active[0]:
+            run_has_start[run_ids[0]] = True
+        raw = active & run_has_start[run_ids]
+        self._in_speech = bool(raw[-1])
+
+        # Hangover: frames within hangover_frames of the last speech frame count as speech
+        indices = np.arange(frame_count)
+        last_speech = np.where(raw, indices, -self._frames_since_speech - 1)
+        last_speech = np.maximum.accumulate(last_speech)
+        since_speech = indices - last_speech
+        self._frames_since_speech = int(since_speech[-1])
+        return frames, since_speech <= self.hangover_frames
+
+    def trim(self, audio, out=None):
+        """
+        Keep only the speech frames of audio.
+
+        Parameters:
+        - audio: 1-D float array of new samples (processed as a continuation of the stream).
+        - out: Optional preallocated array large enough to hold the result.
+
+        Returns:
+        - Array holding only the samples of speech frames.
+        """
+        frames, mask = self.process_frames(audio)
+        speech = frames[mask].reshape(-1)
+        if out is None:
+            return speech
+        out[:len(speech)] = speech
+        return out[:len(speech)]
+
+# Detector that reports when the speaker has stopped talking
+class EndOfUtteranceDetector:
+    """
+    Track speech frames and flag the end of an utterance after trailing silence.
+
+    Parameters:
+    - vad: FrameVAD used to classify frames.
+    - end_silence_duration: Seconds of non-speech after speech that end the utterance.
+    - min_speech_duration: Seconds of speech required before an end can be detected.
+    """
+
+    def __init__(self, vad, end_silence_duration=0.3, min_speech_duration=0.2):
+        self.vad = vad
+        self.end_silence_frames = max(1, int(round(end_silence_duration / vad.frame_duration)))
+        self.min_speech_frames = max(1, int(round(min_speech_duration / vad.frame_duration)))
+        self.reset()
+
+    def reset(self):
+        """Start waiting for a new utterance."""
+        self.speech_frames = 0
+        self.trailing_silence_frames = 0
+
+    @property
+    def speech_started(self):
+        return self.speech_frames >= self.min_speech_frames
+
+    @property
+    def trailing_silence(self):
+        """Seconds of non-speech since the last speech frame."""
+        return self.trailing_silence_frames * self.vad.frame_duration
+
+    @property
+    def ended(self):
+        return self.speech_started and self.trailing_silence_frames >= self.end_silence_frames
+
+    def update(self, mask):
+        """
+        Feed the speech mask of a new block.
+
+        Parameters:
+        - mask: Boolean array returned by FrameVAD.process.
+
+        Returns:
+        - True once the utterance has ended.
+        """
+        if len(mask):
+            speech_indices = np.flatnonzero(mask)
+            if len(speech_indices):
+                self.speech_frames += len(speech_indices)
+                self.trailing_silence_frames = len(mask) - 1 - speech_indices[-1]
+            else:
+                self.trailing_silence_frames += len(mask)
+        return self.ended
@@ -1,324 +1,763 @@
-from get_api import get_api_key_from_json
-import os
-from langchain_groq import ChatGroq
-from ReadFile import read_file
-import asyncio
-from collections import deque
-from GmeetHear import start_transcription
-from GmeetSpeak import speak
-import chromadb
-from langchain_community.vectorstores import Chroma
-from langchain.agents import Tool
-from LongTermMemory import retrieve_from_long_term_memory, store_in_long_term_memory
-
-# Initialize short-term memory
-short_term_memory = deque(maxlen=2)
-
-# Function to check if the user wants to end the conversation
-def check_conversation_end(user_input):
-    end_phrases = ["bye", "thank you", "goodbye", "see you", "thanks"]
-    return any(phrase in user_input.lower() for phrase in end_phrases)
-
-# Tool to retrieve relevant data from long-term memory
-def query_long_term_memory_tool(topic: str) -> str:
-    """Tool to query long-term memory for a given topic."""
-    result = retrieve_from_long_term_memory(topic)
-    return result if result else "No relevant data found for the topic."
-
-def write_report_and_send_email_tool(topic: str) -> str:
-    """Tool to write a report and send an email to the user."""
-    asyncio.run(
-                speak(
-                    text="Report Sent to user Successfully " + topic, 
-                    voice_number=0, rate="+7%", pitch="+10Hz"
-                )
-            )
-    return "Report written and email sent successfully."
-
-# Initialize tools for LLM
-tools = [
-    Tool(
-        name="QueryLongTermMemory",
-        func=query_long_term_memory_tool,
-        description="Use this tool to fetch the latest update on a given topic from long-term memory."
-    ),
-    Tool(
-        name="WriteReportandSendEmail",
-        func=write_report_and_send_email_tool,
-        description="Use this tool to write a report and send an email to the user."
-    )
-]
-
-def Reader():
-    api_key = get_api_key_from_json(
-        r"C:\Users\AM ECOSYSTEMS\OneDrive\Documents\Chatbot\Retail AI Store Bot\Apikey.json", 
-        "Manager_AI"
-    )
-
-    if "GROQ_API_KEY" not in os.environ:
-        os.environ["GROQ_API_KEY"] = api_key
-
-    llm = ChatGroq(
-        model="llama-3.1-70b-versatile",
-        temperature=0,
-        max_tokens=None,
-        timeout=None,
-        max_retries=2,
-    )
-
-    # Initial greeting
-    asyncio.run(
-        speak(
-            text="Hi, team. Good evening! Could you tell me what progress is being made on the automation project?", 
-            voice_number=1, rate="+3%", pitch="+5Hz"
-        )
-    )
-
-    try:
-        while True:
-            print("Starting recording...")
-            transcript = start_transcription(
-                chunk_duration=8, sample_rate=16000,
-                loudness_start_threshold=0.1, loudness_stop_threshold=0.08,
-                repeating_word_limit=3, silence_timeout=2,
-                model_type="small.en", vac_input_device=0, channels=1
-            )
-            print("Recording Stopped")
-
-            short_term_memory.append(transcript)
-            print("Short-term memory:", list(short_term_memory))
-
-            # Retrieve relevant past information
-            relevant_past_info = retrieve_from_long_term_memory(transcript) or ""
-            memory_context = " ".join(short_term_memory)
-
-            # Read the prompt from the file
-            query = read_file(
-                r"C:\Users\AM ECOSYSTEMS\OneDrive\Documents\Chatbot\AIManager\prompt.txt"
-            )
-
-            # Prepare input text for the LLM
-            input_text = (
-                f"{transcript} Reformat this by removing spelling mistakes and grammatical errors. "
-                "Ignore repeating words like 'i has the thankyou i has the thankyou'. "
-                "If the conversation implies the user wants to end it, add 'okay bye' to the output. "
-                f"Further, here is relevant chat history: {relevant_past_info}."
-                f"Here is the latest update: {memory_context} Add it in the output if it is relevant."
-                "Make sure you format the output as it will sound sensible and dont give any solutions just reformat the transcript said by the user."
-            )
-
-            # Invoke the LLM
-            filtered_response = llm.invoke(input_text)
-
-            # Prepare final response with memory context
-            response_text = (
-                f"{query} :- {filtered_response.content} "
-                f"Here is a summary of the previous conversations: {memory_context}."
-                f"Dont give output as a conversation , give it as a manager not a full conversation between you and the user."
-                f"Make sure you talk as a manager not preamble."
-            )
-
-            # Get AI response
-            ai_response = llm.invoke(response_text)
-            print("AI Response:", ai_response.content)
-
-            print("Playing Audio")
-            asyncio.run(
-                speak(
-                    text=ai_response.content, 
-                    voice_number=1, rate="+7%", pitch="+10Hz"
-                )
-            )
-
-            # Store the conversation in long-term memory
-            store_in_long_term_memory(
-                user_query=filtered_response.content, 
-                ai_response=ai_response.content
-            )
-
-            # Check if the user wants to end the conversation
-            if check_conversation_end(transcript):
-                asyncio.run(
-                    speak(
-                        text="Thank you, goodbye!", 
-                        voice_number=1, rate="+3%", pitch="+5Hz"
-                    )
-                )
-                break
-
-    except KeyboardInterrupt:
-        print("Conversation loop stopped.")
-    except TypeError as e:
-        print(f"TypeError: {e}")
-        print("Ensure that all objects passed to the LLM are JSON serializable.")
-# Example of how to call the Reader function
-if __name__ == "__main__":
-    Reader()
-
-
-# ------------------------------------------------------------------------------------------------#
-#below code is for testing the tools
-# ------------------------------------------------------------------------------------------------#
-# from get_api import get_api_key_from_json
-# import os
-# from langchain_groq import ChatGroq
-# from ReadFile import read_file
-# from TranscripeUserData import start_recording_and_transcribing
-# import asyncio
-# from collections import deque
-# from GmeetHear import start_transcription
-# from GmeetSpeak import speak
-# import chromadb
-# from langchain_community.vectorstores import Chroma
-# from langchain.agents import Tool
-# from langchain_ollama import OllamaEmbeddings
-# from langchain import LLMChain
-# from langchain.prompts import PromptTemplate
-# from LongTermMemory import retrieve_from_long_term_memory, store_in_long_term_memory
-
-# # Initialize short-term memory
-# short_term_memory = deque(maxlen=2)
-
-# # Function to check if the user wants to end the conversation
-# def check_conversation_end(user_input):
-#     end_phrases = ["bye", "thank you", "goodbye", "see you", "thanks"]
-#     return any(phrase in user_input.lower() for phrase in end_phrases)
-
-# # Tool to retrieve relevant data from long-term memory
-# def query_long_term_memory_tool(topic: str) -> str:
-#     """Tool to query long-term memory for a given topic."""
-#     result = retrieve_from_long_term_memory(topic)
-#     return result if result else "No relevant data found for the topic."
-
-# def write_report_and_send_email_tool(topic: str) -> str:
-#     """Tool to write a report and send an email to the user."""
-#     asyncio.run(
-#         speak(
-#             text="Report Sent to user Successfully " + topic, 
-#             voice_number=0, rate="+7%", pitch="+10Hz"
-#         )
-#     )
-#     return "Report written and email sent successfully."
-
-# # Initialize tools for LLM
-# tools = [
-#     Tool(
-#         name="QueryLongTermMemory",
-#         func=query_long_term_memory_tool,
-#         description="Use this tool to fetch the latest update on a given topic from long-term memory."
-#     ),
-#     Tool(
-#         name="WriteReportandSendEmail",
-#         func=write_report_and_send_email_tool,
-#         description="Use this tool to write a report and send an email to the user."
-#     )
-# ]
-
-# async def Reader():
-#     api_key = get_api_key_from_json(
-#         r"C:\Users\AM ECOSYSTEMS\OneDrive\Documents\Chatbot\Retail AI Store Bot\Apikey.json", 
-#         "Manager_AI"
-#     )
-
-#     if "GROQ_API_KEY" not in os.environ:
-#         os.environ["GROQ_API_KEY"] = api_key
-
-#     llm = ChatGroq(
-#         model="llama-3.1-70b-versatile",
-#         temperature=0,
-#         max_tokens=None,
-#         timeout=None,
-#         max_retries=2,
-#         model_kwargs={"tools": tools}
-#     )
-
-#     # Initial greeting
-#     await speak(
-#         text="Hi, team. Good evening! Could you tell me what progress is being made on the automation project?", 
-#         voice_number=1, rate="+3%", pitch="+5Hz"
-#     )
-
-#     try:
-#         while True:
-#             print("Starting recording...")
-#             transcript = start_transcription(
-#                 chunk_duration=8, sample_rate=16000,
-#                 loudness_start_threshold=0.1, loudness_stop_threshold=0.08,
-#                 repeating_word_limit=3, silence_timeout=2,
-#                 model_type="small.en", vac_input_device=0, channels=1
-#             )
-#             print("Recording Stopped")
-
-#             if transcript:
-#                 short_term_memory.append(transcript)
-#                 print("Short-term memory:", list(short_term_memory))
-#             else:
-#                 print("Transcript is empty, skipping.")
-#                 continue
-
-#             relevant_past_info = retrieve_from_long_term_memory(transcript) or ""
-#             memory_context = " ".join(short_term_memory)
-
-#             try:
-#                 query = read_file(
-#                     r"C:\Users\AM ECOSYSTEMS\OneDrive\Documents\Chatbot\AIManager\prompt.txt"
-#                 )
-#             except FileNotFoundError as e:
-#                 print(f"File not found: {e}")
-#                 continue
-
-#             input_text = (
-#                 f"{transcript} Reformat this by removing spelling mistakes and grammatical errors. "
-#                 "Ignore repeating words like 'i has the thankyou i has the thankyou'. "
-#                 "If the conversation implies the user wants to end it, add 'okay bye' to the output. "
-#                 f"Further, here is relevant chat history: {relevant_past_info}."
-#                 f"Here is the latest update: {memory_context} Add it in the output if it is relevant."
-#                 "Make sure you format the output as it will sound sensible and don't give any solutions just reformat the transcript said by the user."
-#             )
-
-#             try:
-#                 filtered_response = llm.invoke(input_text)
-#             except TypeError as e:
-#                 print(f"TypeError: {e}")
-#                 print("Ensure that input to LLM is JSON serializable.")
-#                 continue
-
-#             response_text = (
-#                 f"{query} :- {filtered_response.content} "
-#                 f"Here is a summary of the previous conversations: {memory_context}."
-#                 f"Don't give output as a conversation; give it as a manager, not a full conversation between you and the user."
-#                 f"Make sure you talk as a manager, not with a preamble."
-#             )
-
-#             try:
-#                 ai_response = llm.invoke(response_text)
-#                 print("AI Response:", ai_response.content)
-#             except TypeError as e:
-#                 print(f"TypeError: {e}")
-#                 continue
-
-#             print("Playing Audio")
-#             await speak(
-#                 text=ai_response.content, 
-#                 voice_number=1, rate="+7%", pitch="+10Hz"
-#             )
-
-#             store_in_long_term_memory(
-#                 user_query=filtered_response.content, 
-#                 ai_response=ai_response.content
-#             )
-
-#             if check_conversation_end(transcript):
-#                 await speak(
-#                     text="Thank you, goodbye!", 
-#                     voice_number=1, rate="+3%", pitch="+5Hz"
-#                 )
-#                 break
-
-#     except KeyboardInterrupt:
-#         print("Conversation loop stopped.")
-
-# # Main entry point
-# if __name__ == "__main__":
-#     asyncio.run(Reader())
-
+from get_api import get_api_key_from_json
+import os
+from langchain_groq import ChatGroq
+from ReadFile import read_file
+import json
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from GmeetHear import start_transcription
+from AsrWorker import AsrWorkerPool, default_torch_threads
+from GmeetSpeak import speak, prewarm_tts_cache, output_sink
+from SpeechQueue import speak_sentences, speak_stream
+from AudioCapture import get_capture_service, shutdown_capture_services
+from BargeIn import BargeInMonitor, EchoGate
+from TranscriptCleanup import (normalize_transcript, is_clean, StructuredReply, FastPathStats,
+                               STRUCTURED_REPLY_INSTRUCTIONS)
+from Speculation import Speculator, Speculation, BufferedStream
+import chromadb
+from langchain_community.vectorstores import Chroma
+from langchain.agents import Tool
+from LongTermMemory import retrieve_from_long_term_memory, store_in_long_term_memory, embed_texts
+from ResponseCache import ResponseCache
+from PromptBuilder import PromptBuilder, PromptSection, RollingSummary, count_tokens
+from LlmClient import HedgedLlm, OpenAiCompatibleChat
+from Tracing import tracer, MetricsServer
+
+# Latest exchanges verbatim plus a rolling summary of everything before them
+session_summary = RollingSummary(keep_turns=2, max_tokens=250)
+
+# Token budgets of the variable prompt parts; when they exceed what the instructions leave
+# of max_tokens, the lowest priority parts are trimmed first. The user's words get whatever
+# the other parts leave, so they are the last thing trimmed
+prompt_builder = PromptBuilder(max_tokens=1400, sections={
+    "transcript": PromptSection(None, priority=4, keep="tail"),
+    "recent": PromptSection(300, priority=2, keep="tail"),
+    "summary": PromptSection(250, priority=1),
+    "retrieved": PromptSection(250, priority=0),
+})
+
+# Keep listening while the bot speaks and stop talking when a participant interrupts
+DUPLEX = True
+
+# Speak the response sentence by sentence while the LLM is still generating it
+STREAM_RESPONSES = True
+
+# "auto": transcripts that are clean after local normalization skip the cleanup LLM call and are
+# rewritten and answered in one request; "single": always one request; "two-call": always both
+CLEANUP_MODE = "auto"
+fast_path_stats = FastPathStats()
+
+# Start retrieval and the LLM on the partial transcript as soon as the speaker pauses; the
+# reply is kept if the final transcript is at least SPECULATION_THRESHOLD similar to it
+SPECULATE = True
+SPECULATION_THRESHOLD = 0.9
+
+# Seconds the LLM may take to start a reply before a canned reply is spoken instead; requests
+# slower than the recent p95 are duplicated and the first answer wins
+LLM_DEADLINE = 6.0
+
+# OpenAI-compatible server used instead of Groq when set (e.g., a local llama.cpp server, or
+# BenchmarkLlm.StandInLlmServer to test tail latency offline)
+LOCAL_LLM_URL = None
+
+# Per-turn stage timings go to traces/turns.jsonl, rolling p50/p95/p99 per stage to
+# traces/metrics.jsonl and to http://127.0.0.1:METRICS_PORT/metrics (None disables the endpoint)
+TRACE_DIR = "traces"
+METRICS_PORT = 9464
+
+# Reuse LLM responses for words heard before. Cleaned-up transcripts are only reused for the
+# same words; replies are reused for similar words (embedding similarity of at least the
+# threshold) answered with the same prompt template. The memories and session context change
+# every turn and are not part of the key: the ttl bounds how old the context of a reused
+# reply can be. Entries live in response_cache.json for a week
+USE_RESPONSE_CACHE = True
+response_cache = ResponseCache(
+    embed=embed_texts, threshold=0.92, ttl=7 * 24 * 3600, max_entries=512,
+    path="response_cache.json"
+)
+
+# Fixed phrases synthesized once into the TTS cache, so they play without a network call
+FIXED_PHRASES = [
+    {"text": "Hi, team. Good evening! Could you tell me what progress is being made on the automation project?",
+     "voice_number": 1, "rate": "+3%", "pitch": "+5Hz"},
+    {"text": "Thank you, goodbye!", "voice_number": 1, "rate": "+3%", "pitch": "+5Hz"},
+]
+
+# Function to check if the user wants to end the conversation
+def check_conversation_end(user_input):
+    end_phrases = ["bye", "thank you", "goodbye", "see you", "thanks"]
+    return any(phrase in user_input.lower() for phrase in end_phrases)
+
+# Tool to retrieve relevant data from long-term memory
+def query_long_term_memory_tool(topic: str) -> str:
+    """Tool to query long-term memory for a given topic."""
+    result = retrieve_from_long_term_memory(topic)
+    return result if result else "No relevant data found for the topic."
+
+def write_report_and_send_email_tool(topic: str) -> str:
+    """Tool to write a report and send an email to the user."""
+    asyncio.run(
+                speak(
+                    text="Report Sent to user Successfully " + topic, 
+                    voice_number=0, rate="+7%", pitch="+10Hz"
+                )
+            )
+    return "Report written and email sent successfully."
+
+# Function to stream the text of an LLM reply token by token
+async def llm_tokens(llm, prompt, turn=None):
+    started = time.perf_counter()
+    first_token = True
+    with tracer.span("llm.stream"):
+        async for chunk in llm.astream(prompt):
+            if first_token:
+                tracer.record("llm.first_token", time.perf_counter() - started, started)
+                first_token = False
+            if getattr(chunk, "canned", False) and turn is not None:
+                turn["canned"] = True  # Deadline missed: the fallback reply must not be cached
+            if chunk.content:
+                yield chunk.content
+
+# Function to speak a reply while its text is generated
+async def respond(tokens, barge_in=None):
+    """
+    Speak the reply (streamed sentence by sentence when STREAM_RESPONSES is set).
+
+    Parameters:
+    - tokens: Async iterable of reply text pieces (e.g., from reply_tokens).
+    - barge_in: Optional BargeInMonitor that stops playback when a participant talks.
+
+    Returns:
+    - (reply_text, interrupted).
+    """
+    if STREAM_RESPONSES:
+        # Each sentence is synthesized and played as soon as the LLM has finished it
+        reply_text, interrupted = await speak_stream(
+            tokens,
+            voice_number=1, rate="+7%", pitch="+10Hz",
+            barge_in=barge_in
+        )
+        print("AI Response:", reply_text)
+        return reply_text, interrupted
+
+    reply_text = "".join([token async for token in tokens]).strip()
+    print("AI Response:", reply_text)
+
+    # Sentence by sentence, so the next sentence is synthesized while one plays
+    interrupted = await speak_sentences(
+        text=reply_text, 
+        voice_number=1, rate="+7%", pitch="+10Hz",
+        barge_in=barge_in
+    )
+    return reply_text, interrupted
+
+# Function to look up an LLM response without blocking the event loop
+async def cached_response(key):
+    """Return the cached response for a ResponseCache key (None on a miss or without a key)."""
+    if key is None:
+        return None
+    started = time.perf_counter()
+    with tracer.span("cache.lookup", stage=key.stage) as span:
+        value = await asyncio.get_running_loop().run_in_executor(None, response_cache.get, key)
+        span["hit"] = value is not None
+    if value is not None:
+        print(f"Response cache hit ({key.stage}) in {(time.perf_counter() - started) * 1000:.1f} ms")
+    return value
+
+# Function to store a complete LLM response without blocking the event loop
+async def cache_response(key, value):
+    if key is not None and value:
+        await asyncio.get_running_loop().run_in_executor(None, response_cache.put, key, value)
+
+# Function to build the prompt that rewrites the transcript and answers it in one request
+def single_prompt(query, normalized, relevant_past_info, memory_context):
+    return (
+        f"{query} :- The user said (automatic transcript, may contain recognition "
+        f"errors): {normalized} "
+        f"Here is relevant chat history: {relevant_past_info}. "
+        f"Here is a summary of the previous conversations: {memory_context}."
+        f"Dont give output as a conversation , give it as a manager not a full conversation between you and the user."
+        f"Make sure you talk as a manager not preamble. "
+        f"{STRUCTURED_REPLY_INSTRUCTIONS}"
+    )
+
+# Function to build the prompt that cleans up the transcript
+def cleanup_prompt(normalized, relevant_past_info):
+    return (
+        f"{normalized} Reformat this by removing spelling mistakes and grammatical errors. "
+        "Ignore repeating words like 'i has the thankyou i has the thankyou'. "
+        "If the conversation implies the user wants to end it, add 'okay bye' to the output. "
+        f"Further, here is relevant chat history: {relevant_past_info}."
+        "Make sure you format the output as it will sound sensible and dont give any solutions just reformat the transcript said by the user."
+    )
+
+# Function to build the prompt that answers the cleaned-up transcript
+def reply_prompt(query, user_query, memory_context):
+    return (
+        f"{query} :- {user_query} "
+        f"Here is a summary of the previous conversations: {memory_context}."
+        f"Dont give output as a conversation , give it as a manager not a full conversation between you and the user."
+        f"Make sure you talk as a manager not preamble."
+    )
+
+# Function to join the session summary and the latest exchanges for a prompt
+def memory_context_text(summary, recent):
+    return " ".join(part for part in (summary, recent and f"Latest exchanges: {recent}") if part)
+
+# Function to gather what the prompts of a turn need
+async def prepare_turn(transcript, memory_executor):
+    """
+    Retrieve memories, read the prompt and normalize the transcript, then fit them and
+    the session memory into the prompt budget.
+
+    Parameters:
+    - transcript: The user's words.
+    - memory_executor: Executor that runs the Chroma calls.
+
+    Returns:
+    - Dictionary with normalized, fast_path, query, relevant_past_info and memory_context.
+    """
+    loop = asyncio.get_running_loop()
+
+    # Retrieve relevant past information (Chroma calls share one thread)
+    relevant_past_info = await loop.run_in_executor(
+        memory_executor, tracer.wrap(retrieve_from_long_term_memory), transcript
+    ) or ""
+
+    # Read the prompt from the file
+    query = await loop.run_in_executor(
+        None, read_file, r"C:\Users\AM ECOSYSTEMS\OneDrive\Documents\Chatbot\AIManager\prompt.txt"
+    )
+
+    # Remove filler words and repeats locally; clean transcripts need no cleanup call
+    normalized, dropped_words = normalize_transcript(transcript)
+    fast_path = CLEANUP_MODE == "single" or (
+        CLEANUP_MODE == "auto" and is_clean(normalized, dropped_words)
+    )
+
+    # Everything but the fitted parts is sent in full (the instructions in prompt.txt and
+    # around the parts); counting it as fixed text keeps each prompt within max_tokens
+    labels = memory_context_text("", " ")  # Only the "Latest exchanges:" label
+    if fast_path:
+        fixed = single_prompt(query, "", "", labels)
+    else:
+        fixed = max(cleanup_prompt("", ""), reply_prompt(query, "", labels), key=count_tokens)
+
+    # Keep the prompt the same size however much retrieval and the session return
+    fitted, report = prompt_builder.fit(
+        fixed=fixed, transcript=normalized, recent=session_summary.recent(),
+        summary=session_summary.summary, retrieved=relevant_past_info
+    )
+    print(f"Prompt context: {report['total']} tokens"
+          + (f" (trimmed {', '.join(report['trimmed'])})" if report["trimmed"] else ""))
+    memory_context = memory_context_text(fitted["summary"], fitted["recent"])
+    return {"normalized": fitted["transcript"], "fast_path": fast_path, "query": query,
+            "relevant_past_info": fitted["retrieved"], "memory_context": memory_context}
+
+# Function to stream the spoken part of the LLM's reply to a prepared turn
+async def reply_tokens(llm, prepared, turn):
+    """
+    Yield the reply text; turn["user_query"] is set to the cleaned transcript on the way.
+    """
+    normalized = prepared["normalized"]
+    query = prepared["query"]
+    relevant_past_info = prepared["relevant_past_info"]
+    memory_context = prepared["memory_context"]
+    turn["fast_path"] = prepared["fast_path"]
+    turn["user_query"] = normalized
+
+    if prepared["fast_path"]:
+        # One request rewrites the transcript and answers it
+        response_text = single_prompt(query, normalized, relevant_past_info, memory_context)
+        # The cached value includes the cleaned transcript, which must be the user's own words
+        key = response_cache.key("single", normalized, namespace=query, semantic=False) \
+            if USE_RESPONSE_CACHE else None
+        cached = await cached_response(key)
+        if cached is not None:
+            turn["user_query"] = cached["user_query"]
+            yield cached["reply"]
+            return
+
+        reply = StructuredReply(llm_tokens(llm, response_text, turn))
+        parts = []
+        try:
+            async for token in reply.reply_tokens():
+                parts.append(token)
+                yield token
+        finally:
+            turn["user_query"] = reply.transcript or normalized  # Also when interrupted
+        if not turn.get("canned"):
+            await cache_response(key, {"user_query": turn["user_query"], "reply": "".join(parts)})
+        return
+
+    # Prepare input text for the LLM
+    input_text = cleanup_prompt(normalized, relevant_past_info)
+
+    # Invoke the LLM (unless the same words were cleaned up before); the session context is
+    # left out of this prompt and the chat history is retrieved for these words, so the
+    # cleanup is safe to reuse for the same words
+    key = response_cache.key("cleanup", normalized, semantic=False) if USE_RESPONSE_CACHE else None
+    user_query = await cached_response(key)
+    if user_query is None:
+        # Past the deadline the local normalization stands in for the rewrite
+        with tracer.span("llm.cleanup"):
+            message = await llm.ainvoke(input_text, fallback=normalized)
+        user_query = message.content
+        if not getattr(message, "canned", False):
+            await cache_response(key, user_query)
+    turn["user_query"] = user_query
+
+    # Prepare final response with memory context
+    response_text = reply_prompt(query, user_query, memory_context)
+    key = response_cache.key("reply", user_query, namespace=query) if USE_RESPONSE_CACHE else None
+    cached = await cached_response(key)
+    if cached is not None:
+        yield cached
+        return
+
+    parts = []
+    async for token in llm_tokens(llm, response_text, turn):
+        parts.append(token)
+        yield token
+    if not turn.get("canned"):
+        await cache_response(key, "".join(parts))
+
+# Function to start preparing and generating a reply to a partial transcript
+def start_speculation(llm, text, memory_executor):
+    """Return a Speculation whose stream is the reply to text, generated in the background."""
+    turn = {}
+
+    async def tokens():
+        # The session memory is left alone: the partial may still be replaced
+        prepared = await prepare_turn(text, memory_executor)
+        async for token in reply_tokens(llm, prepared, turn):
+            yield token
+
+    return Speculation(text, BufferedStream(tokens()), context=turn)
+
+# Initialize tools for LLM
+tools = [
+    Tool(
+        name="QueryLongTermMemory",
+        func=query_long_term_memory_tool,
+        description="Use this tool to fetch the latest update on a given topic from long-term memory."
+    ),
+    Tool(
+        name="WriteReportandSendEmail",
+        func=write_report_and_send_email_tool,
+        description="Use this tool to write a report and send an email to the user."
+    )
+]
+
+# Pipeline stage: transcribe turn after turn, also while the previous reply is spoken
+async def listen_stage(transcripts, executor, asr_workers, speculator=None, echo_gate=None):
+    loop = asyncio.get_running_loop()
+
+    def on_partial(text):
+        # Called on the listener thread when the speaker pauses
+        loop.call_soon_threadsafe(speculator.on_partial, text)
+
+    while True:
+        print("Starting recording...")
+        # Spans from here on (decoding, speculation) belong to this turn
+        turn_trace = tracer.start_turn()
+        with tracer.activate(turn_trace):
+            transcript = await loop.run_in_executor(
+                executor,
+                tracer.wrap(lambda: start_transcription(
+                    chunk_duration=8, sample_rate=16000,
+                    loudness_start_threshold=0.03, loudness_stop_threshold=0.015,
+                    repeating_word_limit=3, silence_timeout=0.5,
+                    model_type="small.en", vac_input_device=0, channels=1,
+                    asr_workers=asr_workers,
+                    on_partial=on_partial if speculator is not None else None,
+                    echo_gate=echo_gate
+                ))
+            )
+            tracer.mark("heard")
+        print("Recording Stopped")
+        if not transcript.strip():
+            if speculator is not None:
+                speculator.discard()
+            await asyncio.sleep(0.1)  # Nothing was said (or capture stopped): listen again
+            continue
+
+        # Keep the reply started on the partial transcript if the final one matches it
+        speculation = None
+        if speculator is not None:
+            speculation, report = speculator.resolve(transcript)
+            if report["speculated"]:
+                stats = speculator.stats()
+                print(f"Speculation {'hit' if report['hit'] else 'miss'}: similarity "
+                      f"{report['similarity']}, saved {report['saved_seconds']:.3f} s "
+                      f"({stats['hits']}/{stats['turns']} turns, {stats['saved_seconds']:.3f} s saved)")
+        # Waits while the previous turn is being prepared
+        await transcripts.put((transcript, speculation, turn_trace))
+
+# Pipeline stage: retrieve memories and build the prompt for each transcript
+async def prepare_stage(transcripts, prompts, memory_executor):
+    while True:
+        transcript, speculation, turn_trace = await transcripts.get()
+
+        # A confirmed speculation was prepared (and is being answered) already
+        prepared = None
+        if speculation is None:
+            with tracer.activate(turn_trace), tracer.span("turn.prepare"):
+                prepared = await prepare_turn(transcript, memory_executor)
+
+        # Added now so the next turn's prompt includes it while this reply is spoken (it is
+        # folded into the summary only once finish_turn has filled in the reply)
+        exchange = session_summary.add_turn(transcript)
+        print("Session memory:", session_summary.recent())
+        await prompts.put((transcript, prepared, speculation, exchange, turn_trace))
+
+# Pipeline stage: get the reply from the LLM and speak it
+async def respond_stage(llm, prompts, memories, barge_in):
+    while True:
+        transcript, prepared, speculation, exchange, turn_trace = await prompts.get()
+
+        print("Playing Audio")
+        with tracer.activate(turn_trace), tracer.span("turn.respond", speculated=speculation is not None):
+            if speculation is not None:
+                turn = speculation.context
+                tokens = speculation.stream  # Replays what was generated, then follows the LLM
+            else:
+                turn = {}
+                tokens = reply_tokens(llm, prepared, turn)
+            ai_response_text, interrupted = await respond(tokens, barge_in)
+        if interrupted:
+            # The listener has kept transcribing; the interruption becomes the next turn
+            barge_in.clear()
+
+        if "fast_path" in turn:
+            fast_path_stats.record(turn["fast_path"])
+            print(f"Fast path: {turn['fast_path']} ({fast_path_stats.fast}/"
+                  f"{fast_path_stats.fast + fast_path_stats.slow} turns)")
+
+        # Stored in the background while the next turn is handled
+        session_summary.finish_turn(exchange, ai_response_text, user=turn.get("user_query", transcript))
+        await memories.put((exchange["user"], ai_response_text, turn_trace))
+
+        # Check if the user wants to end the conversation
+        if check_conversation_end(transcript):
+            await speak(
+                text="Thank you, goodbye!", 
+                voice_number=1, rate="+3%", pitch="+5Hz"
+            )
+            return
+
+# Pipeline stage: store each finished turn in long-term memory
+async def store_stage(memories, memory_executor):
+    loop = asyncio.get_running_loop()
+    while True:
+        user_query, ai_response_text, turn_trace = await memories.get()
+        with tracer.activate(turn_trace):
+            await loop.run_in_executor(
+                memory_executor,
+                tracer.wrap(lambda: store_in_long_term_memory(user_query=user_query, ai_response=ai_response_text))
+            )
+        # Writes the turn's timeline and the rolling metrics
+        tracer.end_turn(turn_trace, response_latency=("heard", "first_audio"))
+        memories.task_done()
+
+async def run_conversation():
+    """
+    Run the meeting as one asyncio pipeline: listen -> prepare -> respond -> store.
+
+    Each stage is a task connected to the next by a small queue, and blocking work
+    (transcription, Chroma) runs in executors, so the next turn is already being listened
+    to and the previous one stored while a reply is spoken.
+    """
+    # Decode in a separate process (loading its model while the greeting is spoken) so
+    # Whisper does not compete for the GIL with audio capture and the LLM/TTS loop
+    # (backend="whisper-int8" or "faster-whisper" decode several times faster on CPU-only hosts)
+    asr_workers = AsrWorkerPool(
+        model_type="small.en", backend="whisper", workers=1,
+        torch_threads=default_torch_threads(1)
+    )
+    listen_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="listen")
+    memory_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory")
+
+    api_key = get_api_key_from_json(
+        r"C:\Users\AM ECOSYSTEMS\OneDrive\Documents\Chatbot\Retail AI Store Bot\Apikey.json", 
+        "Manager_AI"
+    )
+
+    if "GROQ_API_KEY" not in os.environ:
+        os.environ["GROQ_API_KEY"] = api_key
+
+    if LOCAL_LLM_URL:
+        chat_model = OpenAiCompatibleChat(LOCAL_LLM_URL, timeout=30)
+    else:
+        chat_model = ChatGroq(
+            model="llama-3.1-70b-versatile",
+            temperature=0,
+            max_tokens=None,
+            timeout=30,
+            max_retries=0,  # HedgedLlm re-sends slow or failed requests itself
+        )
+    # Every reply starts within LLM_DEADLINE seconds, or the fallback reply is spoken
+    llm = HedgedLlm(chat_model, deadline=LLM_DEADLINE, hedge_percentile=95)
+
+    # Older exchanges are folded into the session summary in the background (no deadline)
+    async def summarize(prompt):
+        return (await chat_model.ainvoke(prompt)).content
+    session_summary.summarize = summarize
+
+    # Synthesize fixed phrases not cached yet (plus any listed in tts_prewarm.json)
+    await prewarm_tts_cache(FIXED_PHRASES, path="tts_prewarm.json")
+
+    # Initial greeting
+    await speak(
+        text="Hi, team. Good evening! Could you tell me what progress is being made on the automation project?", 
+        voice_number=1, rate="+3%", pitch="+5Hz"
+    )
+
+    # Stage latencies of every turn, written to TRACE_DIR and served for scraping
+    tracer.trace_path = os.path.join(TRACE_DIR, "turns.jsonl")
+    tracer.metrics_path = os.path.join(TRACE_DIR, "metrics.jsonl")
+    metrics_server = None
+    if METRICS_PORT is not None:
+        try:
+            metrics_server = MetricsServer(tracer, port=METRICS_PORT).start()
+        except OSError as e:
+            print(f"Metrics endpoint not started: {e}")
+
+    # Shares the capture stream with start_transcription through its own subscription
+    barge_in = None
+    if DUPLEX:
+        barge_in = BargeInMonitor(
+            get_capture_service(0, 16000, 1), output_sink(),
+            start_threshold=0.03, stop_threshold=0.015
+        ).start()
+
+    # Bounded queues: a slow stage holds back the one before it instead of piling up work
+    transcripts = asyncio.Queue(maxsize=1)
+    prompts = asyncio.Queue(maxsize=1)
+    memories = asyncio.Queue(maxsize=4)
+    speculator = None
+    if SPECULATE:
+        speculator = Speculator(
+            lambda text: start_speculation(llm, text, memory_executor),
+            threshold=SPECULATION_THRESHOLD
+        )
+    # The listener keeps transcribing while replies play: the bot's own voice leaking back
+    # into the capture is gated out like in the barge-in monitor (with its own estimate)
+    echo_gate = EchoGate(output_sink(), frame_duration=0.02)
+    background = [
+        asyncio.ensure_future(listen_stage(transcripts, listen_executor, asr_workers, speculator,
+                                           echo_gate)),
+        asyncio.ensure_future(prepare_stage(transcripts, prompts, memory_executor)),
+        asyncio.ensure_future(store_stage(memories, memory_executor)),
+    ]
+    responder = asyncio.ensure_future(respond_stage(llm, prompts, memories, barge_in))
+
+    try:
+        # Runs until the conversation ends or a background stage fails
+        done, _ = await asyncio.wait([responder, *background], return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            task.result()
+        await asyncio.wait_for(memories.join(), timeout=30)  # Finish storing the last turns
+    except TypeError as e:
+        print(f"TypeError: {e}")
+        print("Ensure that all objects passed to the LLM are JSON serializable.")
+    finally:
+        for task in [responder, *background]:
+            task.cancel()
+        await asyncio.gather(responder, *background, return_exceptions=True)
+        if speculator is not None:
+            speculator.discard()
+            print("Speculation:", speculator.stats())
+        print("Response cache:", response_cache.stats())
+        response_cache.save()  # Write the stores still waiting for the batched save
+        print("LLM:", llm.stats())
+        print("Stage latency:", json.dumps(tracer.metrics()))
+        if metrics_server is not None:
+            metrics_server.stop()
+        if isinstance(chat_model, OpenAiCompatibleChat):
+            await chat_model.close()
+        if barge_in is not None:
+            barge_in.stop()
+        shutdown_capture_services()  # Wakes the listener thread blocked on audio
+        listen_executor.shutdown(wait=False)
+        memory_executor.shutdown(wait=True)
+        asr_workers.close()
+
+def Reader():
+    try:
+        asyncio.run(run_conversation())
+    except KeyboardInterrupt:
+        print("Conversation loop stopped.")
+
+# Example of how to call the Reader function
+if __name__ == "__main__":
+    Reader()
+
+
+# ------------------------------------------------------------------------------------------------#
+#below code is for testing the tools
+# ------------------------------------------------------------------------------------------------#
+# from get_api import get_api_key_from_json
+# import os
+# from langchain_groq import ChatGroq
+# from ReadFile import read_file
+# from TranscripeUserData import start_recording_and_transcribing
+# import asyncio
+# from collections import deque
+# from GmeetHear import start_transcription
+# from GmeetSpeak import speak
+# import chromadb
+# from langchain_community.vectorstores import Chroma
+# from langchain.agents import Tool
+# from langchain_ollama import OllamaEmbeddings
+# from langchain import LLMChain
+# from langchain.prompts import PromptTemplate
+# from LongTermMemory import retrieve_from_long_term_memory, store_in_long_term_memory
+
+# # Initialize short-term memory
+# short_term_memory = deque(maxlen=2)
+
+# # Function to check if the user wants to end the conversation
+# def check_conversation_end(user_input):
+#     end_phrases = ["bye", "thank you", "goodbye", "see you", "thanks"]
+#     return any(phrase in user_input.lower() for phrase in end_phrases)
+
+# # Tool to retrieve relevant data from long-term memory
+# def query_long_term_memory_tool(topic: str) -> str:
+#     """Tool to query long-term memory for a given topic."""
+#     result = retrieve_from_long_term_memory(topic)
+#     return result if result else "No relevant data found for the topic."
+
+# def write_report_and_send_email_tool(topic: str) -> str:
+#     """Tool to write a report and send an email to the user."""
+#     asyncio.run(
+#         speak(
+#             text="Report Sent to user Successfully " + topic, 
+#             voice_number=0, rate="+7%", pitch="+10Hz"
+#         )
+#     )
+#     return "Report written and email sent successfully."
+
+# # Initialize tools for LLM
+# tools = [
+#     Tool(
+#         name="QueryLongTermMemory",
+#         func=query_long_term_memory_tool,
+#         description="Use this tool to fetch the latest update on a given topic from long-term memory."
+#     ),
+#     Tool(
+#         name="WriteReportandSendEmail",
+#         func=write_report_and_send_email_tool,
+#         description="Use this tool to write a report and send an email to the user."
+#     )
+# ]
+
+# async def Reader():
+#     api_key = get_api_key_from_json(
+#         r"C:\Users\AM ECOSYSTEMS\OneDrive\Documents\Chatbot\Retail AI Store Bot\Apikey.json", 
+#         "Manager_AI"
+#     )
+
+#     if "GROQ_API_KEY" not in os.environ:
+#         os.environ["GROQ_API_KEY"] = api_key
+
+#     llm = ChatGroq(
+#         model="llama-3.1-70b-versatile",
+#         temperature=0,
+#         max_tokens=None,
+#         timeout=None,
+#         max_retries=2,
+#         model_kwargs={"tools": tools}
+#     )
+
+#     # Initial greeting
+#     await speak(
+#         text="Hi, team. Good evening! Could you tell me what progress is being made on the automation project?", 
+#         voice_number=1, rate="+3%", pitch="+5Hz"
+#     )
+
+#     try:
+#         while True:
+#             print("Starting recording...")
+#             transcript = start_transcription(
+#                 chunk_duration=8, sample_rate=16000,
+#                 loudness_start_threshold=0.1, loudness_stop_threshold=0.08,
+#                 repeating_word_limit=3, silence_timeout=2,
+#                 model_type="small.en", vac_input_device=0, channels=1
+#             )
+#             print("Recording Stopped")
+
+#             if transcript:
+#                 short_term_memory.append(transcript)
+#                 print("Short-term memory:", list(short_term_memory))
+#             else:
+#                 print("Transcript is empty, skipping.")
+#                 continue
+
+#             relevant_past_info = retrieve_from_long_term_memory(transcript) or ""
+#             memory_context = " ".join(short_term_memory)
+
+#             try:
+#                 query = read_file(
+#                     r"C:\Users\AM ECOSYSTEMS\OneDrive\Documents\Chatbot\AIManager\prompt.txt"
+#                 )
+#             except FileNotFoundError as e:
+#                 print(f"File not found: {e}")
+#                 continue
+
+#             input_text = (
+#                 f"{transcript} Reformat this by removing spelling mistakes and grammatical errors. "
+#                 "Ignore repeating words like 'i has the thankyou i has the thankyou'. "
+#                 "If the conversation implies the user wants to end it, add 'okay bye' to the output. "
+#                 f"Further, here is relevant chat history: {relevant_past_info}."
+#                 f"Here is the latest update: {memory_context} Add it in the output if it is relevant."
+#                 "Make sure you format the output as it will sound sensible and don't give any solutions just reformat the transcript said by the user."
+#             )
+
+#             try:
+#                 filtered_response = llm.invoke(input_text)
+#             except TypeError as e:
+#                 print(f"TypeError: {e}")
+#                 print("Ensure that input to LLM is JSON serializable.")
+#                 continue
+
+#             response_text = (
+#                 f"{query} :- {filtered_response.content} "
+#                 f"Here is a summary of the previous conversations: {memory_context}."
+#                 f"Don't give output as a conversation; give it as a manager, not a full conversation between you and the user."
+#                 f"Make sure you talk as a manager, not with a preamble."
+#             )
+
+#             try:
+#                 ai_response = llm.invoke(response_text)
+#                 print("AI Response:", ai_response.content)
+#             except TypeError as e:
+#                 print(f"TypeError: {e}")
+#                 continue
+
+#             print("Playing Audio")
+#             await speak(
+#                 text=ai_response.content, 
+#                 voice_number=1, rate="+7%", pitch="+10Hz"
+#             )
+
+#             store_in_long_term_memory(
+#                 user_query=filtered_response.content, 
+#                 ai_response=ai_response.content
+#             )
+
+#             if check_conversation_end(transcript):
+#                 await speak(
+#                     text="Thank you, goodbye!", 
+#                     voice_number=1, rate="+3%", pitch="+5Hz"
+#                 )
+#                 break
+
+#     except KeyboardInterrupt:
+#         print("Conversation loop stopped.")
+
+# # Main entry point
+# if __name__ == "__main__":
+#     asyncio.run(Reader())
+
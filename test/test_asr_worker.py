@@ -0,0 +1,19 @@
+import sys
+import numpy as np
+import pytest
+from AsrWorker import AsrWorkerPool
+
+def test_transcribe_fails_instead_of_hanging_when_the_workers_exit():
+    main = sys.modules["__main__"]
+    main_script = (getattr(main, "__file__", None), getattr(main, "__spec__", None))
+    # The model cannot be loaded, so the only worker exits right after starting
+    pool = AsrWorkerPool(model_type="no-such-model", backend="whisper", workers=1, timeout=60)
+    try:
+        with pytest.raises(RuntimeError):
+            pool.transcribe(np.zeros(16000, dtype='float32'))
+        with pytest.raises(RuntimeError):
+            pool.submit(np.zeros(16000, dtype='float32'))
+    finally:
+        pool.close()
+    # The main script is only hidden while the workers start
+    assert (getattr(main, "__file__", None), getattr(main, "__spec__", None)) == main_script
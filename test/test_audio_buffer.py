@@ -0,0 +1,47 @@
+import threading
+import time
+import numpy as np
+import pytest
+from AudioBuffer import AudioRingBuffer
+
+def ramp(start, count):
+    return np.arange(start, start + count, dtype='float32')
+
+def test_reads_wrap_around_in_order():
+    buffer = AudioRingBuffer(8)
+    out = np.zeros(5, dtype='float32')
+    for start in range(0, 40, 5):
+        buffer.write(ramp(start, 5))
+        assert np.array_equal(buffer.read(5, out=out), ramp(start, 5))
+    assert buffer.read_position == buffer.write_position == 40
+
+def test_overrun_drops_the_oldest_samples():
+    buffer = AudioRingBuffer(10)
+    assert buffer.write(ramp(0, 6)) == 0
+    assert buffer.write(ramp(6, 6)) == 2
+    assert buffer.stats() == {"capacity": 10, "available": 10, "overruns": 1, "dropped_samples": 2}
+    assert np.array_equal(buffer.read(10), ramp(2, 10))
+
+def test_block_larger_than_the_capacity_keeps_its_tail():
+    buffer = AudioRingBuffer(4)
+    buffer.write(ramp(0, 10))
+    assert np.array_equal(buffer.read(4), ramp(6, 4))
+
+def test_read_blocks_until_the_writer_catches_up():
+    buffer = AudioRingBuffer(100)
+    buffer.write(ramp(0, 30))
+    writer = threading.Timer(0.05, lambda: buffer.write(ramp(30, 30)))
+    writer.start()
+    started = time.perf_counter()
+    block = buffer.read(50, timeout=5)
+    writer.join()
+    assert time.perf_counter() - started >= 0.04
+    assert np.array_equal(block, ramp(0, 50))
+
+def test_read_times_out_and_close_wakes_a_blocked_reader():
+    buffer = AudioRingBuffer(100)
+    assert buffer.read(10, timeout=0.01) is None
+    threading.Timer(0.05, buffer.close).start()
+    assert buffer.read(10, timeout=5) is None
+    with pytest.raises(ValueError):
+        buffer.read(101)
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+from AudioPreprocess import AudioPreprocessor, Downmixer, PolyphaseResampler
+
+def tone(frequency, rate, seconds=1.0, amplitude=0.5):
+    t = np.arange(int(rate * seconds)) / rate
+    return (amplitude * np.sin(2 * np.pi * frequency * t)).astype('float32')
+
+def test_downmix_averages_or_picks_a_channel():
+    block = np.array([[1.0, 3.0], [2.0, 4.0]], dtype='float32')
+    assert Downmixer(2).process(block).tolist() == [2.0, 3.0]
+    assert Downmixer(2, mode=1).process(block).tolist() == [3.0, 4.0]
+    with pytest.raises(ValueError):
+        Downmixer(2, mode=2)
+
+@pytest.mark.parametrize("input_rate", [48000, 44100])
+def test_resampling_in_blocks_matches_one_pass(input_rate):
+    audio = tone(440, input_rate)
+    whole = PolyphaseResampler(input_rate, 16000, max_frames=len(audio)).process(audio).copy()
+    resampler = PolyphaseResampler(input_rate, 16000, max_frames=1024)
+    blocks = [resampler.process(audio[start:start + 1000]).copy() for start in range(0, len(audio), 1000)]
+    assert np.allclose(np.concatenate(blocks), whole, atol=1e-6)
+    assert abs(len(whole) - 16000) <= 1
+
+def test_tones_below_nyquist_pass_and_above_are_removed():
+    resampler = PolyphaseResampler(48000, 16000, max_frames=48000)
+    passed = resampler.process(tone(1000, 48000))[1000:]  # Skip the filter's start-up
+    assert np.sqrt(np.mean(passed ** 2)) == pytest.approx(0.5 / np.sqrt(2), rel=0.02)
+    spectrum = np.abs(np.fft.rfft(passed))
+    assert np.argmax(spectrum) * 16000 / len(passed) == pytest.approx(1000, abs=2)
+
+    resampler.reset()
+    aliased = resampler.process(tone(12000, 48000))[1000:]  # Would fold to 4 kHz
+    assert np.sqrt(np.mean(aliased ** 2)) < 0.01
+
+def test_preprocessor_turns_stereo_48k_into_mono_16k():
+    stereo = np.stack([tone(500, 48000, 0.1), tone(500, 48000, 0.1)], axis=1)
+    preprocessor = AudioPreprocessor(2, 48000, max_frames=len(stereo))
+    assert len(preprocessor.process(stereo)) == 1600
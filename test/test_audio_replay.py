@@ -0,0 +1,81 @@
+import threading
+import numpy as np
+import pytest
+import AsrBackends
+from AsrBackends import AsrBackend, Segment
+from AudioBuffer import AudioRingBuffer
+from AudioReplay import ReplayCaptureService
+from BenchmarkTranscription import run_replay, synthetic_speech
+
+# ASR stand-in that "hears" a fixed phrase in any audio it is given
+class FakeBackend(AsrBackend):
+    name = "fake"
+
+    def load(self):
+        return None
+
+    def transcribe(self, audio, prompt=None, word_timestamps=False):
+        return [Segment(0, len(audio) / 16000, " hello there")]
+
+@pytest.fixture
+def fake_backend(monkeypatch):
+    monkeypatch.setitem(AsrBackends.ASR_BACKENDS, FakeBackend.name, FakeBackend)
+    monkeypatch.setattr(AsrBackends, "_backends", {})
+    return FakeBackend.name
+
+def test_read_after_close_returns_zero_padded_tail():
+    buffer = AudioRingBuffer(100)
+    buffer.write(np.ones(30, dtype='float32'))
+    buffer.close()
+    block = buffer.read(20)
+    assert np.all(block == 1)
+    block = buffer.read(20)
+    assert len(block) == 20 and np.all(block[:10] == 1) and np.all(block[10:] == 0)
+    assert buffer.available == 0
+    assert buffer.read(20) is None
+
+def test_read_available_after_close_returns_remainder():
+    buffer = AudioRingBuffer(100)
+    buffer.write(np.ones(30, dtype='float32'))
+    buffer.close()
+    assert len(buffer.read_available(np.zeros(100, dtype='float32'), min_count=50)) == 30
+    assert buffer.read_available(np.zeros(100, dtype='float32'), min_count=50) is None
+
+@pytest.mark.parametrize("duration", [10.0, 10.05])
+def test_run_replay_finishes_when_length_is_not_a_multiple_of_the_block(fake_backend, duration):
+    audio = synthetic_speech(duration).reshape(-1, 1)
+    results = []
+    thread = threading.Thread(
+        target=lambda: results.append(run_replay(audio, 16000, "fake", 8, backend=fake_backend)),
+        daemon=True,
+    )
+    thread.start()
+    thread.join(timeout=30)
+    assert not thread.is_alive(), "run_replay did not finish"
+    assert any(results[0]["transcripts"])
+
+# Output sink stand-in whose reference says the captured audio was the bot's own playback
+class EchoingSink:
+    def __init__(self, source, audio, frame_duration=0.02):
+        self.source = source
+        frames = audio[:len(audio) // 320 * 320].reshape(-1, 320)
+        self.levels = np.sqrt(np.mean(np.square(frames), axis=1))
+        self.frame_duration = frame_duration
+
+    @property
+    def reference(self):
+        started = self.source.started_at or 0.0
+        return [(started + index * self.frame_duration, level) for index, level in enumerate(self.levels)]
+
+@pytest.mark.parametrize("echo", [False, True])
+def test_bot_voice_leaking_into_the_capture_is_not_transcribed(echo):
+    from BargeIn import EchoGate
+    from GmeetHear import start_transcription
+
+    audio = np.concatenate([synthetic_speech(2.0, burst=2.0, pause=0.0), np.zeros(16000, dtype='float32')])
+    source = ReplayCaptureService(audio.reshape(-1, 1), 16000, realtime=False)
+    echo_gate = EchoGate(EchoingSink(source, audio)) if echo else None
+    transcript = start_transcription(asr_workers=FakeBackend("fake"), capture_service=source,
+                                     echo_gate=echo_gate)
+    source.stop()
+    assert transcript == ("" if echo else "hello there")
@@ -0,0 +1,17 @@
+import numpy as np
+import pytest
+from AudioPreprocess import AudioPreprocessor
+from AudioSink import Playback
+
+@pytest.mark.parametrize("output_rate", [48000, 44100])
+def test_write_resamples_in_bounded_blocks(output_rate):
+    input_rate = 24000
+    audio = (0.1 * np.sin(np.arange(10 * input_rate) / 10)).astype('float32')
+    playback = Playback(input_rate, output_rate, capacity=10 * output_rate + 64)
+    playback.write(audio)
+
+    written = playback._buffer.read_available(np.zeros(playback._buffer.capacity, dtype='float32'))
+    expected = AudioPreprocessor(1, input_rate, output_rate, max_frames=len(audio)).process(audio)
+    np.testing.assert_allclose(written, expected, atol=1e-6)
+    # Work buffers are sized for one block, not for the whole clip
+    assert playback._preprocessor.resampler._max_frames <= input_rate // 10
@@ -0,0 +1,85 @@
+import time
+import asyncio
+import pytest
+from LlmClient import HedgedLlm, LlmText, OpenAiCompatibleChat
+
+# Chat model whose successive requests take scripted delays (an exception fails the request)
+class ScriptedChat:
+    def __init__(self, *behaviours):
+        self.behaviours = list(behaviours)
+        self.requests = 0
+
+    async def _wait(self):
+        behaviour = self.behaviours[min(self.requests, len(self.behaviours) - 1)]
+        self.requests += 1
+        if isinstance(behaviour, Exception):
+            raise behaviour
+        await asyncio.sleep(behaviour)
+
+    async def ainvoke(self, prompt):
+        await self._wait()
+        return LlmText(f"answer {self.requests}")
+
+    async def astream(self, prompt):
+        await self._wait()
+        for word in ("Thanks ", "for ", "the ", "update."):
+            yield LlmText(word)
+
+def collect(llm, prompt="status?"):
+    async def run():
+        return [chunk async for chunk in llm.astream(prompt)]
+    return asyncio.run(run())
+
+def test_hedge_wins_when_the_first_request_is_slow():
+    llm = HedgedLlm(ScriptedChat(2.0, 0.01), deadline=1.0, initial_hedge_delay=0.05)
+    started = time.perf_counter()
+    chunks = collect(llm)
+    assert time.perf_counter() - started < 0.5
+    assert "".join(chunk.content for chunk in chunks) == "Thanks for the update."
+    assert llm.counts["hedged"] == 1 and llm.counts["hedge_wins"] == 1
+
+def test_deadline_miss_returns_the_canned_reply():
+    llm = HedgedLlm(ScriptedChat(5.0), deadline=0.2, initial_hedge_delay=0.05)
+    message = asyncio.run(llm.ainvoke("status?", fallback="Let's move on."))
+    assert message.canned and message.content == "Let's move on."
+    assert llm.counts["deadline_missed"] == 1
+
+def test_both_requests_failing_returns_the_canned_reply():
+    llm = HedgedLlm(ScriptedChat(ConnectionError("down")), deadline=1.0, initial_hedge_delay=0.05)
+    chunks = collect(llm)
+    assert len(chunks) == 1 and chunks[0].canned
+    assert llm.counts["errors"] == 2 and llm.counts["deadline_missed"] == 0
+
+def test_deadline_misses_do_not_stop_hedging():
+    llm = HedgedLlm(ScriptedChat(0.01, 0.01, 0.01, 5.0), deadline=0.2, initial_hedge_delay=0.05,
+                    min_samples=3)
+    for _ in range(3):
+        asyncio.run(llm.ainvoke("status?"))
+    for _ in range(2):
+        assert asyncio.run(llm.ainvoke("status?")).canned
+    assert llm.hedge_delay(llm.latency) < 0.1
+
+def test_stand_in_server_tail_is_hedged():
+    pytest.importorskip("aiohttp")
+    from BenchmarkLlm import StandInLlmServer
+
+    delays = iter([1.5])
+    server = StandInLlmServer(latency=lambda: next(delays, 0.02), seconds_per_token=0).start()
+    chat = OpenAiCompatibleChat(server.url)
+    llm = HedgedLlm(chat, deadline=1.0, initial_hedge_delay=0.1)
+
+    async def run():
+        try:
+            started = time.perf_counter()
+            chunks = [chunk async for chunk in llm.astream("status?")]
+            return time.perf_counter() - started, chunks
+        finally:
+            await chat.close()
+
+    try:
+        elapsed, chunks = asyncio.run(run())
+    finally:
+        server.stop()
+    assert elapsed < 1.0
+    assert "".join(chunk.content for chunk in chunks) == server.reply
+    assert llm.counts["hedge_wins"] == 1
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+from ModelRegistry import ModelRegistry, model_memory_bytes, resident_memory_bytes
+
+# Engine stand-in that keeps its weights outside torch, like CTranslate2
+class NativeEngine:
+    def __init__(self, megabytes):
+        self.weights = np.ones(megabytes * 1024 * 1024, dtype=np.uint8)
+
+def test_engines_outside_torch_are_sized_by_their_load_and_evicted():
+    assert model_memory_bytes(NativeEngine(1)) == 0
+    if resident_memory_bytes() is None:
+        pytest.skip("the platform does not report RSS")
+    registry = ModelRegistry(memory_budget_mb=100, loader=lambda name: NativeEngine(64))
+    registry.get("first")
+    assert registry.stats()["first"]["memory_mb"] >= 48
+    registry.get("second")
+    assert registry.loaded() == ["second"]
+
+# Minimal stand-ins for the tensors and modules of a dynamically quantized torch model
+class Tensor:
+    def __init__(self, array):
+        self.array = array
+
+    def numel(self):
+        return self.array.size
+
+    def element_size(self):
+        return self.array.itemsize
+
+    def data_ptr(self):
+        return self.array.ctypes.data
+
+class PackedLinear:
+    def __init__(self, weight, bias):
+        self.weight, self.bias = weight, bias
+
+    def _weight_bias(self):
+        return Tensor(self.weight), Tensor(self.bias)
+
+class QuantizedModel:
+    def __init__(self):
+        self.bias = np.zeros(4, dtype=np.float32)
+        self.layer = PackedLinear(np.zeros((4, 8), dtype=np.int8), self.bias)
+
+    def parameters(self):
+        return [Tensor(np.zeros(10, dtype=np.float32))]
+
+    def buffers(self):
+        return []
+
+    def modules(self):
+        # The quantized layer and its packed params both unpack the same storage
+        return [self, self.layer, PackedLinear(self.layer.weight, self.layer.bias)]
+
+def test_packed_int8_weights_are_counted_once():
+    assert model_memory_bytes(QuantizedModel()) == 10 * 4 + 4 * 8 + 4 * 4
@@ -0,0 +1,56 @@
+import io
+import numpy as np
+import pytest
+
+sf = pytest.importorskip("soundfile")
+from Mp3Stream import Mp3StreamDecoder, parse_mp3_header
+
+# One silent 24 kHz MPEG-2 Layer III frame at 48 kbit/s, as edge_tts sends them
+SILENT_FRAME = bytes([0xFF, 0xF3, 0x64, 0xC0]) + bytes(140)
+
+def encode(rate, seconds=1.0):
+    rng = np.random.default_rng(0)
+    t = np.arange(int(rate * seconds)) / rate
+    audio = 0.3 * np.sin(2 * np.pi * 440 * t) + 0.05 * rng.standard_normal(len(t))
+    buffer = io.BytesIO()
+    try:
+        sf.write(buffer, audio.astype('float32'), rate, format='MP3', bitrate_mode='CONSTANT',
+                 compression_level=0.5)
+    except (TypeError, sf.LibsndfileError):
+        pytest.skip("libsndfile cannot write MP3")
+    return buffer.getvalue()
+
+def decode_in_pieces(data, size):
+    decoder = Mp3StreamDecoder()
+    pieces = [decoder.feed(data[start:start + size]) for start in range(0, len(data), size)]
+    return np.concatenate(pieces + [decoder.flush()]), decoder
+
+def test_header_gives_frame_length_and_rate():
+    assert parse_mp3_header(SILENT_FRAME) == (144, 24000, 576)
+    assert parse_mp3_header(SILENT_FRAME, 1) is None
+    assert parse_mp3_header(SILENT_FRAME[:3]) is None
+
+def test_frames_are_found_across_pieces():
+    decoder = Mp3StreamDecoder(decode_frames=100)
+    data = b"junk" + SILENT_FRAME * 5
+    for start in range(0, len(data), 7):
+        assert len(decoder.feed(data[start:start + 7])) == 0
+    assert decoder._frames == [(4 + 144 * i, 4 + 144 * (i + 1)) for i in range(5)]
+    assert decoder.sample_rate == 24000
+
+@pytest.mark.parametrize("rate", [24000, 44100])
+@pytest.mark.parametrize("size", [100, 1000])
+def test_decoding_in_pieces_matches_one_pass(rate, size):
+    data = encode(rate)
+    audio, decoder = decode_in_pieces(data, size)
+    # The stream starts with an info frame, which holds no audio and is skipped
+    first = decoder._frames[0][0]
+    assert first > 0
+    whole, _ = sf.read(io.BytesIO(data[first:]), dtype='float32')
+    assert len(audio) == len(decoder._frames) * decoder.samples_per_frame
+    assert np.allclose(audio[:len(whole)], whole, atol=1e-6)
+
+def test_audio_comes_out_before_the_stream_ends():
+    data = encode(24000)
+    decoder = Mp3StreamDecoder(decode_frames=4)
+    assert len(decoder.feed(data[:len(data) // 2])) > 0
@@ -0,0 +1,49 @@
+import asyncio
+from PromptBuilder import PromptBuilder, PromptSection, RollingSummary, count_tokens
+
+def test_fixed_text_is_kept_whole_and_counted_against_the_budget():
+    instructions = "You are the project manager. " * 12
+    budget = count_tokens(instructions) + 60
+    builder = PromptBuilder(max_tokens=budget, sections={
+        "transcript": PromptSection(100, priority=1),
+        "retrieved": PromptSection(100, priority=0),
+    })
+    fitted, report = builder.fit(fixed=instructions, transcript="testing is done " * 10,
+                                 retrieved="old notes " * 50)
+    assert report["fixed"] == count_tokens(instructions)
+    assert report["total"] <= budget
+    assert fitted["transcript"] == " ".join(("testing is done " * 10).split())
+    assert "retrieved" in report["trimmed"]
+
+def test_pipelined_turns_reach_the_summary_with_their_replies():
+    folded = []
+
+    async def summarize(prompt):
+        folded.append(prompt)
+        return prompt.rsplit("New exchanges: ", 1)[1]
+
+    async def run():
+        summary = RollingSummary(summarize, keep_turns=1)
+        first = summary.add_turn("Testing is done.")
+        second = summary.add_turn("Deployment is next.")  # First ages out before its reply
+        await asyncio.sleep(0)
+        assert not folded
+        summary.finish_turn(first, "Great work.")
+        summary.finish_turn(second, "Plan it for Friday.")
+        await summary.close()
+        return summary.summary
+
+    result = asyncio.run(run())
+    assert result == "User: Testing is done. Manager: Great work."
+
+def test_section_without_budget_gets_what_the_others_leave():
+    update = " ".join(f"module {number} passed testing." for number in range(80))
+    budget = count_tokens(update) + 40
+    builder = PromptBuilder(max_tokens=budget, sections={
+        "transcript": PromptSection(None, priority=4, keep="tail"),
+        "retrieved": PromptSection(250, priority=0),
+    })
+    fitted, report = builder.fit(transcript=update, retrieved="old notes " * 100)
+    assert fitted["transcript"] == update
+    assert report["trimmed"] == ["retrieved"]
+    assert report["total"] <= budget
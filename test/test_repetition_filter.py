@@ -0,0 +1,31 @@
+import random
+from RepetitionFilter import RepetitionFilter
+
+def test_distinct_words_are_released_at_once():
+    repetition_filter = RepetitionFilter(limit=3)
+    words = "one two three four five six seven eight nine ten"
+    assert repetition_filter.feed(words) == words
+    assert repetition_filter.flush() == ""
+
+def test_extra_copies_are_dropped_and_reset_starts_a_new_run():
+    repetition_filter = RepetitionFilter(limit=3)
+    assert repetition_filter.filter("thank you thank you thank you thank you so much") == \
+        "thank you thank you thank you so much"
+    answers = []
+    for _ in range(4):
+        repetition_filter.reset()
+        answers.append(repetition_filter.filter("Yes."))
+    assert answers == ["Yes."] * 4
+
+def test_feeding_word_by_word_matches_filtering_at_once():
+    rng = random.Random(0)
+    for _ in range(500):
+        limit = rng.choice([1, 2, 3, 5])
+        ngram_sizes = rng.sample(range(1, 9), rng.randint(1, 4))
+        words = []
+        while len(words) < 60:
+            words += [rng.choice("abc") for _ in range(rng.randint(1, 5))] * rng.randint(1, 6)
+        expected = RepetitionFilter(limit, ngram_sizes).filter(" ".join(words))
+        repetition_filter = RepetitionFilter(limit, ngram_sizes)
+        pieces = [repetition_filter.feed(word) for word in words] + [repetition_filter.flush()]
+        assert " ".join(piece for piece in pieces if piece) == expected
@@ -0,0 +1,36 @@
+import os
+from ResponseCache import ResponseCache
+
+# Embedder under which every text looks the same, so only the key settings decide a match
+def same_embedding(texts):
+    return [[1.0, 0.0, 0.0] for _ in texts]
+
+def test_exact_keys_never_match_similar_text():
+    cache = ResponseCache(embed=same_embedding)
+    cache.put(cache.key("cleanup", "Testing is done for module A", semantic=False), "module A")
+    assert cache.get(cache.key("cleanup", "testing is done for module A.", semantic=False)) == "module A"
+    assert cache.get(cache.key("cleanup", "Testing is not done for module B", semantic=False)) is None
+
+def test_semantic_keys_only_match_within_their_namespace():
+    cache = ResponseCache(embed=same_embedding)
+    cache.put(cache.key("reply", "Testing is done", namespace="context 1"), "Great work.")
+    assert cache.get(cache.key("reply", "Tests are done", namespace="context 1")) == "Great work."
+    assert cache.get(cache.key("reply", "Tests are done", namespace="context 2")) is None
+    assert cache.stats()["reply"]["semantic_hits"] == 1
+
+def test_stores_are_batched_into_one_save(tmp_path):
+    path = os.path.join(tmp_path, "cache.json")
+    cache = ResponseCache(embed=same_embedding, path=path, save_delay=60)
+    for number in range(3):
+        cache.put(cache.key("reply", f"update {number}"), f"reply {number}")
+    assert not os.path.exists(path)
+    cache.save()
+    reloaded = ResponseCache(embed=same_embedding, path=path)
+    assert cache._save_timer is None
+    assert reloaded.get(reloaded.key("reply", "update 2")) == "reply 2"
+
+def test_text_without_words_is_a_miss():
+    cache = ResponseCache(embed=same_embedding)
+    cache.put(cache.key("reply", "Testing is done"), "Great work.")
+    assert cache.get(cache.key("reply", "...")) is None
+    assert cache.stats()["reply"]["misses"] == 1
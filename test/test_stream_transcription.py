@@ -0,0 +1,59 @@
+import numpy as np
+from AsrBackends import AsrBackend, Segment
+from AudioReplay import ReplayCaptureService
+from BenchmarkTranscription import synthetic_speech
+from GmeetHear import stream_transcription
+from RepetitionFilter import RepetitionFilter
+
+# ASR stand-in whose decodes never agree, so every word is committed by the final flush
+class ChangingBackend(AsrBackend):
+    name = "changing"
+
+    def __init__(self, model_type="fake", words=25):
+        super().__init__(model_type)
+        self.words = words
+        self.calls = 0
+        self.last = []
+
+    def load(self):
+        return None
+
+    def transcribe(self, audio, prompt=None, word_timestamps=False):
+        self.calls += 1
+        step = len(audio) / 16000 / self.words
+        words = [(i * step, (i + 1) * step, f" c{self.calls}w{i}") for i in range(self.words)]
+        self.last = [word.strip() for _, _, word in words]
+        return [Segment(0, len(audio) / 16000, "".join(word for _, _, word in words), words)]
+
+def test_final_flush_keeps_every_word():
+    backend = ChangingBackend()
+    audio = np.concatenate([synthetic_speech(2.0, burst=2.0, pause=0.0), np.zeros(16000, dtype='float32')])
+    source = ReplayCaptureService(audio.reshape(-1, 1), 16000, realtime=False)
+    events = list(stream_transcription(asr_workers=backend, capture_service=source,
+                                       repetition_filter=RepetitionFilter(limit=5)))
+    source.stop()
+    final = " ".join(event.text for event in events if event.kind == "final").split()
+    assert final[-len(backend.last):] == backend.last
+
+# ASR stand-in that hears the same short answer in every window
+class YesBackend(AsrBackend):
+    name = "yes"
+
+    def load(self):
+        return None
+
+    def transcribe(self, audio, prompt=None, word_timestamps=False):
+        duration = len(audio) / 16000
+        return [Segment(0, duration, " Yes.", [(0.0, duration, " Yes.")])]
+
+def test_answer_repeated_in_later_turns_is_kept():
+    repetition_filter = RepetitionFilter(limit=3)
+    finals = []
+    for _ in range(4):
+        audio = np.concatenate([synthetic_speech(0.5, burst=0.5, pause=0.0), np.zeros(16000, dtype='float32')])
+        source = ReplayCaptureService(audio.reshape(-1, 1), 16000, realtime=False)
+        events = list(stream_transcription(asr_workers=YesBackend("fake"), capture_service=source,
+                                           repetition_filter=repetition_filter))
+        source.stop()
+        finals.append(" ".join(event.text for event in events if event.kind == "final"))
+    assert all(final.split()[-1] == "Yes." for final in finals)
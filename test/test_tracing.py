@@ -0,0 +1,116 @@
+import asyncio
+import json
+import time
+import urllib.request
+import pytest
+from Tracing import MetricsServer, Tracer
+
+def read_lines(path):
+    with open(path, encoding="utf-8") as lines:
+        return [json.loads(line) for line in lines]
+
+def test_spans_are_kept_on_the_active_turn():
+    tracer = Tracer()
+    tracer.record("outside", 0.5)
+    turn = tracer.start_turn()
+    with tracer.activate(turn):
+        with tracer.span("llm.reply", model="small") as span:
+            span["cached"] = True
+        with pytest.raises(ValueError):
+            with tracer.span("tts"):
+                raise ValueError("no voice")
+    assert [span["name"] for span in turn.spans] == ["llm.reply", "tts"]
+    assert turn.spans[0]["model"] == "small" and turn.spans[0]["cached"] is True
+    assert turn.spans[0]["start"] >= 0 and turn.spans[0]["duration"] >= 0
+    assert turn.spans[1]["error"] == "ValueError"
+    assert tracer.metrics()["outside"]["count"] == 1
+
+def test_traced_functions_and_tasks_share_the_turn():
+    tracer = Tracer()
+
+    @tracer.traced("work.sync")
+    def work():
+        return 1
+
+    @tracer.traced("work.async")
+    async def async_work():
+        return 2
+
+    async def main():
+        turn = tracer.start_turn()
+        with tracer.activate(turn):
+            assert await asyncio.create_task(async_work()) == 2
+            loop = asyncio.get_running_loop()
+            assert await loop.run_in_executor(None, tracer.wrap(work)) == 1
+        return turn
+
+    turn = asyncio.run(main())
+    assert sorted(span["name"] for span in turn.spans) == ["work.async", "work.sync"]
+    assert work.__name__ == "work"
+
+def test_cancelled_spans_are_marked():
+    tracer = Tracer()
+
+    async def main():
+        turn = tracer.start_turn()
+        with tracer.activate(turn):
+            async def slow():
+                with tracer.span("slow"):
+                    await asyncio.sleep(10)
+            task = asyncio.create_task(slow())
+            await asyncio.sleep(0)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+        return turn
+
+    assert asyncio.run(main()).spans[0]["cancelled"] is True
+
+def test_finished_turns_are_written_with_their_intervals(tmp_path):
+    trace_path = str(tmp_path / "traces" / "turns.jsonl")
+    metrics_path = str(tmp_path / "traces" / "metrics.jsonl")
+    tracer = Tracer(trace_path=trace_path, metrics_path=metrics_path)
+    turn = tracer.start_turn()
+    with tracer.activate(turn):
+        tracer.mark("heard", time.perf_counter() - 0.2)
+        tracer.mark("first_audio")
+        tracer.mark("heard")  # Only the first time counts
+    tracer.end_turn(turn, response_latency=("heard", "first_audio"), missing=("heard", "never"))
+
+    [record] = read_lines(trace_path)
+    assert record["turn"] == turn.id
+    assert set(record["marks"]) == {"heard", "first_audio"}
+    [interval] = record["spans"]
+    assert interval["name"] == "turn.response_latency"
+    assert interval["duration"] == pytest.approx(0.2, abs=0.05)
+    [metrics] = read_lines(metrics_path)
+    assert list(metrics["metrics"]) == ["turn.response_latency"]
+
+def test_disabled_tracer_records_nothing(tmp_path):
+    tracer = Tracer(trace_path=str(tmp_path / "turns.jsonl"), enabled=False)
+    turn = tracer.start_turn()
+    with tracer.activate(turn):
+        with tracer.span("llm.reply"):
+            pass
+        tracer.mark("heard")
+    tracer.end_turn(turn)
+    assert turn.spans == [] and turn.marks == {}
+    assert tracer.metrics() == {}
+    assert not (tmp_path / "turns.jsonl").exists()
+
+def test_metrics_are_served_in_prometheus_format():
+    tracer = Tracer()
+    for seconds in (0.1, 0.2, 0.3):
+        tracer.record("asr", seconds)
+    text = tracer.prometheus()
+    assert 'stage_latency_seconds{stage="asr",quantile="0.5"} 0.200000' in text
+    assert 'stage_latency_seconds_count{stage="asr"} 3' in text
+
+    server = MetricsServer(tracer, port=0).start()
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.port}/metrics", timeout=5) as response:
+            assert response.read().decode("utf-8") == text
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.port}/metrics.json", timeout=5) as response:
+            assert json.loads(response.read())["asr"]["count"] == 3
+    finally:
+        server.stop()
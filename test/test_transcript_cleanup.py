@@ -0,0 +1,35 @@
+import asyncio
+import pytest
+from TranscriptCleanup import StructuredReply, normalize_transcript, parse_structured_reply
+
+# Function to stream a complete answer in small pieces, as an LLM would
+async def pieces(text, size=3):
+    for start in range(0, len(text), size):
+        yield text[start:start + size]
+
+def stream(text):
+    async def run():
+        reply = StructuredReply(pieces(text))
+        spoken = "".join([token async for token in reply.reply_tokens()])
+        return reply.transcript, spoken
+    return asyncio.run(run())
+
+@pytest.mark.parametrize("answer", [
+    "TRANSCRIPT: Testing is done.\nREPLY: Great, thanks.",
+    "**TRANSCRIPT:** Testing is done.\n**REPLY:** Great, thanks.",
+    "Sure, here is the output:\n\n**Transcript**: Testing is done.\n\n### Reply : Great, thanks.",
+    "transcript: Testing is done. reply: Great, thanks.",
+])
+def test_markers_are_found_however_they_are_decorated(answer):
+    assert parse_structured_reply(answer) == ("Testing is done.", "Great, thanks.")
+    assert stream(answer) == ("Testing is done.", "Great, thanks.")
+
+def test_unstructured_answers_are_spoken_whole():
+    answer = "Great, thanks for the update on the automation project. " * 4
+    assert stream(answer) == (None, answer)
+    assert parse_structured_reply(answer) == (None, answer.strip())
+
+def test_normalize_keeps_genuine_repeats_and_drops_loops():
+    assert normalize_transcript("it is very very good")[0] == "It is very very good."
+    text, dropped = normalize_transcript("um the build the build the build the build passed")
+    assert text == "The build the build the build passed." and dropped == 2
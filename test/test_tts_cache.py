@@ -0,0 +1,75 @@
+import asyncio
+import os
+import numpy as np
+from TtsCache import TtsCache, cache_key, cached_synthesis, prewarm
+
+VOICE = ("en-IN-NeerjaNeural", "+0%", "+0Hz")
+ENTRY_BYTES = 4000 + 128  # 1000 float32 samples and the .npy header
+
+def phrase_audio(value):
+    return np.full(1000, value, dtype='float32')
+
+def small_cache(directory, entries):
+    return TtsCache(str(directory), max_mb=entries * ENTRY_BYTES / (1024 * 1024))
+
+def test_phrases_are_keyed_on_words_voice_rate_and_pitch():
+    assert cache_key("Hello  there\n", *VOICE) == cache_key("Hello there", *VOICE)
+    assert cache_key("Hello there", *VOICE) != cache_key("Hello there", "en-US-AriaNeural", "+0%", "+0Hz")
+    assert cache_key("Hello there", *VOICE) != cache_key("Hello there", VOICE[0], "+10%", VOICE[2])
+
+def test_stored_audio_is_read_back(tmp_path):
+    cache = TtsCache(str(tmp_path))
+    assert cache.get("Hello", *VOICE) is None
+    cache.put("Hello", *VOICE, phrase_audio(0.5), 24000)
+    audio, sample_rate = cache.get("Hello", *VOICE)
+    assert sample_rate == 24000
+    assert audio.shape == (1000, 1) and np.all(audio == 0.5)
+    assert ("Hello", *VOICE) in cache
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+def test_least_recently_used_phrases_are_evicted(tmp_path):
+    cache = small_cache(tmp_path, 3)
+    for index, text in enumerate(["one", "two", "three"]):
+        cache.put(text, *VOICE, phrase_audio(index), 24000)
+    assert cache.get("one", *VOICE) is not None  # "two" is now the oldest
+    cache.put("four", *VOICE, phrase_audio(3), 24000)
+    assert [text for text in ["one", "two", "three", "four"] if (text, *VOICE) in cache] == ["one", "three", "four"]
+    assert len(os.listdir(tmp_path)) == 3
+    assert cache.stats()["entries"] == 3
+
+def test_recency_survives_a_restart(tmp_path):
+    cache = small_cache(tmp_path, 3)
+    for index, text in enumerate(["one", "two", "three"]):
+        cache.put(text, *VOICE, phrase_audio(index), 24000)
+        path = os.path.join(str(tmp_path), f"{cache_key(text, *VOICE)}-24000.npy")
+        os.utime(path, (1000 + index, 1000 + index))
+    reopened = small_cache(tmp_path, 3)
+    assert reopened.stats()["entries"] == 3
+    reopened.put("four", *VOICE, phrase_audio(3), 24000)
+    assert ("one", *VOICE) not in reopened and ("two", *VOICE) in reopened
+
+def test_a_deleted_file_is_a_miss(tmp_path):
+    cache = TtsCache(str(tmp_path))
+    cache.put("Hello", *VOICE, phrase_audio(0.5), 24000)
+    for name in os.listdir(tmp_path):
+        os.remove(os.path.join(str(tmp_path), name))
+    assert cache.get("Hello", *VOICE) is None
+    assert ("Hello", *VOICE) not in cache
+
+def test_cached_phrases_are_not_fetched_again(tmp_path):
+    cache = TtsCache(str(tmp_path))
+    cache.put("Hello", *VOICE, phrase_audio(0.5), 24000)
+    fetched = []
+
+    async def fetch(text, voice, rate, pitch):
+        fetched.append(text)
+        if text == "Broken":
+            raise ConnectionError("no network")
+        return b""
+
+    audio, _ = asyncio.run(cached_synthesis("Hello", *VOICE, fetch=fetch, cache=cache))
+    assert np.all(audio == 0.5) and fetched == []
+    phrases = [dict(zip(["text", "voice", "rate", "pitch"], (text, *VOICE))) for text in ["Hello", "Broken"]]
+    assert asyncio.run(prewarm(phrases, fetch, cache=cache)) == 0
+    assert fetched == ["Broken"]
@@ -0,0 +1,59 @@
+import sys
+import asyncio
+from xml.sax.saxutils import escape
+import pytest
+from TtsPool import TtsConnectionPool, split_text
+
+def escaped_size(text):
+    return len(escape(text).encode("utf-8"))
+
+def test_long_text_is_split_at_words_within_the_request_limit():
+    text = "Testing of the automation project is done & the report is shared. " * 300
+    pieces = split_text(text, max_bytes=4096)
+    assert len(pieces) > 1
+    assert all(escaped_size(piece) <= 4096 for piece in pieces)
+    assert " ".join(pieces).split() == text.split()
+
+def test_words_longer_than_the_limit_are_cut():
+    pieces = split_text("short " + "&" * 100 + " end", max_bytes=64)
+    assert all(escaped_size(piece) <= 64 for piece in pieces)
+    assert "".join(pieces).replace(" ", "") == "short" + "&" * 100 + "end"
+    assert split_text("   ") == []
+
+def test_long_text_is_sent_as_several_requests():
+    pytest.importorskip("aiohttp")
+    from BenchmarkTts import StandInTtsServer
+
+    server = StandInTtsServer(handshake_delay=0, first_audio_delay=0, seconds_per_word=0.03).start()
+    pool = TtsConnectionPool(size=1, url=server.url)
+    try:
+        text = "Testing is done and the report is shared with the team. " * 200
+        audio = asyncio.run(pool.synthesize(text, "en-IN-NeerjaNeural"))
+        assert audio
+        assert server.requests == len(split_text(text)) > 1
+    finally:
+        pool.close()
+        server.stop()
+
+class FakeCommunicate:
+    calls = []
+
+    def __init__(self, text, voice, rate, pitch):
+        self.calls.append(text)
+
+    async def stream(self):
+        yield {"type": "WordBoundary"}
+        yield {"type": "audio", "data": b"mp3"}
+
+def test_the_service_is_reached_through_communicate_unless_pooling_is_enabled(monkeypatch):
+    import types
+    import TtsPool
+    monkeypatch.setitem(sys.modules, "edge_tts", types.SimpleNamespace(Communicate=FakeCommunicate))
+    monkeypatch.setattr(TtsPool, "edge_tts_internals", lambda: None)
+    FakeCommunicate.calls = []
+    assert not TtsConnectionPool().pool_service
+    for pool in (TtsConnectionPool(), TtsConnectionPool(pool_service=True)):  # Untested release
+        assert asyncio.run(pool.synthesize("Hello", "en-IN-NeerjaNeural")) == b"mp3"
+        asyncio.run(pool.warm())
+        assert pool._loop is None  # No connection of its own was opened
+    assert FakeCommunicate.calls == ["Hello", "Hello"]
@@ -0,0 +1,38 @@
+import numpy as np
+from VoiceActivity import FrameVAD, EndOfUtteranceDetector
+
+# Function to build audio whose 20 ms frames have the given RMS levels (a low tone, like voice)
+def frames_at(levels, frame_size=320, sample_rate=16000):
+    t = np.arange(len(levels) * frame_size) / sample_rate
+    amplitude = np.repeat(np.asarray(levels, dtype='float64') * np.sqrt(2), frame_size)
+    return (amplitude * np.sin(2 * np.pi * 200 * t)).astype('float32')
+
+def test_quiet_frames_continue_speech_but_do_not_start_it():
+    vad = FrameVAD(start_threshold=0.1, stop_threshold=0.05, hangover_duration=0)
+    mask = vad.process(frames_at([0.07, 0.07, 0.2, 0.07, 0.07, 0.01, 0.07]))
+    assert mask.tolist() == [True, True, True, True, True, False, False]
+
+def test_hangover_keeps_short_pauses():
+    vad = FrameVAD(start_threshold=0.1, stop_threshold=0.05, hangover_duration=0.06)
+    mask = vad.process(frames_at([0.2] * 2 + [0.0] * 5))
+    assert mask.tolist() == [True, True, True, True, True, False, False]
+
+def test_block_size_does_not_change_the_decisions():
+    levels = [0.0, 0.07, 0.2, 0.07, 0.0, 0.0, 0.0, 0.2, 0.0] * 4
+    audio = frames_at(levels)
+    whole = FrameVAD(start_threshold=0.1, stop_threshold=0.05).process(audio)
+    vad = FrameVAD(start_threshold=0.1, stop_threshold=0.05)
+    pieces = [vad.process(audio[start:start + 500]) for start in range(0, len(audio), 500)]
+    assert np.array_equal(np.concatenate(pieces), whole)
+
+def test_loud_hiss_does_not_start_speech():
+    hiss = np.random.default_rng(0).standard_normal(3200).astype('float32') * 0.3
+    assert not FrameVAD(start_threshold=0.1, stop_threshold=0.05).process(hiss).any()
+
+def test_utterance_ends_after_trailing_silence():
+    vad = FrameVAD(start_threshold=0.1, stop_threshold=0.05, hangover_duration=0)
+    detector = EndOfUtteranceDetector(vad, end_silence_duration=0.1, min_speech_duration=0.1)
+    assert not detector.update(vad.process(frames_at([0.0] * 10)))  # Silence before speech
+    assert not detector.update(vad.process(frames_at([0.2] * 5 + [0.0] * 4)))
+    assert detector.trailing_silence == 4 * vad.frame_duration
+    assert detector.update(vad.process(frames_at([0.0])))